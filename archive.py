@@ -0,0 +1,305 @@
+import datetime
+import re
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+# ================== ARIZALAR ARXIVI (SQLITE) ==================
+
+# O‘zbekistonda yozgi vaqt yo‘q – sana filtrlari shu zonada
+TASHKENT = datetime.timezone(datetime.timedelta(hours=5))
+
+# Sessiyadan olinadigan ustunlar (tanlovlar – tugma kodi yoki qo‘lda yozilgan matn)
+APPLICATION_FIELDS = (
+    "uid", "username", "lang", "name", "birth", "phone", "department", "address_text",
+    "nationality", "education", "marital", "habits", "ru_level", "en_level", "cn_level",
+    "word_level", "excel_level", "onec_level", "source_info", "prev_job", "salary", "shift",
+    "ref_check", "photo",
+)
+COLUMNS = ("id", "submitted", "phone_key") + APPLICATION_FIELDS
+
+_NON_DIGITS = re.compile(r"\D+")
+
+
+def phone_key(phone: Optional[str]) -> Optional[str]:
+    """Telefonning taqqoslanadigan shakli: faqat raqamlar, oxirgi 9 tasi (+998 / 8 / bo‘sh joylarsiz)."""
+    if not phone:
+        return None
+    digits = _NON_DIGITS.sub("", phone)
+    return digits[-9:] if digits else None
+
+
+@dataclass(frozen=True)
+class ApplicationFilter:
+    """HR so‘rovi filtrlari; None – shu maydon bo‘yicha filtr yo‘q. Sanalar – [since, until) unix vaqt."""
+
+    department: Union[int, str, None] = None
+    shift: Union[int, str, None] = None
+    source_info: Union[int, str, None] = None
+    phone: Optional[str] = None
+    uid: Optional[int] = None
+    since: Optional[int] = None
+    until: Optional[int] = None
+
+    def where(self) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        params: List[Any] = []
+        for column in ("department", "shift", "source_info", "uid"):
+            value = getattr(self, column)
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if self.phone is not None:
+            clauses.append("phone_key = ?")
+            params.append(phone_key(self.phone))
+        if self.since is not None:
+            clauses.append("submitted >= ?")
+            params.append(self.since)
+        if self.until is not None:
+            clauses.append("submitted < ?")
+            params.append(self.until)
+        return " AND ".join(clauses), params
+
+
+def day_range(first: datetime.date, last: datetime.date) -> Tuple[int, int]:
+    """[first, last] kunlari (Toshkent vaqti) -> [since, until) unix soniyalar."""
+    start = datetime.datetime.combine(first, datetime.time(), TASHKENT)
+    end = datetime.datetime.combine(last + datetime.timedelta(days=1), datetime.time(), TASHKENT)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+class ApplicationArchive:
+    """
+    Tasdiqlangan arizalarning faqat qo‘shiladigan (append-only) arxivi.
+
+    Har bir ariza bitta qator; bo‘lim, smena, manba, telefon, Telegram ID va
+    sana bo‘yicha indekslar bor. SQLite’da har bir indeks oxirida rowid (id)
+    turadi, shuning uchun "filtr + id bo‘yicha teskari tartib + LIMIT" sahifalari
+    indeksdan to‘g‘ridan-to‘g‘ri o‘qiladi (keyset pagination, OFFSET’siz).
+    Metodlar sinxron – event loop’dan asyncio.to_thread orqali chaqiriladi.
+    """
+
+    INDEXED = ("department", "shift", "source_info", "phone_key", "uid", "submitted")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Tanlov ustunlari tipsiz: tugma kodi (INTEGER) yoki qo‘lda yozilgan matn (TEXT)
+        columns = ", ".join(
+            f"{name} INTEGER NOT NULL" if name == "uid" else name for name in APPLICATION_FIELDS
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS applications ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " submitted INTEGER NOT NULL,"
+            " phone_key TEXT,"
+            f" {columns}"
+            ")"
+        )
+        for column in self.INDEXED:
+            self._conn.execute(
+                f"CREATE INDEX IF NOT EXISTS applications_{column} ON applications ({column})"
+            )
+        self._insert_sql = (
+            f"INSERT INTO applications (submitted, phone_key, {', '.join(APPLICATION_FIELDS)})"
+            f" VALUES ({', '.join('?' * (len(APPLICATION_FIELDS) + 2))})"
+        )
+
+    def _row(self, record: Dict[str, Any], submitted: Optional[float]) -> tuple:
+        return (
+            int(submitted if submitted is not None else time.time()),
+            phone_key(record.get("phone")),
+            *(record.get(name) for name in APPLICATION_FIELDS),
+        )
+
+    def append(self, record: Dict[str, Any], submitted: Optional[float] = None) -> int:
+        """Arizani yozadi; qaytaradi: arxivdagi id."""
+        with self._lock:
+            return self._conn.execute(self._insert_sql, self._row(record, submitted)).lastrowid
+
+    def append_many(self, records: Sequence[Tuple[Dict[str, Any], float]]) -> None:
+        """Ko‘p arizani bitta tranzaksiyada yozish (import / benchmark)."""
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    self._insert_sql, (self._row(record, ts) for record, ts in records)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def query(
+        self,
+        filters: ApplicationFilter,
+        limit: int = 10,
+        before_id: Optional[int] = None,
+        after_id: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Filtrga mos arizalar, eng yangisi birinchi.
+
+        before_id – keyingi (eskiroq) sahifa, after_id – oldingi (yangiroq) sahifa.
+        """
+        where, params = filters.where()
+        clauses = [where] if where else []
+        order = "DESC"
+        if before_id is not None:
+            clauses.append("id < ?")
+            params.append(before_id)
+        elif after_id is not None:
+            clauses.append("id > ?")
+            params.append(after_id)
+            order = "ASC"
+        sql = f"SELECT {', '.join(COLUMNS)} FROM applications"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY id {order} LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        if order == "ASC":
+            rows.reverse()
+        return [dict(zip(COLUMNS, row)) for row in rows]
+
+    def scan(self, filters: ApplicationFilter, after_id: int = 0, limit: int = 1000) -> List[tuple]:
+        """Eksport uchun: `after_id` dan keyingi qatorlar id o‘sishi bo‘yicha, COLUMNS tartibidagi tuple’lar."""
+        where, params = filters.where()
+        sql = (
+            f"SELECT {', '.join(COLUMNS)} FROM applications WHERE "
+            + (f"{where} AND " if where else "")
+            + "id > ? ORDER BY id LIMIT ?"
+        )
+        with self._lock:
+            return self._conn.execute(sql, params + [after_id, limit]).fetchall()
+
+    def iter_rows(self, filters: ApplicationFilter, batch: int = 1000) -> Iterator[tuple]:
+        """Filtrga mos barcha qatorlar – kursor `batch` talab o‘qiydi, xotira qator soniga bog‘liq emas."""
+        after_id = 0
+        while True:
+            rows = self.scan(filters, after_id, batch)
+            yield from rows
+            if len(rows) < batch:
+                return
+            after_id = rows[-1][0]
+
+    def count(self, filters: ApplicationFilter) -> int:
+        where, params = filters.where()
+        sql = "SELECT COUNT(*) FROM applications" + (f" WHERE {where}" if where else "")
+        with self._lock:
+            return self._conn.execute(sql, params).fetchone()[0]
+
+    def counts(self, filters: ApplicationFilter, column: str) -> List[Tuple[Any, int]]:
+        """Filtrga mos arizalar `column` qiymatlari bo‘yicha: [(qiymat, soni)], ko‘pi birinchi."""
+        if column not in APPLICATION_FIELDS:
+            raise ValueError(f"unknown column: {column}")
+        where, params = filters.where()
+        sql = (
+            f"SELECT {column}, COUNT(*) AS n FROM applications"
+            + (f" WHERE {where}" if where else "")
+            + f" GROUP BY {column} ORDER BY n DESC"
+        )
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def by_ids(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """Berilgan id’lar bo‘yicha arizalar, shu tartibda (topilmaganlari tushib qoladi)."""
+        if not ids:
+            return []
+        sql = f"SELECT {', '.join(COLUMNS)} FROM applications WHERE id IN ({', '.join('?' * len(ids))})"
+        with self._lock:
+            rows = {row[0]: dict(zip(COLUMNS, row)) for row in self._conn.execute(sql, list(ids))}
+        return [rows[i] for i in ids if i in rows]
+
+    def search_rows(self) -> List[Tuple[int, Optional[str], Optional[str]]]:
+        """(id, name, prev_job) – qidiruv indeksini qurish uchun, id o‘sishi bo‘yicha."""
+        with self._lock:
+            return self._conn.execute("SELECT id, name, prev_job FROM applications ORDER BY id").fetchall()
+
+    def has_newer(self, filters: ApplicationFilter, than_id: int) -> bool:
+        where, params = filters.where()
+        sql = "SELECT 1 FROM applications WHERE " + (f"{where} AND " if where else "") + "id > ? LIMIT 1"
+        with self._lock:
+            return self._conn.execute(sql, params + [than_id]).fetchone() is not None
+
+    def applicants_since(self, since: int) -> List[Tuple[Optional[str], int, int]]:
+        """(phone_key, uid, submitted) – `since` dan keyingi arizalar, eskisi birinchi."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT phone_key, uid, submitted FROM applications WHERE submitted >= ? ORDER BY id",
+                (since,),
+            ).fetchall()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ApplicantIndex:
+    """
+    Takroriy nomzodlar: telefon va Telegram ID -> oxirgi ariza vaqti.
+
+    Ishga tushishda arxivdan faqat `window` ichidagi arizalar yuklanadi,
+    keyin har bir tasdiqda add() bilan to‘ldiriladi. Tekshirish – ikkita
+    dict lookup (O(1)); oyna tashqarisidagi yozuvlar hisobga olinmaydi.
+
+    Dict’lar oxirgi ariza vaqti tartibida (eng eskisi boshida) – oynadan
+    chiqqanlar prune() da boshidan o‘chiriladi, har bir add() ham shuni qiladi.
+    """
+
+    def __init__(self, window: float):
+        self.window = window
+        self._phones: Dict[str, int] = {}
+        self._uids: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._uids)
+
+    def load(self, rows: Iterable[Tuple[Optional[str], int, int]], now: Optional[float] = None) -> int:
+        count = 0
+        for key, uid, submitted in rows:
+            self._put(key, uid, submitted)
+            count += 1
+        self.prune(time.time() if now is None else now)
+        return count
+
+    @staticmethod
+    def _touch(entries: Dict[Any, int], key: Any, submitted: int) -> None:
+        if entries.get(key, 0) < submitted:
+            # Oxiriga ko‘chiramiz – tartib oxirgi ariza vaqti bo‘yicha qoladi
+            entries.pop(key, None)
+            entries[key] = submitted
+
+    def _put(self, key: Optional[str], uid: int, submitted: int) -> None:
+        if key:
+            self._touch(self._phones, key, submitted)
+        self._touch(self._uids, uid, submitted)
+
+    def add(self, uid: int, phone: Optional[str], submitted: float) -> None:
+        self._put(phone_key(phone), uid, int(submitted))
+        self.prune(submitted)
+
+    def prune(self, now: float) -> int:
+        """Oyna tashqarisiga chiqqan yozuvlarni o‘chirish; qaytaradi: o‘chirilganlar soni."""
+        cutoff = now - self.window
+        removed = 0
+        for entries in (self._phones, self._uids):
+            while entries:
+                key, submitted = next(iter(entries.items()))
+                if submitted > cutoff:
+                    break
+                del entries[key]
+                removed += 1
+        return removed
+
+    def previous(self, uid: int, phone: Optional[str], now: float) -> Optional[int]:
+        """Shu telefon yoki ID bilan oyna ichida yuborilgan oxirgi ariza vaqti (yo‘q bo‘lsa – None)."""
+        key = phone_key(phone)
+        last = max(self._uids.get(uid, 0), self._phones.get(key, 0) if key else 0)
+        return last if last and now - last < self.window else None
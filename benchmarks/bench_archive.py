@@ -0,0 +1,125 @@
+"""
+Arizalar arxivi: yozish va HR so‘rovlari tezligi katta hajmda.
+
+    python benchmarks/bench_archive.py [--records 100000] [--page 10] [--repeat 50]
+
+Arxiv sintetik arizalar bilan to‘ldiriladi (oxirgi 365 kun bo‘ylab), so‘ng
+/arizalar buyrug‘i bajaradigan so‘rovlar o‘lchanadi: birinchi sahifa har xil
+filtrlar bilan, chuqur keyset sahifa, sana oralig‘i va COUNT. Natija – ms.
+Oxirida takroriy nomzodlar indeksi: arxivdan yuklash vaqti va bitta tekshiruv.
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+
+from common import TMP_DIR, percentiles
+
+from archive import ApplicantIndex, ApplicationArchive, ApplicationFilter, day_range
+
+DAY = 86400
+
+
+def synthetic(n: int, now: float):
+    rnd = random.Random(7)
+    for i in range(n):
+        record = {
+            "uid": 10_000_000 + rnd.randrange(n),
+            "username": f"user{i}",
+            "lang": rnd.choice(("uz", "ru")),
+            "name": f"Nomzod {i}",
+            "phone": f"+99890{i:07d}",
+            "department": rnd.randrange(3),
+            "shift": rnd.randrange(3),
+            "source_info": rnd.randrange(5) if rnd.random() < 0.9 else "Do‘stim aytdi",
+            "birth": "01.01.1995",
+            "address_text": "Toshkent, Chilonzor",
+            "nationality": rnd.randrange(4),
+            "education": rnd.randrange(4),
+            "marital": rnd.randrange(3),
+            "habits": rnd.randrange(4),
+            "ru_level": rnd.randrange(5),
+            "en_level": rnd.randrange(5),
+            "word_level": rnd.randrange(5),
+            "excel_level": rnd.randrange(5),
+            "prev_job": "Korzinka, kassir",
+            "salary": "5 000 000",
+            "ref_check": True,
+            "photo": "AgACAgIAAxkBAAI",
+        }
+        # Vaqt id bilan birga o‘sadi – arxivga yozilish tartibi
+        yield record, now - (n - i) * (365 * DAY / n)
+
+
+def measure(label: str, fn, repeat: int) -> None:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        samples.append(time.perf_counter() - t0)
+    p = percentiles(samples)
+    size = result if isinstance(result, int) else len(result)
+    print(f"{label:<34} p50={p['p50'] * 1e3:7.3f}ms p99={p['p99'] * 1e3:7.3f}ms  ({size})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--page", type=int, default=10)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    path = os.path.join(TMP_DIR, "bench_archive.db")
+    archive = ApplicationArchive(path)
+    now = time.time()
+    t0 = time.perf_counter()
+    archive.append_many(list(synthetic(args.records, now)))
+    filled = time.perf_counter() - t0
+    print(f"{args.records} records in {filled:.2f}s ({args.records / filled:.0f}/s), "
+          f"{os.path.getsize(path) / 2**20:.1f} MiB")
+
+    samples = []
+    for i in range(200):
+        t0 = time.perf_counter()
+        archive.append({"uid": 1, "name": f"Yangi {i}", "phone": "+998901112233", "department": 0})
+        samples.append(time.perf_counter() - t0)
+    p = percentiles(samples)
+    print(f"{'append (single)':<34} p50={p['p50'] * 1e3:7.3f}ms p99={p['p99'] * 1e3:7.3f}ms")
+
+    today = datetime.datetime.fromtimestamp(now).date()
+    since, until = day_range(today - datetime.timedelta(days=30), today)
+    deep = archive.query(ApplicationFilter(), 1, before_id=args.records // 2)[0]["id"]
+    cases = {
+        "all, first page": (ApplicationFilter(), None),
+        "department": (ApplicationFilter(department=1), None),
+        "department + shift": (ApplicationFilter(department=1, shift=2), None),
+        "source (free text)": (ApplicationFilter(source_info="Do‘stim aytdi"), None),
+        "phone": (ApplicationFilter(phone="90 001 2345"), None),
+        "uid": (ApplicationFilter(uid=10_000_123), None),
+        "last 30 days + department": (ApplicationFilter(department=2, since=since, until=until), None),
+        "all, page at middle (keyset)": (ApplicationFilter(), deep),
+        "department, page at middle": (ApplicationFilter(department=1), deep),
+    }
+    for label, (filters, before_id) in cases.items():
+        measure(label, lambda: archive.query(filters, args.page + 1, before_id=before_id), args.repeat)
+    measure("count, department", lambda: archive.count(ApplicationFilter(department=1)), args.repeat)
+    measure("count, last 30 days", lambda: archive.count(ApplicationFilter(since=since, until=until)), args.repeat)
+
+    for days in (30, 365):
+        index = ApplicantIndex(days * DAY)
+        t0 = time.perf_counter()
+        rows = archive.applicants_since(int(now - index.window))
+        index.load(rows)
+        print(f"applicant index, {days:>3} days: {len(rows)} rows loaded in "
+              f"{(time.perf_counter() - t0) * 1e3:.0f} ms, {len(index)} applicants")
+    probes = [(10_000_000 + i, f"+998 90 {i:07d}") for i in range(0, 2 * args.records, 7)]
+    t0 = time.perf_counter()
+    hits = sum(index.previous(uid, phone, now) is not None for uid, phone in probes)
+    per_lookup = (time.perf_counter() - t0) / len(probes)
+    print(f"{'applicant lookup':<34} {per_lookup * 1e6:.2f}us  ({hits}/{len(probes)} hits)")
+    archive.close()
+
+
+if __name__ == "__main__":
+    main()
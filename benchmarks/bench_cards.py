@@ -0,0 +1,218 @@
+"""
+Preview va HR kartochkasini render qilish: f-string vs kompilyatsiya qilingan shablon.
+
+    python benchmarks/bench_cards.py [--cards 10000]
+
+"old" – avvalgi send_preview/final_confirm’dagi kabi har safar f-string bilan,
+tr()/choice_text()/percent() chaqiruvlari orqali (preview + tasdiqda HR qayta).
+"new" – PREVIEW_CARDS/HR_CARDS; tasdiqda HR matni sessiyadagi keshdan olinadi.
+Ikkala variant natijasi bir xilligi ham tekshiriladi.
+"""
+import argparse
+import random
+import time
+
+from common import ROOT  # noqa: F401  (sys.path sozlanadi)
+
+import roshaaa
+from roshaaa import (
+    DEPARTMENTS, EDUCATIONS, HABITS, MARITAL_STATUSES, NATIONALITIES, SHIFTS, SOURCES,
+    Session, choice_text, percent, tr,
+)
+
+
+def old_preview(uid: int, d: Session) -> str:
+    lang = d.lang
+    addr = d.address_text or tr(uid, "Ko‘rsatilmagan", "Не указано")
+    username_display = f"@{d.username}" if d.username else tr(uid, "Ko‘rsatilmagan", "Не указано")
+    ref_text = tr(
+        uid,
+        uz="Ruxsat beraman" if d.ref_check else "Ruxsat bermayman",
+        ru="Разрешаю" if d.ref_check else "Не разрешаю",
+    )
+    text = tr(
+        uid,
+        uz="Iltimos, kiritgan ma’lumotlaringizni yana bir bor tekshirib chiqing:\n\n",
+        ru="Пожалуйста, внимательно проверьте введённые данные:\n\n",
+    )
+    text += (
+        f"👤 <b>F.I.Sh:</b> {d.name or ''}\n"
+        f"👤 <b>Telegram username:</b> {username_display}\n"
+        f"🎂 <b>Tug‘ilgan sana:</b> {d.birth or ''}\n"
+        f"📞 <b>Telefon:</b> {d.phone or ''}\n"
+        f"🏢 <b>Bo‘lim:</b> {choice_text(DEPARTMENTS, d.department, lang)}\n"
+        f"📍 <b>Yashash manzil:</b> {addr}\n"
+        f"🌐 <b>Millat:</b> {choice_text(NATIONALITIES, d.nationality, lang)}\n"
+        f"🎓 <b>Ma’lumoti:</b> {choice_text(EDUCATIONS, d.education, lang)}\n"
+        f"💍 <b>Oylaviy holat:</b> {choice_text(MARITAL_STATUSES, d.marital, lang)}\n"
+        f"🚬 <b>Zararli odatlar:</b> {choice_text(HABITS, d.habits, lang)}\n\n"
+        f"🗣 <b>Tillar:</b>\n"
+        f"▪️ Rus tili: {percent(d.ru_level)}\n"
+        f"▪️ Ingliz tili: {percent(d.en_level)}\n"
+        f"▪️ Xitoy tili: {percent(d.cn_level)}\n\n"
+        f"💻 <b>Kompyuter ko‘nikmalari:</b>\n"
+        f"▪️ Word: {percent(d.word_level)}\n"
+        f"▪️ Excel: {percent(d.excel_level)}\n"
+        f"▪️ 1C: {percent(d.onec_level)}\n\n"
+        f"ℹ️ <b>Kompaniya haqida qayerdan eshitdingiz:</b> {choice_text(SOURCES, d.source_info, lang)}\n"
+        f"💼 <b>Avvalgi ish joyingiz:</b> {d.prev_job or ''}\n"
+        f"💰 <b>Hohlayotgan ish haqi:</b> {d.salary or ''}\n"
+        f"🕒 <b>Smena:</b> {choice_text(SHIFTS, d.shift, lang)}\n"
+        f"📋 <b>Surishtirishga ruxsat:</b> {ref_text}\n"
+    )
+    return text
+
+
+def old_hr(uid: int, d: Session) -> str:
+    lang = d.lang
+    addr = d.address_text or tr(uid, "Ko‘rsatilmagan", "Не указано")
+    if lang == "uz":
+        username = f"@{d.username}" if d.username else "Ko‘rsatilmagan"
+        ref = "Ruxsat beraman" if d.ref_check else "Ruxsat bermayman"
+        return f"""
+📨 <b>Yangi ishga qabul arizasi</b>
+
+👤 <b>F.I.Sh:</b> {d.name or ''}
+👤 <b>Telegram username:</b> {username}
+🎂 <b>Tug‘ilgan sana:</b> {d.birth or ''}
+📞 <b>Telefon:</b> {d.phone or ''}
+🏢 <b>Talab qilayotgan bo‘lim:</b> {choice_text(DEPARTMENTS, d.department, lang)}
+📍 <b>Yashash manzili:</b> {addr}
+🌐 <b>Millati:</b> {choice_text(NATIONALITIES, d.nationality, lang)}
+🎓 <b>Ma’lumoti:</b> {choice_text(EDUCATIONS, d.education, lang)}
+💍 <b>Oylaviy holati:</b> {choice_text(MARITAL_STATUSES, d.marital, lang)}
+🚬 <b>Zararli odatlari:</b> {choice_text(HABITS, d.habits, lang)}
+
+🗣 <b>Tillar:</b>
+▪️ Rus tili: {percent(d.ru_level)}
+▪️ Ingliz tili: {percent(d.en_level)}
+▪️ Xitoy tili: {percent(d.cn_level)}
+
+💻 <b>Kompyuter ko‘nikmalari:</b>
+▪️ Word: {percent(d.word_level)}
+▪️ Excel: {percent(d.excel_level)}
+▪️ 1C: {percent(d.onec_level)}
+
+ℹ️ <b>Kompaniya haqida qayerdan eshitgan:</b> {choice_text(SOURCES, d.source_info, lang)}
+💼 <b>Avvalgi ish joyi:</b> {d.prev_job or ''}
+💰 <b>Hohlayotgan ish haqi:</b> {d.salary or ''}
+🕒 <b>Smena:</b> {choice_text(SHIFTS, d.shift, lang)}
+
+📋 <b>Surishtirishga munosabati:</b> {ref}
+
+🆔 <b>Telegram ID:</b> <code>{uid}</code>
+"""
+    username = f"@{d.username}" if d.username else "Не указано"
+    ref = "Разрешаю" if d.ref_check else "Не разрешаю"
+    return f"""
+📨 <b>Новая заявка на трудоустройство</b>
+
+👤 <b>Ф.И.О.:</b> {d.name or ''}
+👤 <b>Telegram username:</b> {username}
+🎂 <b>Дата рождения:</b> {d.birth or ''}
+📞 <b>Телефон:</b> {d.phone or ''}
+🏢 <b>Желаемый отдел:</b> {choice_text(DEPARTMENTS, d.department, lang)}
+📍 <b>Адрес проживания:</b> {addr}
+🌐 <b>Национальность:</b> {choice_text(NATIONALITIES, d.nationality, lang)}
+🎓 <b>Образование:</b> {choice_text(EDUCATIONS, d.education, lang)}
+💍 <b>Семейное положение:</b> {choice_text(MARITAL_STATUSES, d.marital, lang)}
+🚬 <b>Вредные привычки:</b> {choice_text(HABITS, d.habits, lang)}
+
+🗣 <b>Языки:</b>
+▪️ Русский язык: {percent(d.ru_level)}
+▪️ Английский язык: {percent(d.en_level)}
+▪️ Китайский язык: {percent(d.cn_level)}
+
+💻 <b>Компьютерные навыки:</b>
+▪️ Word: {percent(d.word_level)}
+▪️ Excel: {percent(d.excel_level)}
+▪️ 1C: {percent(d.onec_level)}
+
+ℹ️ <b>Источник информации о компании:</b> {choice_text(SOURCES, d.source_info, lang)}
+💼 <b>Предыдущее место работы:</b> {d.prev_job or ''}
+💰 <b>Желаемая зарплата:</b> {d.salary or ''}
+🕒 <b>Смена:</b> {choice_text(SHIFTS, d.shift, lang)}
+
+📋 <b>Отношение к проверке рекомендаций:</b> {ref}
+
+🆔 <b>Telegram ID:</b> <code>{uid}</code>
+"""
+
+
+def random_session(rng: random.Random) -> Session:
+    def pick(table):
+        return rng.choice([rng.randrange(len(table["uz"])), "qo‘lda yozilgan", None])
+
+    return Session(
+        lang=rng.choice(["uz", "ru"]),
+        username=rng.choice([f"user{rng.randrange(10**6)}", None]),
+        name="Ali Valiyev", birth="01.01.1990", phone="+998901234567",
+        department=pick(DEPARTMENTS), address_text=rng.choice(["Toshkent", None]),
+        nationality=pick(NATIONALITIES), education=pick(EDUCATIONS),
+        marital=pick(MARITAL_STATUSES), habits=pick(HABITS),
+        ru_level=rng.choice([0, 3, "60"]), en_level=rng.choice([1, 4, "10"]),
+        cn_level=0, word_level=2, excel_level=rng.choice([3, "80"]), onec_level=None,
+        source_info=pick(SOURCES), prev_job="Korzinka", salary="5 000 000",
+        shift=pick(SHIFTS), ref_check=rng.choice([True, False]), photo="PHOTO",
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--cards", type=int, default=10_000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    sessions = {1_000_000 + i: random_session(rng) for i in range(args.cards)}
+    for uid, d in sessions.items():
+        roshaaa.user_data[uid] = d
+
+    for uid, d in sessions.items():
+        values = roshaaa.CARD_VALUES[d.lang](d, uid)
+        assert roshaaa.PREVIEW_CARDS[d.lang].render(values) == old_preview(uid, d)
+        assert roshaaa.HR_CARDS[d.lang].render(values) == old_hr(uid, d)
+
+    def run_old():
+        for uid, d in sessions.items():
+            old_preview(uid, d)
+            old_hr(uid, d)
+
+    def run_new():
+        for uid, d in sessions.items():
+            values = roshaaa.CARD_VALUES[d.lang](d, uid)
+            roshaaa.PREVIEW_CARDS[d.lang].render(values)
+            d.card_cache = (roshaaa.card_key(d), roshaaa.HR_CARDS[d.lang].render(values))
+            roshaaa.hr_caption(uid, d)
+
+    def run_new_nocache():
+        for uid, d in sessions.items():
+            d.card_cache = None
+            roshaaa.PREVIEW_CARDS[d.lang].render(roshaaa.CARD_VALUES[d.lang](d, uid))
+            roshaaa.hr_caption(uid, d)
+
+    def run_confirm_old():
+        for uid, d in sessions.items():
+            old_hr(uid, d)
+
+    def run_confirm_new():
+        for uid, d in sessions.items():
+            roshaaa.hr_caption(uid, d)
+
+    n = len(sessions)
+    for label, fn in (
+        ("old f-strings (preview + HR)", run_old),
+        ("templates, no cache", run_new_nocache),
+        ("templates + HR cache", run_new),
+        ("confirm only, old", run_confirm_old),
+        ("confirm only, cached", run_confirm_new),
+    ):
+        best = float("inf")
+        for _ in range(3):
+            started = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - started)
+        print(f"{label:<30} {best * 1e3:8.1f} ms / {n} cards  ({best / n * 1e6:6.2f} us/card)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Cold start o‘lchovi: `python roshaaa.py` jarayoni soxta Bot API’ga qarshi bir necha marta ishga tushiriladi.
+
+    python benchmarks/bench_cold_start.py [--runs 3] [--api-latency 150]
+
+Har bir ishga tushirishda:
+  - jarayon boshlanganidan webhook’ga yuborilgan /start update’i 200 olguncha (port tayyor);
+  - birinchi javob (sendMessage) soxta API’ga yetib kelguncha – time-to-first-response;
+  - bot o‘zi log qilgan "Startup timings" qatori;
+  - setWebhook/getWebhookInfo/deleteWebhook chaqiruvlari soni.
+
+Birinchi ishga tushirish webhook’ni o‘rnatadi, keyingilari faqat getWebhookInfo
+bilan tekshirishi va SIGTERM’da webhook’ni o‘chirmasligi kerak.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import socket
+import sys
+import time
+from typing import Dict, List
+
+from common import ROOT, TMP_DIR, make_update
+
+import aiohttp  # noqa: E402
+from fake_bot_api import FakeBotAPI  # noqa: E402
+
+TOKEN = "123456:COLD-START-TOKEN"
+WEBHOOK_CALLS = ("setWebhook", "getWebhookInfo", "deleteWebhook")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def read_log(stream: asyncio.StreamReader, lines: List[str]) -> None:
+    while True:
+        line = await stream.readline()
+        if not line:
+            return
+        lines.append(line.decode(errors="replace").rstrip())
+
+
+async def one_start(api: FakeBotAPI, base: str, port: int) -> Dict[str, object]:
+    env = dict(
+        os.environ,
+        API_TOKEN=TOKEN,
+        PORT=str(port),
+        WEBHOOK_BASE_URL=f"http://127.0.0.1:{port}",
+        TG_API_SERVER=base,
+        HR_SPOOL_PATH=os.path.join(TMP_DIR, "hr_outbox.db"),
+        SESSION_BACKEND="sqlite",
+        SESSION_DB_PATH=os.path.join(TMP_DIR, "sessions.db"),
+    )
+    before = {m: api.calls[m] for m in WEBHOOK_CALLS}
+    replies_before = api.calls["sendMessage"]
+    url = f"http://127.0.0.1:{port}/webhook/{TOKEN}"
+
+    started = time.perf_counter()
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "roshaaa.py"),
+        cwd=TMP_DIR, env=env, stderr=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.DEVNULL,
+    )
+    log: List[str] = []
+    reader = asyncio.create_task(read_log(proc.stderr, log))
+
+    async with aiohttp.ClientSession() as http:
+        while True:
+            try:
+                async with http.post(url, json=make_update(5_000_001, text="/start")) as resp:
+                    if resp.status == 200:
+                        break
+            except aiohttp.ClientConnectionError:
+                pass
+            await asyncio.sleep(0.005)
+    accepted = time.perf_counter() - started
+    while api.calls["sendMessage"] == replies_before:
+        await asyncio.sleep(0.002)
+    first_reply = time.perf_counter() - started
+    # Kechiktirilgan sozlash tugashini (timings qatori) kutamiz
+    while not any("Startup timings" in line for line in log):
+        await asyncio.sleep(0.01)
+
+    proc.send_signal(signal.SIGTERM)
+    await proc.wait()
+    await reader
+    return {
+        "accepted_ms": accepted * 1e3,
+        "first_reply_ms": first_reply * 1e3,
+        "timings": next(line for line in log if "Startup timings" in line).split("Startup timings: ")[1],
+        "calls": {m: api.calls[m] - before[m] for m in WEBHOOK_CALLS},
+    }
+
+
+async def run(args: argparse.Namespace) -> None:
+    api = FakeBotAPI(latency=args.api_latency / 1000)
+    base = await api.start()
+    # Barcha ishga tushirishlar bitta URL’da – webhook o‘zgarmagan holat
+    port = free_port()
+    try:
+        for i in range(args.runs):
+            r = await one_start(api, base, port)
+            calls = ", ".join(f"{m}={n}" for m, n in r["calls"].items())
+            print(f"start {i + 1}: webhook 200 after {r['accepted_ms']:.0f} ms, "
+                  f"first reply after {r['first_reply_ms']:.0f} ms | {r['timings']} | {calls}")
+    finally:
+        await api.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--api-latency", type=float, default=150.0,
+                        help="soxta API javob kechikishi, ms (Render -> api.telegram.org)")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+HR hisobotlari: worker jarayonlarida tuzish va event loop kechikishi.
+
+    python benchmarks/bench_digest.py [--records 100000] [--workers 1]
+
+Arxiv oxirgi 7 kunga yoyilgan sintetik arizalar bilan to‘ldiriladi, so‘ng
+bugungi (dushanba deb hisoblangan) barcha hisobotlar – kunlik va haftalik,
+har bir bo‘lim – ikki usulda tuziladi: event loop ichida (to‘g‘ridan-to‘g‘ri)
+va roshaaa’dagi kabi alohida worker jarayonlarida (build_digest_in_worker). Har bir vazifa vaqti
+va shu paytda loop’dagi 10 ms tiker’ning eng katta kechikishi chiqariladi.
+"""
+import argparse
+import asyncio
+import datetime
+import os
+import time
+
+from bench_archive import synthetic
+from common import TMP_DIR
+
+import roshaaa
+from archive import TASHKENT, ApplicationArchive
+from digest import build_digest, build_digest_in_worker, digest_periods
+
+TICK = 0.01
+
+
+async def ticker(lags: list) -> None:
+    while True:
+        expected = time.perf_counter() + TICK
+        await asyncio.sleep(TICK)
+        lags.append(time.perf_counter() - expected)
+
+
+def jobs(path: str, day: datetime.date):
+    for period, first, last in digest_periods(day, day.weekday()):
+        for department in range(len(roshaaa.DEPARTMENTS["uz"])):
+            out = os.path.join(TMP_DIR, f"{period}-{department}.xlsx")
+            yield (path, out, period, first, last, department, roshaaa.EXPORT_LABELS)
+
+
+async def run(args: argparse.Namespace) -> None:
+    path = os.path.join(TMP_DIR, "bench_digest.db")
+    archive = ApplicationArchive(path)
+    now = time.time()
+    # synthetic() bir yilga yoyadi – 7 kunga siqamiz
+    archive.append_many((record, now - (now - ts) / 52) for record, ts in synthetic(args.records, now))
+    archive.close()
+    day = datetime.datetime.now(TASHKENT).date()
+
+    workers = asyncio.Semaphore(args.workers)
+
+    async def in_worker(job) -> dict:
+        async with workers:
+            return await build_digest_in_worker(*job)
+
+    for mode in ("inline", "worker"):
+        lags: list = []
+        tick = asyncio.create_task(ticker(lags))
+        await asyncio.sleep(0.05)
+        started = time.perf_counter()
+        if mode == "inline":
+            results = []
+            for job in jobs(path, day):
+                results.append(build_digest(*job))
+                await asyncio.sleep(0)
+        else:
+            results = await asyncio.gather(*(in_worker(job) for job in jobs(path, day)))
+        total = time.perf_counter() - started
+        tick.cancel()
+        print(f"{mode:>6}: {len(results)} digests in {total:.2f}s, "
+              f"event loop max lag {max(lags) * 1e3:.0f} ms over {len(lags)} ticks")
+        for job, result in zip(jobs(path, day), results):
+            print(f"        {job[2]:<6} department={job[5]} rows={result['rows']:>6} "
+                  f"wall={result['seconds'] * 1e3:6.0f} ms cpu={result['cpu_seconds'] * 1e3:6.0f} ms "
+                  f"size={os.path.getsize(job[1]) / 2**20:.1f} MiB")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100_000)
+    parser.add_argument("--workers", type=int, default=1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
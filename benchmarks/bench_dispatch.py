@@ -0,0 +1,58 @@
+"""
+Oxirgi step (photo) uchun dispatch narxi: eski if-zanjir vs FORM jadvali.
+
+    python benchmarks/bench_dispatch.py [--number 1000000]
+
+"old" – asl form_steps’dagi kabi resume_choice + 21 ta `if step == "..."`
+tekshiruvi (satrlar bilan), photo oxirida. "new" – FORM.get(step).
+"""
+import argparse
+import timeit
+
+from common import ROOT  # noqa: F401  (sys.path sozlanadi)
+
+from roshaaa import FORM, Step
+
+OLD_STEPS = [
+    "resume_choice", "name", "birth", "phone", "department", "address", "nationality",
+    "education", "marital", "habits", "lang_ru", "lang_en", "lang_cn", "skill_word",
+    "skill_excel", "skill_onec", "source_info", "prev_job", "salary", "shift",
+    "ref_check", "photo",
+]
+
+
+def build_old_ladder():
+    # Asl kod shaklidagi zanjir: har bir step uchun alohida `if`
+    lines = ["def old_dispatch(step):"]
+    for i, name in enumerate(OLD_STEPS):
+        lines.append(f"    if step == {name!r}:")
+        lines.append(f"        return {i}")
+    lines.append("    return None")
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["old_dispatch"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    old_dispatch = build_old_ladder()
+    # Sessiyadagi satr – literal bilan bir xil obyekt emas
+    old_step = "".join(["pho", "to"])
+    new_step = Step.PHOTO
+    form_get = FORM.get
+
+    assert old_dispatch(old_step) == len(OLD_STEPS) - 1
+    assert form_get(new_step).field == "photo"
+
+    n = args.number
+    old = min(timeit.repeat(lambda: old_dispatch(old_step), number=n, repeat=3))
+    new = min(timeit.repeat(lambda: form_get(new_step), number=n, repeat=3))
+    print(f"last step, if-ladder:  {old / n * 1e9:7.1f} ns")
+    print(f"last step, FORM table: {new / n * 1e9:7.1f} ns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""
+End-to-end benchmark: haqiqiy dp/router handler’lari + soxta Bot API serveri.
+
+    python benchmarks/bench_e2e.py [--candidates 200] [--concurrency 50]
+                                   [--mode direct|reply] [--api-latency 0] [--fast-runtime]
+                                   [--output FILE] [--compare OLD.json]
+
+N ta nomzod bir vaqtda to‘liq arizani (22 savol + preview + tasdiq) to‘ldiradi.
+Bot’ning RoshaaSession’i lokal FakeBotAPI’ga yo‘naltiriladi – chiquvchi so‘rovlar
+haqiqiy HTTP orqali ketadi, lekin tarmoqqa chiqmaydi.
+
+  direct – update’lar dp.feed_update() ga beriladi (webhook qatlamisiz);
+  reply  – update’lar webhook’ga HTTP POST qilinadi (WEBHOOK_MODE=reply).
+
+--fast-runtime – FAST_RUNTIME=1 (uvloop + orjson, o‘rnatilgan bo‘lsa).
+
+Natija: throughput, bitta yadro (CPU-soniya) boshiga update’lar, update kechikishi
+p50/p95/p99, ariza boshiga API chaqiruvlari, eng yuqori RSS. CPU vaqti butun
+jarayonniki – soxta API serveri ham shu jarayonda ishlaydi. JSON fayl benchmarks/results/ ga yoziladi; --compare bilan
+oldingi natija bilan solishtiriladi.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+from common import ROOT, application_updates, percentiles
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+
+def git_version() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "describe", "--always", "--dirty"], cwd=ROOT, text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except Exception:
+        return "unknown"
+
+
+def peak_rss_mb() -> float:
+    # Linux’da ru_maxrss – KB, macOS’da – bayt
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import roshaaa
+    from aiogram.client.telegram import TelegramAPIServer
+    from aiogram.types import Update
+    from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+    from aiohttp import web
+    from aiohttp.test_utils import TestClient, TestServer
+    from fake_bot_api import FakeBotAPI
+
+    api = FakeBotAPI(latency=args.api_latency / 1000)
+    base = await api.start()
+    bot = roshaaa.bot
+    bot.session.api = TelegramAPIServer.from_base(base)
+    sender = asyncio.create_task(roshaaa.hr_outbox.run_sender(bot))
+
+    client = None
+    if args.mode == "reply":
+        roshaaa.WEBHOOK_MODE = "reply"
+        app = web.Application()
+        SimpleRequestHandler(dispatcher=roshaaa.dp, bot=bot, handle_in_background=False).register(
+            app, path="/webhook"
+        )
+        client = TestClient(TestServer(app))
+        await client.start_server()
+
+    latencies: List[float] = []
+    replies = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def candidate(uid: int) -> None:
+        nonlocal replies
+        async with semaphore:
+            for raw in application_updates(uid):
+                started = time.perf_counter()
+                if client is None:
+                    update = Update.model_validate(raw, context={"bot": bot})
+                    await roshaaa.dp.feed_update(bot, update)
+                else:
+                    resp = await client.post("/webhook", json=raw)
+                    if b'name="method"' in await resp.read():
+                        replies += 1
+                latencies.append(time.perf_counter() - started)
+
+    rss_before = peak_rss_mb()
+    cpu_started = time.process_time()
+    started = time.perf_counter()
+    await asyncio.gather(*(candidate(9_000_000 + i) for i in range(args.candidates)))
+    handled = time.perf_counter() - started
+    # HR postlari fon navbatidan ketadi – ular ham yuborilguncha kutamiz
+    while roshaaa.hr_outbox.pending():
+        await asyncio.sleep(0.01)
+    elapsed = time.perf_counter() - started
+    cpu = time.process_time() - cpu_started
+
+    sender.cancel()
+    if client is not None:
+        await client.close()
+    await bot.session.close()
+    await api.stop()
+
+    n = args.candidates
+    p = percentiles(latencies)
+    return {
+        "version": git_version(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "runtime": {"loop": type(asyncio.get_running_loop()).__module__.split(".")[0],
+                    "json": roshaaa.JSON_LIB},
+        "applications": n,
+        "updates": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "handlers_elapsed_s": round(handled, 3),
+        "applications_per_s": round(n / elapsed, 2),
+        "updates_per_s": round(len(latencies) / handled, 1),
+        "cpu_s": round(cpu, 3),
+        "updates_per_cpu_s": round(len(latencies) / cpu, 1),
+        "latency_ms": {
+            "p50": round(p["p50"] * 1e3, 3),
+            "p95": round(p["p95"] * 1e3, 3),
+            "p99": round(p["p99"] * 1e3, 3),
+            "max": round(max(latencies) * 1e3, 3),
+            "mean": round(sum(latencies) / len(latencies) * 1e3, 3),
+        },
+        "api_calls_per_application": round(api.total_calls / n, 2),
+        "api_calls_by_method": {m: round(c / n, 2) for m, c in sorted(api.calls.items())},
+        "replies_in_response_per_application": round(replies / n, 2),
+        "api_connections": api.connections,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_growth_mb": round(peak_rss_mb() - rss_before, 1),
+    }
+
+
+COMPARED = (
+    ("applications_per_s", "applications/s", True),
+    ("updates_per_s", "updates/s", True),
+    ("updates_per_cpu_s", "updates/CPU-s", True),
+    ("latency_ms.p50", "p50 ms", False),
+    ("latency_ms.p95", "p95 ms", False),
+    ("latency_ms.p99", "p99 ms", False),
+    ("api_calls_per_application", "API calls/app", False),
+    ("peak_rss_mb", "peak RSS MB", False),
+)
+
+
+def _get(result: Dict[str, Any], path: str) -> float:
+    value: Any = result
+    for key in path.split("."):
+        value = value[key]
+    return float(value)
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any]) -> None:
+    print(f"\n{'':<16}{old['version']:>18}{new['version']:>18}{'change':>10}")
+    for path, label, higher_is_better in COMPARED:
+        a, b = _get(old, path), _get(new, path)
+        change = (b - a) / a * 100 if a else 0.0
+        better = (change > 0) == higher_is_better if change else True
+        mark = "" if abs(change) < 5 else (" +" if better else " -")
+        print(f"{label:<16}{a:>18.2f}{b:>18.2f}{change:>9.1f}%{mark}")
+
+
+def report(result: Dict[str, Any]) -> None:
+    lat = result["latency_ms"]
+    runtime = result["runtime"]
+    print(f"version {result['version']}, mode={result['params']['mode']}, "
+          f"runtime={runtime['loop']}+{runtime['json']}, "
+          f"{result['applications']} applications / {result['updates']} updates")
+    print(f"throughput : {result['applications_per_s']} applications/s, "
+          f"{result['updates_per_s']} updates/s, "
+          f"{result['updates_per_cpu_s']} updates per CPU-second")
+    print(f"latency    : p50={lat['p50']}ms p95={lat['p95']}ms p99={lat['p99']}ms max={lat['max']}ms")
+    print(f"API calls  : {result['api_calls_per_application']}/application "
+          f"(+{result['replies_in_response_per_application']} in webhook responses) "
+          f"{result['api_calls_by_method']}")
+    print(f"memory     : peak RSS {result['peak_rss_mb']} MB (+{result['rss_growth_mb']} MB during run)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--mode", choices=("direct", "reply"), default="direct")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="soxta API javob kechikishi, ms")
+    parser.add_argument("--rate-limit", action="store_true", help="chiquvchi RateLimiter yoqilsin")
+    parser.add_argument("--session-backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--fast-runtime", action="store_true", help="uvloop + orjson (FAST_RUNTIME=1)")
+    parser.add_argument("--output", help="JSON natija fayli (standart: benchmarks/results/...)")
+    parser.add_argument("--compare", help="oldingi JSON natija bilan solishtirish")
+    args = parser.parse_args()
+
+    # roshaaa import qilinishidan oldin
+    from common import TMP_DIR
+    os.environ["TG_RATE_LIMIT"] = "1" if args.rate_limit else "0"
+    os.environ["SESSION_BACKEND"] = args.session_backend
+    os.environ["SESSION_DB_PATH"] = os.path.join(TMP_DIR, "sessions.db")
+    os.environ["FAST_RUNTIME"] = "1" if args.fast_runtime else "0"
+
+    from runtime import loop_factory
+    new_loop, _ = loop_factory(args.fast_runtime)
+    with asyncio.Runner(loop_factory=new_loop) as runner:
+        result = runner.run(run(args))
+    report(result)
+
+    output = args.output
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        runtime = "-fast" if args.fast_runtime else ""
+        output = os.path.join(RESULTS_DIR, f"e2e-{result['version']}-{args.mode}{runtime}-{stamp}.json")
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, ensure_ascii=False, indent=2)
+    print(f"saved      : {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(json.load(f), result)
+
+
+if __name__ == "__main__":
+    main()
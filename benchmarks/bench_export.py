@@ -0,0 +1,120 @@
+"""
+Arizalar eksporti: katta arxivdan CSV / XLSX oqimi.
+
+    python benchmarks/bench_export.py [--records 500000] [--format csv xlsx]
+
+Arxiv sintetik arizalar bilan to‘ldiriladi, so‘ng haqiqiy export_handler
+(roshaaa.EXPORT_LABELS va export_filter bilan) aiohttp serverda ko‘tariladi
+va HTTP orqali yuklab olinadi. Har bir format uchun: birinchi baytgacha vaqt
+(TTFB), to‘liq vaqt, hajm, server jarayoni RSS o‘sishi va XLSX worker
+jarayonining eng katta RSS’i (ikkalasi eksport paytida har 50 ms o‘lchanadi).
+"""
+import argparse
+import asyncio
+import os
+import time
+import xml.etree.ElementTree as ET
+import zipfile
+
+from bench_archive import synthetic
+from common import TMP_DIR
+
+import aiohttp
+from aiohttp import web
+
+import roshaaa
+from archive import ApplicationArchive
+from export import export_handler
+
+TOKEN = "bench-export"
+PAGE = os.sysconf("SC_PAGE_SIZE")
+
+
+def rss_mib(pid: str = "self") -> float:
+    try:
+        with open(f"/proc/{pid}/statm") as f:
+            return int(f.read().split()[1]) * PAGE / 2**20
+    except FileNotFoundError:
+        return 0.0
+
+
+def workers_rss_mib() -> float:
+    """Server jarayonining bola jarayonlari (XLSX worker’lari) RSS yig‘indisi."""
+    with open(f"/proc/self/task/{os.getpid()}/children") as f:
+        return sum(rss_mib(pid) for pid in f.read().split())
+
+
+async def download(url: str, path: str):
+    peak = rss_mib()
+    start_rss = peak
+    worker_peak = 0.0
+    ttfb = None
+    size = 0
+    started = time.perf_counter()
+    async with aiohttp.ClientSession() as http:
+        async with http.get(url, headers={"Authorization": f"Bearer {TOKEN}"}) as resp:
+            assert resp.status == 200, resp.status
+            last_sample = started
+            with open(path, "wb") as f:
+                async for chunk in resp.content.iter_any():
+                    if ttfb is None:
+                        ttfb = time.perf_counter() - started
+                    size += len(chunk)
+                    f.write(chunk)
+                    now = time.perf_counter()
+                    if now - last_sample > 0.05:
+                        peak = max(peak, rss_mib())
+                        worker_peak = max(worker_peak, workers_rss_mib())
+                        last_sample = now
+    return ttfb, time.perf_counter() - started, size, peak - start_rss, worker_peak
+
+
+def check_xlsx(path: str) -> int:
+    rows = 0
+    with zipfile.ZipFile(path) as zf:
+        with zf.open("xl/worksheets/sheet1.xml") as sheet:
+            for _, elem in ET.iterparse(sheet):
+                if elem.tag.endswith("}row"):
+                    rows += 1
+                    elem.clear()
+    return rows
+
+
+async def run(args: argparse.Namespace) -> None:
+    path = os.path.join(TMP_DIR, "bench_export.db")
+    archive = ApplicationArchive(path)
+    t0 = time.perf_counter()
+    archive.append_many(synthetic(args.records, time.time()))
+    print(f"{args.records} records in {time.perf_counter() - t0:.1f}s, "
+          f"{os.path.getsize(path) / 2**20:.0f} MiB, server RSS {rss_mib():.0f} MiB")
+
+    app = web.Application()
+    app.router.add_get("/export", export_handler(archive, TOKEN, roshaaa.export_filter, roshaaa.EXPORT_LABELS))
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+
+    for kind in args.format:
+        for query in ("", "&department=1&shift=0"):
+            out = os.path.join(TMP_DIR, f"export.{kind}")
+            ttfb, total, size, rss, worker = await download(f"http://127.0.0.1:{port}/export?format={kind}{query}", out)
+            rows = check_xlsx(out) - 1 if kind == "xlsx" else sum(1 for _ in open(out, "rb")) - 1
+            print(f"{kind:>4} {query or 'all':<22} rows={rows:>7} size={size / 2**20:6.1f} MiB "
+                  f"ttfb={ttfb * 1e3:6.1f} ms total={total:5.2f}s server RSS +{rss:.1f} MiB"
+                  + (f", worker RSS {worker:.0f} MiB" if kind == "xlsx" else ""))
+
+    await runner.cleanup()
+    archive.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=500_000)
+    parser.add_argument("--format", nargs="+", choices=("csv", "xlsx"), default=["csv", "xlsx"])
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
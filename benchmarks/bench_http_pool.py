@@ -0,0 +1,83 @@
+"""
+Bot API HTTP hovuzi: aiogram standart connector’i vs HttpTuning.
+
+    python benchmarks/bench_http_pool.py [--bursts 3] [--concurrency 150] [--idle 16]
+
+Ikkala sozlama navbat bilan o‘z FakeBotAPI’siga (javob kechikishi --api-latency,
+yangi ulanishga qo‘shimcha --handshake-latency ms) bir xil yuk beradi: `--bursts` marta `--concurrency` ta bir
+vaqtdagi sendMessage, orasida `--idle` soniya tinchlik. Standart connector bo‘sh
+ulanishlarni 15 s da yopadi, shuning uchun har bir burst yangi ulanishlar bilan
+boshlanadi; sozlangan hovuz (keep-alive 60 s) ularni qayta ishlatadi.
+
+Soxta API oddiy HTTP; haqiqiy api.telegram.org’dagi TLS handshake narxi
+--handshake-latency bilan taqlid qilinadi.
+"""
+import argparse
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+from common import percentiles
+
+from aiogram import Bot
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.methods import SendMessage
+from bot_session import HttpTuning, RoshaaSession
+from fake_bot_api import FakeBotAPI
+
+
+async def run(label: str, http: Optional[HttpTuning], args: argparse.Namespace) -> Dict:
+    api = FakeBotAPI(latency=args.api_latency / 1000,
+                     handshake_latency=args.handshake_latency / 1000)
+    base = await api.start()
+    session = RoshaaSession(http=http, api=TelegramAPIServer.from_base(base))
+    bot = Bot("123456:BENCHMARK-TOKEN", session=session)
+
+    first: List[float] = []
+    rest: List[float] = []
+    connections: List[int] = []
+
+    async def call(i: int, burst: int) -> None:
+        started = time.perf_counter()
+        await bot(SendMessage(chat_id=1000 + i, text=f"burst {burst}"))
+        (first if burst == 0 else rest).append(time.perf_counter() - started)
+
+    for burst in range(args.bursts):
+        if burst:
+            await asyncio.sleep(args.idle)
+        before = api.connections
+        await asyncio.gather(*(call(i, burst) for i in range(args.concurrency)))
+        connections.append(api.connections - before)
+
+    await session.close()
+    await api.stop()
+    return {"label": label, "connections": connections, "first": first, "rest": rest}
+
+
+def report(result: Dict) -> None:
+    cold = percentiles(result["first"])
+    warm = percentiles(result["rest"])
+    print(f"{result['label']:>8}: new connections per burst {result['connections']} "
+          f"(total {sum(result['connections'])})")
+    line = f"{'':>8}  cold burst p50={cold['p50'] * 1e3:6.1f}ms p95={cold['p95'] * 1e3:6.1f}ms"
+    if result["rest"]:
+        line += f" | later bursts p50={warm['p50'] * 1e3:6.1f}ms p95={warm['p95'] * 1e3:6.1f}ms"
+    print(line)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--concurrency", type=int, default=150)
+    parser.add_argument("--idle", type=float, default=16.0, help="burstlar orasidagi tinchlik, s")
+    parser.add_argument("--api-latency", type=float, default=20.0, help="soxta API kechikishi, ms")
+    parser.add_argument("--handshake-latency", type=float, default=60.0,
+                        help="yangi ulanishdagi qo‘shimcha kechikish (TLS), ms")
+    args = parser.parse_args()
+
+    for label, http in (("default", None), ("tuned", HttpTuning())):
+        report(await run(label, http, args))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
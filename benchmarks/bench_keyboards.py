@@ -0,0 +1,62 @@
+"""
+Step o‘tishidagi klaviatura xarajati: har safar qurish vs startup keshi.
+
+    python benchmarks/bench_keyboards.py [--number 20000]
+
+"old" – har chaqiruvda percent_keyboard() quriladi va standart AiohttpSession
+uni model_dump + json.dumps qiladi. "new" – KEYBOARDS keshidagi obyekt va
+RoshaaSession’dagi tayyor JSON.
+"""
+import argparse
+import timeit
+
+from common import ROOT  # noqa: F401  (sys.path sozlanadi)
+
+import roshaaa
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage
+
+TEXT = "Rus tilini bilish darajangizni tanlang:"
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", type=int, default=20_000)
+    args = parser.parse_args()
+
+    bot = roshaaa.bot
+    plain = AiohttpSession()
+    cached = bot.session
+
+    def build_old():
+        return roshaaa.percent_keyboard("uz")
+
+    def build_new():
+        return roshaaa.KEYBOARDS["uz"]["percent"]
+
+    def step_old():
+        method = SendMessage(chat_id=1, text=TEXT, reply_markup=roshaaa.percent_keyboard("uz"))
+        return plain.build_form_data(bot, method)
+
+    def step_new():
+        method = SendMessage(chat_id=1, text=TEXT, reply_markup=roshaaa.KEYBOARDS["uz"]["percent"])
+        return cached.build_form_data(bot, method)
+
+    # Natija bir xil bo‘lishi kerak
+    old_fields = {f[0]["name"]: f[2] for f in step_old()._fields}
+    new_fields = {f[0]["name"]: f[2] for f in step_new()._fields}
+    assert old_fields == new_fields, (old_fields, new_fields)
+
+    n = args.number
+    for label, fn in (
+        ("keyboard only, old", build_old),
+        ("keyboard only, new", build_new),
+        ("step (method + form), old", step_old),
+        ("step (method + form), new", step_new),
+    ):
+        seconds = min(timeit.repeat(fn, number=n, repeat=3))
+        print(f"{label:<28} {seconds / n * 1e6:8.2f} us/call")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+Polling va webhook rejimlari throughput’ini solishtirish (soxta Bot API’ga qarshi).
+
+    python benchmarks/bench_polling.py [--candidates 200] [--api-latency 20]
+                                       [--limit 100] [--concurrency 16] [--webhook-connections 40]
+
+Ikkala rejimda ham N ta nomzodning to‘liq arizasi (22 savol + preview + tasdiq)
+navbatda turgan holatdan boshlab qayta ishlanadi:
+
+  webhook – update’lar SimpleRequestHandler’ga HTTP POST qilinadi; Telegram kabi
+            bir vaqtda --webhook-connections ta ulanish, bitta chat ichida ketma-ket;
+  polling – update’lar FakeBotAPI navbatiga qo‘yiladi, PollingRunner getUpdates
+            (limit=--limit) bilan oladi va paketni --concurrency parallellikda bajaradi.
+
+Polling bosqichi yarmida runner almashtiriladi (restart taqlidi): yangi runner
+offset’ni fayldan o‘qiydi. Oxirida har bir update aynan bir marta
+qayta ishlanganini tekshiramiz.
+"""
+import argparse
+import asyncio
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List
+
+from common import TMP_DIR, application_updates
+
+os.environ["TG_RATE_LIMIT"] = "0"
+os.environ["POLLING_OFFSET_PATH"] = os.path.join(TMP_DIR, "polling_offset.txt")
+
+import roshaaa  # noqa: E402
+from aiogram.client.telegram import TelegramAPIServer  # noqa: E402
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler  # noqa: E402
+from aiohttp import web  # noqa: E402
+from aiohttp.test_utils import TestClient, TestServer  # noqa: E402
+from fake_bot_api import FakeBotAPI  # noqa: E402
+from polling import OffsetStore, PollingRunner  # noqa: E402
+
+processed: Counter = Counter()
+
+
+async def count_processed(handler, event, data):
+    try:
+        return await handler(event, data)
+    finally:
+        processed[event.update_id] += 1
+
+
+roshaaa.dp.update.outer_middleware(count_processed)
+
+
+def interleaved_updates(first_uid: int, candidates: int, first_update_id: int) -> List[Dict[str, Any]]:
+    """Nomzodlar update’larini navbatma-navbat aralashtiramiz; update_id – o‘suvchi."""
+    per_user = [application_updates(first_uid + i) for i in range(candidates)]
+    ordered = [u for step in zip(*per_user) for u in step]
+    for i, update in enumerate(ordered):
+        update["update_id"] = first_update_id + i
+    return ordered
+
+
+async def wait_done(total: int) -> None:
+    while len(processed) < total:
+        await asyncio.sleep(0.005)
+    while roshaaa.hr_outbox.pending():
+        await asyncio.sleep(0.01)
+
+
+async def bench_webhook(args: argparse.Namespace, updates: List[Dict[str, Any]]) -> float:
+    app = web.Application()
+    SimpleRequestHandler(dispatcher=roshaaa.dp, bot=roshaaa.bot).register(app, path="/webhook")
+    client = TestClient(TestServer(app))
+    await client.start_server()
+
+    by_chat: Dict[int, List[Dict[str, Any]]] = {}
+    for update in updates:
+        event = update.get("message") or update["callback_query"]
+        by_chat.setdefault(event["from"]["id"], []).append(update)
+    connections = asyncio.Semaphore(args.webhook_connections)
+
+    async def deliver(chat_updates: List[Dict[str, Any]]) -> None:
+        for update in chat_updates:
+            async with connections:
+                resp = await client.post("/webhook", json=update)
+                await resp.read()
+
+    processed.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(deliver(chat) for chat in by_chat.values()))
+    await wait_done(len(updates))
+    elapsed = time.perf_counter() - started
+    await client.close()
+    return elapsed
+
+
+async def bench_polling(args: argparse.Namespace, api: FakeBotAPI,
+                        updates: List[Dict[str, Any]]) -> float:
+    store = OffsetStore(roshaaa.POLLING_OFFSET_PATH)
+    for update in updates:
+        api.push_update(update)
+
+    def runner() -> PollingRunner:
+        return PollingRunner(roshaaa.dp, roshaaa.bot, store, limit=args.limit, timeout=1,
+                             concurrency=args.concurrency)
+
+    processed.clear()
+    started = time.perf_counter()
+    # Birinchi "jarayon" paketlarning yarmini bajaradi, keyin to‘xtaydi
+    first = runner()
+    first.offset = store.load()
+    while first.updates < len(updates) // 2:
+        await first.poll_once()
+    # "Restart": yangi runner offset’ni fayldan oladi
+    second = runner()
+    task = asyncio.create_task(second.run())
+    await wait_done(len(updates))
+    elapsed = time.perf_counter() - started
+    task.cancel()
+
+    duplicates = sum(1 for n in processed.values() if n > 1)
+    missing = len(updates) - len(processed)
+    assert not duplicates and not missing, f"duplicates={duplicates} missing={missing}"
+    print(f"polling    : {first.batches + second.batches} batches, restart after "
+          f"{first.updates} updates (offset {first.offset}), no duplicates/missing")
+    return elapsed
+
+
+async def run(args: argparse.Namespace) -> None:
+    api = FakeBotAPI(latency=args.api_latency / 1000)
+    base = await api.start()
+    roshaaa.bot.session.api = TelegramAPIServer.from_base(base)
+    sender = asyncio.create_task(roshaaa.hr_outbox.run_sender(roshaaa.bot))
+
+    n = args.candidates
+    webhook_updates = interleaved_updates(7_000_000, n, 1)
+    polling_updates = interleaved_updates(8_000_000, n, len(webhook_updates) + 1)
+
+    results = {}
+    results["webhook"] = await bench_webhook(args, webhook_updates)
+    results["polling"] = await bench_polling(args, api, polling_updates)
+
+    sender.cancel()
+    await roshaaa.bot.session.close()
+    await api.stop()
+
+    total = len(webhook_updates)
+    print(f"{n} applications / {total} updates per mode, API latency {args.api_latency} ms")
+    for mode, elapsed in results.items():
+        print(f"{mode:<10} : {elapsed:7.2f} s  {total / elapsed:8.1f} updates/s  "
+              f"{n / elapsed:7.2f} applications/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=200)
+    parser.add_argument("--api-latency", type=float, default=20.0, help="soxta API javob kechikishi, ms")
+    parser.add_argument("--limit", type=int, default=100, help="getUpdates paket hajmi")
+    parser.add_argument("--concurrency", type=int, default=16, help="paket ichidagi parallellik")
+    parser.add_argument("--webhook-connections", type=int, default=40,
+                        help="Telegram’ning webhook max_connections qiymati")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
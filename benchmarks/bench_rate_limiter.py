@@ -0,0 +1,76 @@
+"""
+RateLimiter: nomzodlarga javoblar HR postlaridan oldin ketishini ko‘rsatish.
+
+    python benchmarks/bench_rate_limiter.py [--candidates 100] [--hr-posts 40]
+
+Limitlar 10 barobar tezlashtirilgan (global 300/s, chat 10/s, guruh 200/min),
+Bot API esa soxta (tarmoqsiz). Bir vaqtda nomzodlarga ketma-ket xabarlar va
+HR guruhiga postlar yuboriladi; har bir ustuvorlik uchun navbatda kutish
+vaqtlari chiqariladi.
+"""
+import argparse
+import asyncio
+import time
+
+from common import NullSession, percentiles
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.methods import SendMessage, SendPhoto
+from bot_session import RateLimiter, RoshaaSession
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--messages", type=int, default=5)
+    parser.add_argument("--hr-posts", type=int, default=40)
+    args = parser.parse_args()
+
+    limiter = RateLimiter(global_rate=300, private_rate=10, private_burst=3,
+                          group_rate=200 / 60, group_burst=3)
+    # Haqiqiy HTTP o‘rniga – limiter’dan keyingi qatlam (AiohttpSession) soxta
+    null = NullSession()
+
+    async def fake_request(self, bot, method, timeout=None):
+        await asyncio.sleep(0.002)
+        return await null.make_request(bot, method, timeout)
+
+    AiohttpSession.make_request = fake_request
+    session = RoshaaSession(limiter=limiter)
+    bot = Bot("123456:BENCHMARK-TOKEN", session=session)
+
+    latencies = {"interactive": [], "bulk": []}
+
+    async def send(method, kind):
+        t0 = time.perf_counter()
+        await bot(method)
+        latencies[kind].append(time.perf_counter() - t0)
+
+    async def candidate(uid):
+        for i in range(args.messages):
+            await send(SendMessage(chat_id=uid, text=f"step {i}"), "interactive")
+
+    async def hr():
+        await asyncio.gather(*(
+            send(SendPhoto(chat_id=-100123, photo="X", caption=str(i)), "bulk")
+            for i in range(args.hr_posts)
+        ))
+
+    started = time.perf_counter()
+    await asyncio.gather(hr(), *(candidate(1000 + i) for i in range(args.candidates)))
+    elapsed = time.perf_counter() - started
+
+    print(f"{len(null.calls)} calls in {elapsed:.2f}s")
+    for kind, samples in latencies.items():
+        p = percentiles(samples)
+        print(f"{kind:>11}: n={len(samples):>4} p50={p['p50'] * 1e3:7.1f}ms "
+              f"p95={p['p95'] * 1e3:7.1f}ms p99={p['p99'] * 1e3:7.1f}ms")
+    stats = limiter.stats()
+    for kind, w in stats["wait"].items():
+        mean = w["sum"] / w["count"] if w["count"] else 0.0
+        print(f"queue wait {kind:>11}: count={w['count']} mean={mean * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,115 @@
+"""
+Nomzodlarni noaniq qidirish: trigram indeks katta hajmda.
+
+    python benchmarks/bench_search.py [--records 200000] [--repeat 50]
+
+Realistik o‘zbekcha ism-familiyalar (bir qismi kirillcha, apostroflar har xil)
+va ish joylari bilan indeks to‘ldiriladi. Yuklash vaqti, RSS o‘sishi va
+/qidirish so‘rovlari (xato yozilgan, qisman, boshqa alifboda) p50/p99 chiqariladi.
+"""
+import argparse
+import os
+import random
+import time
+
+from common import percentiles
+
+from search import TrigramIndex
+
+FIRST = [
+    "Aziz", "Bekzod", "Dilshod", "Jasur", "Sherzod", "Otabek", "Sardor", "Ulug‘bek", "Shoxrux", "Javlon",
+    "Nodir", "Rustam", "Farrux", "Akmal", "Bobur", "Sanjar", "Islom", "Temur", "Jahongir", "Murod",
+    "Dilnoza", "Gulnora", "Madina", "Nilufar", "Shahnoza", "Zarina", "Malika", "Sevara", "Nigora",
+    "O‘g‘iloy", "Feruza", "Kamola", "Mohira", "Dildora", "Sitora", "Umida", "Zilola", "Munisa", "Yulduz",
+]
+LAST = [
+    "Aliyev", "Karimov", "Rahimov", "Yusupov", "Tursunov", "Abdullayev", "Ismoilov", "Nazarov", "Xo‘jayev",
+    "Qodirov", "Sobirov", "Ergashev", "Mirzayev", "Hasanov", "Usmonov", "Jo‘rayev", "Saidov", "Toshmatov",
+    "Raxmatullayev", "Normatov", "Olimov", "G‘ulomov", "Zokirov", "Bozorov", "Sultonov", "Musayev",
+]
+PATRONYMIC = ["o‘g‘li", "qizi"]
+JOBS = [
+    "Korzinka, kassir", "Makro, sotuvchi", "Havas supermarket", "Artel, omborchi", "Uzum Market operator",
+    "Texnomart konsultant", "Beeline call-markaz", "Ucell sotuv", "Evos, ofitsiant", "Les Ailes",
+    "Mediapark", "Baraka Market", "ishlamaganman", "talaba", "O‘zbekiston temir yo‘llari",
+]
+TO_CYRILLIC = {
+    "sh": "ш", "ch": "ч", "yu": "ю", "ya": "я", "o‘": "ў", "g‘": "ғ", "a": "а", "b": "б", "d": "д", "e": "е",
+    "f": "ф", "g": "г", "h": "ҳ", "i": "и", "j": "ж", "k": "к", "l": "л", "m": "м", "n": "н", "o": "о",
+    "p": "п", "q": "қ", "r": "р", "s": "с", "t": "т", "u": "у", "v": "в", "x": "х", "y": "й", "z": "з",
+}
+
+
+def cyrillic(text: str) -> str:
+    out, i, lower = [], 0, text.lower()
+    while i < len(lower):
+        pair = lower[i:i + 2]
+        if pair in TO_CYRILLIC:
+            out.append(TO_CYRILLIC[pair])
+            i += 2
+        else:
+            out.append(TO_CYRILLIC.get(lower[i], lower[i]))
+            i += 1
+    return "".join(out).title()
+
+
+def applicant(rnd: random.Random):
+    last = rnd.choice(LAST)
+    name = f"{last}{'a' if rnd.random() < 0.4 else ''} {rnd.choice(FIRST)} {rnd.choice(FIRST)} {rnd.choice(PATRONYMIC)}"
+    roll = rnd.random()
+    if roll < 0.25:
+        name = cyrillic(name)
+    elif roll < 0.5:
+        name = name.replace("‘", rnd.choice("'`ʻ"))
+    return name, rnd.choice(JOBS)
+
+
+def rss_mib() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rnd = random.Random(11)
+    rows = [(i + 1, *applicant(rnd)) for i in range(args.records)]
+    before = rss_mib()
+    index = TrigramIndex()
+    t0 = time.perf_counter()
+    index.load(rows)
+    index.finish_load()
+    print(f"{args.records} applicants indexed in {time.perf_counter() - t0:.2f}s, "
+          f"{index.documents} documents, RSS +{rss_mib() - before:.0f} MiB")
+
+    samples = []
+    for i in range(1000):
+        rows.append((args.records + i + 1, *applicant(rnd)))
+        t0 = time.perf_counter()
+        index.add(*rows[-1])
+        samples.append(time.perf_counter() - t0)
+    print(f"{'add (on confirm)':<32} p50={percentiles(samples)['p50'] * 1e6:.0f}us")
+
+    queries = [
+        "Yusupov Sherzod", "Юсупов Шерзод", "Yusupv Shrzod", "O‘g‘iloy", "Огилой", "ogiloy xojayeva",
+        "Xo'jayeva Dilnoza", "Raxmatulayev", "korzinka", "texnomart", "Sevara",
+    ]
+    for query in queries:
+        samples = []
+        for _ in range(args.repeat):
+            t0 = time.perf_counter()
+            results = index.search(query)
+            samples.append(time.perf_counter() - t0)
+        p = percentiles(samples)
+        top = ""
+        if results:
+            app_id, field, score = results[0]
+            top = f"top {field} {score:.2f}: {rows[app_id - 1][1 if field == 'name' else 2]}"
+        print(f"{query:<20} p50={p['p50'] * 1e3:6.2f}ms p99={p['p99'] * 1e3:6.2f}ms  {len(results)} hits, {top}")
+
+
+if __name__ == "__main__":
+    main()
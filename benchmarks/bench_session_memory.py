@@ -0,0 +1,105 @@
+"""
+Sessiya boshiga xotira: eski dict vs Session (slots + kodlar).
+
+    python benchmarks/bench_session_memory.py [--sessions 100000]
+
+Telegram’dan kelgan har bir matn alohida str obyekt bo‘ladi, shuning uchun
+dict variantida tugma javoblari ham har sessiyada yangi satr sifatida yaratiladi.
+"""
+import argparse
+import tracemalloc
+
+from common import ROOT  # noqa: F401  (sys.path sozlanadi)
+
+import roshaaa
+from roshaaa import Session, Step, choice_code, level_code
+
+
+def fresh(text: str) -> str:
+    # JSON parserdan kelgandek – yangi str obyekt
+    return "".join(list(text))
+
+
+def legacy_session(i: int) -> dict:
+    return {
+        "lang": "uz",
+        "username": f"user{i}",
+        "step": "confirm",
+        "name": f"Ism Familiya {i}",
+        "birth": "01.01.1990",
+        "phone": f"+99890{i:07d}",
+        "department": fresh("Sotuv bo‘limi"),
+        "address_text": f"Toshkent, Chilonzor {i}",
+        "nationality": fresh("O‘zbek"),
+        "education": fresh("Oliy / tugallanmagan"),
+        "marital": fresh("Uylanmagan / turmush qurmagan"),
+        "habits": fresh("Zararli odatlar yo‘q"),
+        "ru_level": fresh("75"),
+        "en_level": fresh("50"),
+        "cn_level": fresh("0"),
+        "word_level": fresh("100"),
+        "excel_level": fresh("75"),
+        "onec_level": fresh("25"),
+        "source_info": fresh("Telegram reklama"),
+        "prev_job": f"Korzinka, kassir {i}",
+        "salary": "5 000 000",
+        "shift": fresh("Ertalab smena"),
+        "ref_check": "yes",
+        "photo": f"AgACAgIAAxkBAAI{i:012d}",
+    }
+
+
+def compact_session(i: int) -> Session:
+    return Session(
+        lang="uz",
+        username=f"user{i}",
+        step=Step.CONFIRM,
+        name=f"Ism Familiya {i}",
+        birth="01.01.1990",
+        phone=f"+99890{i:07d}",
+        department=choice_code(roshaaa.DEPARTMENTS, fresh("Sotuv bo‘limi")),
+        address_text=f"Toshkent, Chilonzor {i}",
+        nationality=choice_code(roshaaa.NATIONALITIES, fresh("O‘zbek")),
+        education=choice_code(roshaaa.EDUCATIONS, fresh("Oliy / tugallanmagan")),
+        marital=choice_code(roshaaa.MARITAL_STATUSES, fresh("Uylanmagan / turmush qurmagan")),
+        habits=choice_code(roshaaa.HABITS, fresh("Zararli odatlar yo‘q")),
+        ru_level=level_code(fresh("75%")),
+        en_level=level_code(fresh("50%")),
+        cn_level=level_code(fresh("0%")),
+        word_level=level_code(fresh("100%")),
+        excel_level=level_code(fresh("75%")),
+        onec_level=level_code(fresh("25%")),
+        source_info=choice_code(roshaaa.SOURCES, fresh("Telegram reklama")),
+        prev_job=f"Korzinka, kassir {i}",
+        salary="5 000 000",
+        shift=choice_code(roshaaa.SHIFTS, fresh("Ertalab smena")),
+        ref_check=True,
+        photo=f"AgACAgIAAxkBAAI{i:012d}",
+    )
+
+
+def measure(factory, n: int) -> float:
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    sessions = {i: factory(i) for i in range(n)}
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del sessions
+    return used / n
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=100_000)
+    args = parser.parse_args()
+
+    before = measure(legacy_session, args.sessions)
+    after = measure(compact_session, args.sessions)
+    print(f"sessions:          {args.sessions}")
+    print(f"dict (before):     {before:8.0f} bytes/session  ({before * args.sessions / 2**20:.1f} MB)")
+    print(f"Session (after):   {after:8.0f} bytes/session  ({after * args.sessions / 2**20:.1f} MB)")
+    print(f"saved:             {100 * (1 - after / before):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
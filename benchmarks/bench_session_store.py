@@ -0,0 +1,69 @@
+"""
+Sessiya persistensiyasining update latency’ga ta’siri.
+
+    python benchmarks/bench_session_store.py [--candidates 500]
+
+Har bir backend uchun to‘liq anketalarni haqiqiy `dp` orqali o‘tkazadi
+(tarmoqsiz NullSession bilan) va update boshiga p50/p95/p99 ni chiqaradi.
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from common import NullSession, application_updates, percentiles
+
+import roshaaa
+from aiogram.types import Update
+from sessions import SessionStore, make_backend
+
+
+async def run(kind: str, candidates: int, flush_interval: float) -> None:
+    tmp = tempfile.mkdtemp()
+    store = SessionStore(
+        make_backend(kind, os.path.join(tmp, "sessions.db")),
+        encode=roshaaa.Session.dumps,
+        decode=roshaaa.Session.loads,
+    )
+    roshaaa.user_data = store
+    bot = roshaaa.bot
+    bot.session = NullSession()
+    flusher = asyncio.create_task(store.run_maintenance(flush_interval))
+
+    scripts = [application_updates(100000 + i) for i in range(candidates)]
+    samples = []
+    started = time.perf_counter()
+    # Nomzodlarni aralashtirib yuboramiz: har "raund"da har biri bitta step
+    for step in range(len(scripts[0])):
+        for script in scripts:
+            update = Update.model_validate(script[step], context={"bot": bot})
+            t0 = time.perf_counter()
+            await roshaaa.dp.feed_update(bot, update)
+            samples.append(time.perf_counter() - t0)
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+
+    flusher.cancel()
+    await store.flush()
+    store.backend.close()
+
+    p = percentiles(samples)
+    print(
+        f"{kind:>6}: {len(samples)} updates in {elapsed:.2f}s | "
+        f"p50={p['p50'] * 1e6:.0f}us p95={p['p95'] * 1e6:.0f}us p99={p['p99'] * 1e6:.0f}us | "
+        f"flushes={store.flushes} rows={store.flushed_rows}"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=500)
+    parser.add_argument("--flush-interval", type=float, default=0.05)
+    args = parser.parse_args()
+    for kind in ("memory", "sqlite"):
+        await run(kind, args.candidates, args.flush_interval)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+"""
+WEBHOOK_MODE=reply: to‘liq ariza uchun chiquvchi HTTP so‘rovlar soni.
+
+    python benchmarks/bench_webhook_reply.py [--applications 20]
+
+Har bir rejimda (background / reply) aiohttp webhook ilovasi ko‘tariladi va
+APPLICATION_SCRIPT update’lari HTTP orqali yuboriladi. Bot API’ga ketgan
+so‘rovlar (NullSession) va webhook javobiga joylangan metodlar alohida sanaladi.
+"""
+import argparse
+import asyncio
+import time
+
+from common import NullSession, application_updates
+
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+import roshaaa
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+
+async def run(mode: str, applications: int) -> None:
+    roshaaa.WEBHOOK_MODE = mode
+    session = NullSession()
+    roshaaa.bot.session = session
+
+    app = web.Application()
+    handler = SimpleRequestHandler(
+        dispatcher=roshaaa.dp, bot=roshaaa.bot, handle_in_background=(mode != "reply")
+    )
+    handler.register(app, path="/webhook")
+
+    in_response = 0
+    updates = 0
+    started = time.perf_counter()
+    async with TestClient(TestServer(app)) as client:
+        for i in range(applications):
+            for update in application_updates(7_000_000 + i):
+                resp = await client.post("/webhook", json=update)
+                body = await resp.read()
+                updates += 1
+                if b'name="method"' in body:
+                    in_response += 1
+        # background rejimida update’lar fon task’larida – tugashini kutamiz
+        while handler._background_feed_update_tasks:
+            await asyncio.sleep(0.01)
+        while await roshaaa.hr_outbox.drain_once(roshaaa.bot) == 0:
+            pass
+    elapsed = time.perf_counter() - started
+
+    outbound = len(session.calls)
+    print(f"{mode:>10}: {updates // applications} updates/app, "
+          f"{outbound / applications:5.1f} outbound HTTPS calls/app, "
+          f"{in_response / applications:5.1f} replies in webhook response/app "
+          f"({elapsed:.2f}s for {applications} apps)")
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--applications", type=int, default=20)
+    args = parser.parse_args()
+    for mode in ("background", "reply"):
+        await run(mode, args.applications)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,126 @@
+"""Benchmarklar uchun umumiy yordamchilar: env, soxta session va update yasash."""
+import os
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+os.environ.setdefault("API_TOKEN", "123456:BENCHMARK-TOKEN")
+os.environ.setdefault("WEBHOOK_BASE_URL", "http://127.0.0.1:8000")
+# Benchmark fayllari repo ichida qolmasin
+TMP_DIR = tempfile.mkdtemp(prefix="roshaa-bench-")
+os.environ.setdefault("HR_SPOOL_PATH", os.path.join(TMP_DIR, "hr_outbox.db"))
+os.environ.setdefault("ARCHIVE_PATH", os.path.join(TMP_DIR, "applications.db"))
+
+from aiogram.client.session.base import BaseSession  # noqa: E402
+
+
+class NullSession(BaseSession):
+    """Tarmoqqa chiqmaydigan session: faqat chaqiruvlarni sanaydi."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.calls: List[str] = []
+
+    async def make_request(self, bot, method, timeout=None):
+        self.calls.append(method.__api_method__)
+        return True
+
+    async def stream_content(self, *args, **kwargs):  # pragma: no cover
+        yield b""
+
+    async def close(self) -> None:
+        pass
+
+
+_update_id = 0
+
+
+def make_update(uid: int, text: Optional[str] = None, photo: bool = False,
+                callback_data: Optional[str] = None) -> Dict[str, Any]:
+    """Telegram webhook update (dict) yasash."""
+    global _update_id
+    _update_id += 1
+    user = {"id": uid, "is_bot": False, "first_name": f"User{uid}", "username": f"user{uid}"}
+    chat = {"id": uid, "type": "private"}
+    message: Dict[str, Any] = {
+        "message_id": _update_id,
+        "date": int(time.time()),
+        "chat": chat,
+        "from": user,
+    }
+    if callback_data is not None:
+        message["photo"] = [{"file_id": "PHOTO", "file_unique_id": "P", "width": 1, "height": 1}]
+        return {
+            "update_id": _update_id,
+            "callback_query": {
+                "id": str(_update_id),
+                "from": user,
+                "chat_instance": "1",
+                "message": message,
+                "data": callback_data,
+            },
+        }
+    if photo:
+        message["photo"] = [{"file_id": f"PHOTO{uid}", "file_unique_id": "P", "width": 1, "height": 1}]
+    else:
+        message["text"] = text or ""
+    return {"update_id": _update_id, "message": message}
+
+
+# To‘liq anketa (uz): til tanlashdan tasdiqlashgacha
+APPLICATION_SCRIPT = [
+    ("text", "/start"),
+    ("text", "🇺🇿 O‘zbek"),
+    ("text", "📝 Ro‘yxatdan o‘tish"),
+    ("text", "Ali Valiyev"),
+    ("text", "01.01.1990"),
+    ("text", "+998901234567"),
+    ("text", "Kassa"),
+    ("text", "Toshkent, Chilonzor"),
+    ("text", "O‘zbek"),
+    ("text", "Oliy"),
+    ("text", "Uylanmagan / turmush qurmagan"),
+    ("text", "Zararli odatlar yo‘q"),
+    ("text", "75%"),
+    ("text", "50%"),
+    ("text", "0%"),
+    ("text", "100%"),
+    ("text", "75%"),
+    ("text", "25%"),
+    ("text", "Instagram"),
+    ("text", "Korzinka, kassir"),
+    ("text", "5 000 000"),
+    ("text", "Ertalab smena"),
+    ("text", "Ha"),
+    ("photo", None),
+    ("callback", "confirm"),
+]
+
+
+def application_updates(uid: int) -> List[Dict[str, Any]]:
+    updates = []
+    for kind, value in APPLICATION_SCRIPT:
+        if kind == "text":
+            updates.append(make_update(uid, text=value))
+        elif kind == "photo":
+            updates.append(make_update(uid, photo=True))
+        else:
+            updates.append(make_update(uid, callback_data=value))
+    return updates
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    samples = sorted(samples)
+    n = len(samples)
+    if not n:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+    def pick(q: float) -> float:
+        return samples[min(n - 1, int(q * n))]
+
+    return {"p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99)}
@@ -0,0 +1,150 @@
+"""
+Redeploy drill: arizalar oqimi o‘rtasida SIGTERM – birorta ariza yo‘qolmasligi kerak.
+
+    python benchmarks/drill_sigterm.py [--candidates 100] [--kill-after 1.5]
+                                       [--drain-timeout 20] [--api-latency 50]
+                                       [--webhook-mode background|queued|reply]
+
+Soxta Bot API ishga tushiriladi, `roshaaa.py` (A) SQLite sessiyalar bilan
+ko‘tariladi. N ta nomzod bir vaqtda to‘liq arizani yuboradi; webhook
+Telegram kabi yetkaziladi: bitta chat ichida ketma-ket, 200 bo‘lmasa yoki
+ulanib bo‘lmasa – qayta urinish. --kill-after soniyadan keyin A ga SIGTERM
+yuboriladi, u to‘xtagach o‘sha portda B ko‘tariladi (Render’dagi disk bilan
+redeploy). Oxirida har bir nomzodning HR posti kelganini tekshiramiz.
+
+Kichik --drain-timeout (masalan, 0.1) drain muddatidan keyin update’larni
+diskka qoldirib, B da qayta bajarish yo‘lini sinaydi.
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import time
+from collections import Counter
+from typing import Dict, List
+
+from common import ROOT, TMP_DIR, application_updates
+
+import aiohttp  # noqa: E402
+from bench_cold_start import free_port, read_log  # noqa: E402
+from fake_bot_api import FakeBotAPI  # noqa: E402
+
+TOKEN = "123456:DRILL-TOKEN"
+HR_CHAT_ID = -1001234567890
+
+
+async def spawn(args: argparse.Namespace, base: str, port: int, log: List[str]):
+    env = dict(
+        os.environ,
+        API_TOKEN=TOKEN,
+        HR_CHAT_ID=str(HR_CHAT_ID),
+        PORT=str(port),
+        WEBHOOK_BASE_URL=f"http://127.0.0.1:{port}",
+        WEBHOOK_MODE=args.webhook_mode,
+        TG_API_SERVER=base,
+        TG_RATE_LIMIT="0",
+        SESSION_BACKEND="sqlite",
+        SESSION_DB_PATH=os.path.join(TMP_DIR, "sessions.db"),
+        HR_SPOOL_PATH=os.path.join(TMP_DIR, "hr_outbox.db"),
+        DRAIN_SPOOL_PATH=os.path.join(TMP_DIR, "deferred_updates.json"),
+        DRAIN_TIMEOUT=str(args.drain_timeout),
+    )
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(ROOT, "roshaaa.py"),
+        cwd=TMP_DIR, env=env, stderr=asyncio.subprocess.PIPE, stdout=asyncio.subprocess.DEVNULL,
+    )
+    return proc, asyncio.create_task(read_log(proc.stderr, log))
+
+
+async def run(args: argparse.Namespace) -> int:
+    api = FakeBotAPI(latency=args.api_latency / 1000)
+    base = await api.start()
+    port = free_port()
+    url = f"http://127.0.0.1:{port}/webhook/{TOKEN}"
+    uids = [6_000_000 + i for i in range(args.candidates)]
+    statuses: Counter = Counter()
+
+    log_a: List[str] = []
+    proc_a, reader_a = await spawn(args, base, port, log_a)
+
+    async def deliver(http: aiohttp.ClientSession, uid: int) -> None:
+        for update in application_updates(uid):
+            while True:
+                try:
+                    async with http.post(url, json=update) as resp:
+                        await resp.read()
+                        statuses[resp.status] += 1
+                        if resp.status == 200:
+                            break
+                except aiohttp.ClientError:
+                    statuses["connection error"] += 1
+                await asyncio.sleep(0.05)
+
+    async with aiohttp.ClientSession() as http:
+        # A tayyor bo‘lguncha kutamiz
+        while not any("Running on" in line for line in log_a):
+            await asyncio.sleep(0.02)
+        started = time.perf_counter()
+        burst = asyncio.gather(*(deliver(http, uid) for uid in uids))
+
+        await asyncio.sleep(args.kill_after)
+        proc_a.send_signal(signal.SIGTERM)
+        killed = time.perf_counter()
+        await proc_a.wait()
+        await reader_a
+        print(f"A stopped {time.perf_counter() - killed:.2f} s after SIGTERM")
+        for line in log_a:
+            if "Drain" in line or "Replaying" in line:
+                print(f"  A: {line}")
+
+        log_b: List[str] = []
+        proc_b, reader_b = await spawn(args, base, port, log_b)
+        await burst
+        delivered = time.perf_counter() - started
+
+    def hr_posts() -> Dict[int, int]:
+        counts: Counter = Counter()
+        for method, params in api.sent:
+            if method == "sendphoto" and params.get("chat_id") == str(HR_CHAT_ID):
+                for uid in uids:
+                    if f"user{uid}" in params.get("caption", ""):
+                        counts[uid] += 1
+                        break
+        return counts
+
+    deadline = time.monotonic() + 30
+    while len(hr_posts()) < len(uids) and time.monotonic() < deadline:
+        await asyncio.sleep(0.1)
+
+    proc_b.send_signal(signal.SIGTERM)
+    await proc_b.wait()
+    await reader_b
+    await api.stop()
+    for line in log_b:
+        if "Drain" in line or "Replaying" in line:
+            print(f"  B: {line}")
+
+    posts = hr_posts()
+    lost = [uid for uid in uids if uid not in posts]
+    duplicated = sum(1 for n in posts.values() if n > 1)
+    print(f"{len(uids)} applications delivered in {delivered:.1f} s, webhook responses {dict(statuses)}")
+    print(f"HR posts: {sum(posts.values())} for {len(posts)} applicants, "
+          f"lost {len(lost)}, duplicated {duplicated}")
+    if lost:
+        print(f"LOST: {lost[:20]}")
+    return 1 if lost else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--candidates", type=int, default=100)
+    parser.add_argument("--kill-after", type=float, default=1.5, help="SIGTERM necha soniyadan keyin")
+    parser.add_argument("--drain-timeout", type=float, default=20.0)
+    parser.add_argument("--api-latency", type=float, default=50.0, help="soxta API javob kechikishi, ms")
+    parser.add_argument("--webhook-mode", choices=("background", "queued", "reply"), default="background")
+    sys.exit(asyncio.run(run(parser.parse_args())))
+
+
+if __name__ == "__main__":
+    main()
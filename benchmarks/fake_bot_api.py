@@ -0,0 +1,145 @@
+"""
+Lokal soxta Telegram Bot API serveri (aiohttp, tarmoqqa chiqmaydi).
+
+Bot’ni unga yo‘naltirish:
+
+    api = FakeBotAPI(latency=0.02)
+    base = await api.start()
+    bot.session.api = TelegramAPIServer.from_base(base)
+
+Har bir metod chaqiruvi `calls` da sanaladi; send*/edit*/copy* uchun
+haqiqiyga o‘xshash Message qaytariladi, qolganlari uchun True. Yuborilgan
+xabarlar parametrlari bilan `sent` da saqlanadi.
+getUpdates uchun `push_update()` bilan update’lar navbatga qo‘yiladi.
+"""
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Roshaa", "username": "roshaa_bench_bot"}
+
+
+class FakeBotAPI:
+    def __init__(self, latency: float = 0.0, handshake_latency: float = 0.0):
+        # Har bir javobdan oldin kutish – haqiqiy API’ning RTT’sini taqlid qilish
+        self.latency = latency
+        # Yangi ulanishdagi birinchi so‘rovga qo‘shimcha – TLS handshake taqlidi
+        self.handshake_latency = handshake_latency
+        self.calls: Counter = Counter()
+        # Yuborilgan xabarlar (metod, parametrlar) – drill’larda natijani tekshirish uchun
+        self.sent: List[Tuple[str, Dict[str, Any]]] = []
+        # Ko‘rilgan TCP ulanishlar (keep-alive / handshake benchmarklari uchun)
+        self._transports: set = set()
+        self.webhook_url = ""
+        self.webhook_allowed_updates: Optional[List[str]] = None
+        self.webhook_max_connections = 40
+        self._message_ids = itertools.count(1)
+        self._updates: List[Dict[str, Any]] = []
+        self._new_updates = asyncio.Event()
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def connections(self) -> int:
+        return len(self._transports)
+
+    @property
+    def total_calls(self) -> int:
+        return sum(self.calls.values())
+
+    def push_update(self, update: Dict[str, Any]) -> None:
+        self._updates.append(update)
+        self._new_updates.set()
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        app = web.Application(client_max_size=64 * 1024 * 1024)
+        app.router.add_post("/bot{token}/{method}", self._handle)
+        app.router.add_get("/bot{token}/{method}", self._handle)
+        self._runner = web.AppRunner(app, handle_signals=False)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        host, port = self._runner.addresses[0][:2]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        new_connection = request.transport not in self._transports
+        self._transports.add(request.transport)
+        params = dict(await request.post()) if request.can_read_body else {}
+        self.calls[method] += 1
+        delay = self.latency + (self.handshake_latency if new_connection else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+        result = await self._result(method.lower(), params)
+        return web.json_response({"ok": True, "result": result})
+
+    async def _result(self, method: str, params: Dict[str, Any]) -> Any:
+        if method.startswith(("send", "copy", "forward")) or (
+            method.startswith("edit") and "inline_message_id" not in params
+        ):
+            if not method.startswith("edit"):
+                self.sent.append((method, params))
+            return self._message(params)
+        if method == "getme":
+            return BOT_USER
+        if method == "getupdates":
+            return await self._get_updates(params)
+        if method == "setwebhook":
+            self.webhook_url = str(params.get("url", ""))
+            if "allowed_updates" in params:
+                self.webhook_allowed_updates = json.loads(params["allowed_updates"])
+            self.webhook_max_connections = int(params.get("max_connections") or 40)
+            return True
+        if method == "deletewebhook":
+            self.webhook_url = ""
+            return True
+        if method == "getwebhookinfo":
+            info: Dict[str, Any] = {
+                "url": self.webhook_url,
+                "has_custom_certificate": False,
+                "pending_update_count": len(self._updates),
+            }
+            if self.webhook_url:
+                info["max_connections"] = self.webhook_max_connections
+                if self.webhook_allowed_updates is not None:
+                    info["allowed_updates"] = self.webhook_allowed_updates
+            return info
+        return True
+
+    def _message(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        chat_id = int(params.get("chat_id") or 0)
+        message: Dict[str, Any] = {
+            "message_id": int(params.get("message_id") or next(self._message_ids)),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "supergroup"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        return message
+
+    async def _get_updates(self, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        offset = int(params.get("offset") or 0)
+        limit = int(params.get("limit") or 100)
+        timeout = float(params.get("timeout") or 0)
+        # offset’dan oldingilar tasdiqlangan – o‘chiramiz
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[:limit]
@@ -0,0 +1,68 @@
+"""
+Soak: 1M tashlab ketilgan sessiya – RSS o‘smasligi kerak.
+
+    python benchmarks/soak_sessions.py [--sessions 1000000] [--max-entries 50000]
+
+Har bir sessiya choose_language’dagi kabi dict bo‘ladi va hech qachon
+yakunlanmaydi. Soat soxta: har sessiya 1 soniyadan keyin keladi, TTL 1 soat.
+Har 100k sessiyada RSS o‘lchanadi; qizish (warmup) tugagandan keyin
+o‘sish chegaradan oshsa skript xato bilan chiqadi.
+"""
+import argparse
+import os
+import resource
+import sys
+
+from common import ROOT  # noqa: F401  (sys.path sozlanadi)
+
+from sessions import SessionStore
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        # /proc yo‘q bo‘lsa – maksimal RSS (Linux’da KB)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=1_000_000)
+    parser.add_argument("--ttl", type=float, default=3600)
+    parser.add_argument("--max-entries", type=int, default=50_000)
+    parser.add_argument("--tolerance-mb", type=float, default=8.0)
+    args = parser.parse_args()
+
+    now = [0.0]
+    store = SessionStore(ttl=args.ttl, max_entries=args.max_entries, clock=lambda: now[0])
+
+    samples = []
+    for i in range(args.sessions):
+        now[0] += 1.0
+        uid = 10_000_000 + i
+        store[uid] = {"lang": "uz", "username": f"user{i}", "step": None}
+        if (i + 1) % 100_000 == 0:
+            store.expire()
+            samples.append(rss_mb())
+            print(
+                f"{i + 1:>9} sessions | live={len(store):>6} "
+                f"evicted_ttl={store.evicted_ttl:>7} evicted_lru={store.evicted_lru:>7} "
+                f"rss={samples[-1]:.1f} MB"
+            )
+
+    # Birinchi ikki o‘lchov – qizish (store to‘lguncha)
+    steady = samples[2:] or samples
+    growth = max(steady) - min(steady)
+    print(f"RSS growth after warmup: {growth:.1f} MB (tolerance {args.tolerance_mb} MB)")
+    if growth > args.tolerance_mb:
+        print("FAIL: RSS is not flat")
+        return 1
+    print("OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""
+Stress: ko‘p foydalanuvchining aralash update’lari + ikki marta bosilgan "confirm".
+
+    python benchmarks/stress_user_locks.py [--users 300] [--no-lock]
+
+Har bir update alohida task sifatida (aiogram background rejimidagi kabi)
+darhol ishga tushiriladi, Bot API javobi esa tasodifiy kechikadi. Oxirida
+har bir nomzod HR’ga aynan bir marta yuborilgan, barcha sessiyalar
+tozalangan va lock’lar o‘chirilgan bo‘lishi kerak.
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from collections import Counter
+from contextlib import nullcontext
+
+from common import NullSession, application_updates, make_update
+
+import roshaaa
+from aiogram.types import Update
+
+
+class JitterSession(NullSession):
+    async def make_request(self, bot, method, timeout=None):
+        await asyncio.sleep(random.uniform(0, 0.005))
+        self.calls.append(method)
+        return True
+
+
+class NoLock:
+    def __call__(self, key):
+        return nullcontext()
+
+    def __len__(self) -> int:
+        return 0
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=300)
+    parser.add_argument("--no-lock", action="store_true", help="lock’siz (taqqoslash uchun)")
+    args = parser.parse_args()
+
+    random.seed(1)
+    bot = roshaaa.bot
+    bot.session = JitterSession()
+
+    if args.no_lock:
+        roshaaa.user_locks = NoLock()
+
+    scripts = []
+    for i in range(args.users):
+        uid = 500_000 + i
+        updates = application_updates(uid)
+        # Ikki marta bosilgan tasdiqlash tugmasi
+        updates.append(make_update(uid, callback_data="confirm"))
+        scripts.append(updates)
+
+    tasks = []
+    started = time.perf_counter()
+    # Update’lar foydalanuvchilar orasida aralashib keladi, lekin har bir
+    # foydalanuvchi uchun o‘z tartibida
+    cursors = [0] * len(scripts)
+    pending = list(range(len(scripts)))
+    while pending:
+        i = random.choice(pending)
+        update = Update.model_validate(scripts[i][cursors[i]], context={"bot": bot})
+        tasks.append(asyncio.create_task(roshaaa.dp.feed_update(bot, update)))
+        cursors[i] += 1
+        if cursors[i] == len(scripts[i]):
+            pending.remove(i)
+        if random.random() < 0.3:
+            await asyncio.sleep(0)
+    await asyncio.gather(*tasks)
+    # HR navbatini bo‘shatamiz (odatda buni fon vazifasi qiladi)
+    while await roshaaa.hr_outbox.drain_once(bot) is not None:
+        pass
+    elapsed = time.perf_counter() - started
+
+    hr_posts = Counter(
+        m.caption.rsplit("<code>", 1)[1].split("<", 1)[0]
+        for m in bot.session.calls
+        if type(m).__name__ == "SendPhoto" and m.chat_id == roshaaa.HR_CHAT_ID
+    )
+    duplicates = sum(1 for n in hr_posts.values() if n > 1)
+    missing = args.users - len(hr_posts)
+
+    print(f"users={args.users} updates={len(tasks)} time={elapsed:.2f}s")
+    print(f"hr posts={sum(hr_posts.values())} duplicates={duplicates} missing={missing}")
+    print(f"sessions left={len(roshaaa.user_data)} locks left={len(roshaaa.user_locks)}")
+
+    ok = duplicates == 0 and missing == 0 and len(roshaaa.user_data) == 0 and len(roshaaa.user_locks) == 0
+    print("OK" if ok else "FAIL")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,386 @@
+import asyncio
+import bisect
+import itertools
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional, Tuple, Union
+
+from aiohttp import ClientTimeout, FormData
+
+from aiogram import Bot
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import TelegramMethod
+from aiogram.types import InputFile, TelegramObject
+
+from metrics import Histogram
+
+# ================== CHIQUVCHI LIMIT (TOKEN BUCKET) ==================
+
+# Ustuvorlik: kichik son – oldin. Nomzodga javoblar HR guruhi postlaridan oldin ketadi.
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+# Navbatda kutish vaqti histogrammasi chegaralari (soniya)
+WAIT_BUCKETS = (0.001, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated", "blocked_until")
+
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = now
+        self.blocked_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Bitta token bo‘lishigacha qancha kutish kerak (0 – hozir mumkin)."""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float) -> None:
+        self._refill(now)
+        self.tokens -= 1
+
+    def idle(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until
+
+
+class RateLimiter:
+    """
+    Bot API uchun global va chat bo‘yicha token bucket limitlari.
+
+    Global limit (~30 xabar/s) barcha chiquvchi xabarlarga, chat limiti esa
+    har bir chatga alohida (shaxsiy chat ~1/s, guruh ~20/min). Kutayotgan
+    so‘rovlar ustuvorlik bo‘yicha navbatda turadi; chat limiti band bo‘lsa
+    boshqa chatlarning so‘rovlari uni kutib o‘tirmaydi.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30.0,
+        private_rate: float = 1.0,
+        private_burst: float = 3.0,
+        group_rate: float = 20 / 60,
+        group_burst: float = 3.0,
+    ):
+        now = time.monotonic()
+        self.global_bucket = TokenBucket(global_rate, global_rate, now)
+        self.private_rate = private_rate
+        self.private_burst = private_burst
+        self.group_rate = group_rate
+        self.group_burst = group_burst
+        self._chats: Dict[Hashable, TokenBucket] = {}
+        # (ustuvorlik, tartib raqami, chat_id, future) – tartiblangan ro‘yxat
+        self._waiters: List[Tuple[int, int, Hashable, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._pump_task: Optional[asyncio.Task] = None
+        # Metrika: ustuvorlik bo‘yicha navbatda kutish vaqti
+        self.wait = Histogram(
+            "roshaa_ratelimit_wait_seconds",
+            "Time outbound Bot API requests waited for a rate limit token",
+            labelnames=("priority",),
+            label_values=[(name,) for name in PRIORITY_NAMES.values()],
+            buckets=WAIT_BUCKETS,
+        )
+        self.retry_after_count = 0
+
+    @staticmethod
+    def priority_for(chat_id: Hashable) -> int:
+        # Guruh/kanal (manfiy ID yoki @username) – HR postlari, fon ishlari
+        if isinstance(chat_id, int) and chat_id > 0:
+            return PRIORITY_INTERACTIVE
+        return PRIORITY_BULK
+
+    def _bucket(self, chat_id: Hashable, now: float) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if self.priority_for(chat_id) == PRIORITY_INTERACTIVE:
+                bucket = TokenBucket(self.private_rate, self.private_burst, now)
+            else:
+                bucket = TokenBucket(self.group_rate, self.group_burst, now)
+            self._chats[chat_id] = bucket
+        return bucket
+
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def pause(self, chat_id: Optional[Hashable], seconds: float) -> None:
+        """TelegramRetryAfter: chatni (chat_id yo‘q bo‘lsa – hammasini) vaqtincha to‘xtatish."""
+        now = time.monotonic()
+        bucket = self.global_bucket if chat_id is None else self._bucket(chat_id, now)
+        bucket.blocked_until = max(bucket.blocked_until, now + seconds)
+        self.retry_after_count += 1
+
+    def _observe(self, priority: int, waited: float) -> None:
+        self.wait.observe(waited, PRIORITY_NAMES[priority])
+
+    async def acquire(self, chat_id: Hashable) -> None:
+        priority = self.priority_for(chat_id)
+        now = time.monotonic()
+        # Tez yo‘l: navbat bo‘sh va ikkala limitda token bor
+        if not self._waiters:
+            bucket = self._bucket(chat_id, now)
+            if self.global_bucket.delay(now) == 0 and bucket.delay(now) == 0:
+                self.global_bucket.take(now)
+                bucket.take(now)
+                self._observe(priority, 0.0)
+                return
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        bisect.insort(self._waiters, (priority, next(self._seq), chat_id, future),
+                      key=lambda w: (w[0], w[1]))
+        if self._pump_task is None or self._pump_task.done():
+            self._wakeup = asyncio.Event()
+            self._pump_task = asyncio.create_task(self._pump())
+        self._wakeup.set()
+        started = now
+        try:
+            await future
+        except asyncio.CancelledError:
+            self._waiters = [w for w in self._waiters if w[3] is not future]
+            raise
+        self._observe(priority, time.monotonic() - started)
+
+    async def _pump(self) -> None:
+        """Navbatdagi so‘rovlarga token tarqatuvchi vazifa."""
+        while True:
+            self._wakeup.clear()
+            now = time.monotonic()
+            sleep_for: Optional[float] = None
+            global_delay = self.global_bucket.delay(now)
+            if self._waiters and global_delay > 0:
+                sleep_for = global_delay
+            elif self._waiters:
+                granted = False
+                for i, (priority, _, chat_id, future) in enumerate(self._waiters):
+                    if future.done():
+                        continue
+                    bucket = self._bucket(chat_id, now)
+                    chat_delay = bucket.delay(now)
+                    if chat_delay == 0:
+                        self.global_bucket.take(now)
+                        bucket.take(now)
+                        del self._waiters[i]
+                        future.set_result(None)
+                        granted = True
+                        break
+                    sleep_for = chat_delay if sleep_for is None else min(sleep_for, chat_delay)
+                self._waiters = [w for w in self._waiters if not w[3].done()]
+                if granted:
+                    continue
+            if len(self._chats) > 10000:
+                self._chats = {k: b for k, b in self._chats.items() if not b.idle(now)}
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": self.queue_depth(),
+            "retry_after": self.retry_after_count,
+            "wait": {
+                name: {"count": self.wait.count(name), "sum": self.wait.sum(name)}
+                for name in PRIORITY_NAMES.values()
+            },
+        }
+
+
+def is_rate_limited(method: TelegramMethod[Any]) -> bool:
+    """Faqat xabar yuboruvchi/tahrirlovchi metodlar limitga tushadi."""
+    name = method.__api_method__
+    return name.startswith(("send", "edit", "copy", "forward"))
+
+
+# ================== HTTP ULANISHLAR HOVUZI ==================
+
+# Fayl yuklashi mumkin bo‘lgan metodlar – ular uchun alohida (uzunroq) timeout
+UPLOAD_METHODS = frozenset({
+    "sendPhoto", "sendDocument", "sendVideo", "sendAudio", "sendVoice", "sendAnimation",
+    "sendVideoNote", "sendSticker", "sendMediaGroup", "editMessageMedia", "setWebhook",
+})
+
+
+@dataclass(frozen=True)
+class HttpTuning:
+    """
+    Bot API HTTP klienti sozlamalari.
+
+    Standart aiohttp connector’i bo‘sh ulanishlarni 15 s da yopadi va DNS’ni
+    10 s keshlaydi – tinch davrdan keyingi har bir burst yangi TCP+TLS
+    handshake bilan boshlanadi. Bu yerda hovuz hajmi, keep-alive va DNS
+    keshi uzaytiriladi, timeout’lar esa ulanish/o‘qish/umumiyga bo‘linadi.
+    """
+
+    pool_size: int = 100
+    pool_size_per_host: int = 0  # 0 – cheklanmagan (hovuz umumiy chegarasi amal qiladi)
+    keepalive_timeout: float = 60.0
+    dns_cache_ttl: int = 600
+    connect_timeout: float = 5.0
+    read_timeout: float = 20.0
+    total_timeout: float = 30.0
+    upload_read_timeout: float = 60.0
+    upload_total_timeout: float = 120.0
+
+    def connector_options(self) -> Dict[str, Any]:
+        return {
+            "limit": self.pool_size,
+            "limit_per_host": self.pool_size_per_host,
+            "keepalive_timeout": self.keepalive_timeout,
+            "use_dns_cache": True,
+            "ttl_dns_cache": self.dns_cache_ttl,
+        }
+
+    def timeout(self, upload: bool = False) -> ClientTimeout:
+        return ClientTimeout(
+            total=self.upload_total_timeout if upload else self.total_timeout,
+            connect=self.connect_timeout,
+            sock_read=self.upload_read_timeout if upload else self.read_timeout,
+        )
+
+
+# ================== BOT API SESSION ==================
+
+# False bo‘lsa – flood limitda session o‘zi kutib qayta yubormaydi, TelegramRetryAfter chaqiruvchiga
+# ketadi (HR navbati qayta urinishni o‘zi rejalashtiradi)
+_inline_retry: ContextVar[bool] = ContextVar("roshaa_inline_retry", default=True)
+
+
+@contextmanager
+def no_inline_retry() -> Iterator[None]:
+    token = _inline_retry.set(False)
+    try:
+        yield
+    finally:
+        _inline_retry.reset(token)
+
+
+class RoshaaSession(AiohttpSession):
+    """
+    Bot API session: keshlangan klaviaturalarni qayta serializatsiya qilmaydi
+    va xabarlarni RateLimiter orqali yuboradi.
+
+    Standart build_form_data butun metodni model_dump() qiladi – shu jumladan
+    har safar bir xil reply_markup’ni ham. Bu yerda reply_markup keshda bo‘lsa,
+    tayyor JSON qatori to‘g‘ridan-to‘g‘ri formaga qo‘shiladi.
+    """
+
+    def __init__(
+        self,
+        limiter: Optional[RateLimiter] = None,
+        max_retry_after: float = 60.0,
+        retry_attempts: int = 2,
+        http: Optional[HttpTuning] = None,
+        **kwargs: Any,
+    ) -> None:
+        super().__init__(**kwargs)
+        self.http = http
+        if http is not None:
+            self._connector_init.update(http.connector_options())
+            self._default_timeout = http.timeout()
+            self._upload_timeout = http.timeout(upload=True)
+        # id(markup) -> tayyor JSON. Faqat bir marta yaratilgan (frozen)
+        # klaviaturalar ro‘yxatga olinadi, shuning uchun id barqaror.
+        self._markup_json: Dict[int, str] = {}
+        self.limiter = limiter
+        self.max_retry_after = max_retry_after
+        self.retry_attempts = retry_attempts
+        # (metod, soniya, xato yoki None) – har bir HTTP so‘rovdan keyin (metrikalar uchun)
+        self.observer: Optional[Callable[[str, float, Optional[BaseException]], None]] = None
+
+    def cache_markup(self, bot: Bot, markup: TelegramObject) -> TelegramObject:
+        """Klaviaturani bir marta JSON’ga aylantirib keshga qo‘yish."""
+        self._markup_json[id(markup)] = self.prepare_value(markup, bot=bot, files={})
+        return markup
+
+    def build_form_data(self, bot: Bot, method: TelegramMethod[Any]) -> FormData:
+        markup = getattr(method, "reply_markup", None)
+        cached = self._markup_json.get(id(markup)) if markup is not None else None
+        if cached is None:
+            return super().build_form_data(bot, method)
+
+        form = FormData(quote_fields=False)
+        files: Dict[str, InputFile] = {}
+        for key, value in method.model_dump(warnings=False, exclude={"reply_markup"}).items():
+            value = self.prepare_value(value, bot=bot, files=files)
+            if not value:
+                continue
+            form.add_field(key, value)
+        form.add_field("reply_markup", cached)
+        for key, value in files.items():
+            form.add_field(
+                key,
+                value.read(bot),
+                filename=value.filename or key,
+            )
+        return form
+
+    def _timeout_for(
+        self, method: TelegramMethod[Any], timeout: Optional[int]
+    ) -> Union[ClientTimeout, int, None]:
+        if self.http is None:
+            return timeout
+        if timeout is not None:
+            # Aniq berilgan timeout (masalan, getUpdates long polling) – umumiy chegara
+            return ClientTimeout(total=timeout, connect=self.http.connect_timeout)
+        if method.__api_method__ in UPLOAD_METHODS:
+            return self._upload_timeout
+        return self._default_timeout
+
+    async def _send(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None
+    ) -> Any:
+        timeout = self._timeout_for(method, timeout)
+        if self.observer is None:
+            return await super().make_request(bot, method, timeout)
+        started = time.perf_counter()
+        try:
+            result = await super().make_request(bot, method, timeout)
+        except Exception as e:
+            self.observer(method.__api_method__, time.perf_counter() - started, e)
+            raise
+        self.observer(method.__api_method__, time.perf_counter() - started, None)
+        return result
+
+    async def make_request(
+        self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None
+    ) -> Any:
+        if self.limiter is None or not is_rate_limited(method):
+            return await self._send(bot, method, timeout)
+
+        chat_id = getattr(method, "chat_id", None)
+        attempt = 0
+        while True:
+            await self.limiter.acquire(chat_id)
+            try:
+                return await self._send(bot, method, timeout)
+            except TelegramRetryAfter as e:
+                # Flood limit markazda: chatni to‘xtatib, o‘sha so‘rovni qayta yuboramiz
+                self.limiter.pause(chat_id, e.retry_after)
+                attempt += 1
+                if (not _inline_retry.get() or attempt > self.retry_attempts
+                        or e.retry_after > self.max_retry_after):
+                    raise
+                logging.warning(
+                    "%s: flood limit (chat %s), %s s dan keyin qayta",
+                    method.__api_method__, chat_id, e.retry_after,
+                )
@@ -0,0 +1,53 @@
+from operator import itemgetter
+from string import Formatter
+from typing import Callable, Dict, Iterable, Sequence
+
+# ================== KARTOCHKA SHABLONLARI ==================
+
+
+class CardTemplate:
+    """
+    Oldindan kompilyatsiya qilingan kartochka shabloni.
+
+    Manba – oddiy "{maydon}" joylari bo‘lgan matn. Kompilyatsiyada maydon nomlari
+    tekshiriladi va shablon matn bo‘laklari hamda qiymat indekslariga ajratiladi:
+    render() oldindan hisoblangan qiymatlar kortejidan (maydonlar tartibida) kerakli
+    qiymatlarni bo‘laklar orasiga qo‘yib, bitta "".join bilan matnni yig‘adi.
+    Bir xil qiymatlar bilan bir nechta shablonni (preview, HR) to‘ldirish arzon.
+    """
+
+    __slots__ = ("source", "fields", "_parts", "_pick")
+
+    def __init__(self, source: str, fields: Sequence[str]):
+        index = {name: i for i, name in enumerate(fields)}
+        # Juft o‘rinlarda matn bo‘laklari, toq o‘rinlarda – qiymatlar (render’da to‘ldiriladi)
+        parts = [""]
+        slots = []
+        for text, name, spec, conversion in Formatter().parse(source):
+            parts[-1] += text
+            if name is None:
+                continue
+            if spec or conversion:
+                raise ValueError(f"Shablonda format/konversiya qo‘llab-quvvatlanmaydi: {name}")
+            if name not in index:
+                raise KeyError(f"Shablonda noma'lum maydon: {name}")
+            slots.append(index[name])
+            parts.extend((None, ""))
+        self.source = source
+        self.fields = tuple(fields)
+        self._parts = parts
+        # itemgetter bitta indeksda kortej emas, qiymatning o‘zini qaytaradi
+        self._pick: Callable[[Sequence[str]], Sequence[str]] = (
+            itemgetter(*slots) if len(slots) > 1 else lambda values: [values[i] for i in slots]
+        )
+
+    def render(self, values: Sequence[str]) -> str:
+        parts = self._parts[:]
+        parts[1::2] = self._pick(values)
+        return "".join(parts)
+
+
+def compile_cards(sources: Dict[str, str], fields: Iterable[str]) -> Dict[str, CardTemplate]:
+    """Har bir til uchun shablonni bir marta kompilyatsiya qilish."""
+    fields = tuple(fields)
+    return {lang: CardTemplate(source, fields) for lang, source in sources.items()}
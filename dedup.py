@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# ================== TAKRORIY UPDATE’LAR (LRU) ==================
+
+
+class RecentKeys:
+    """
+    Oxirgi `maxsize` ta ko‘rilgan kalit: tekshirish va qo‘shish O(1), eng eskisi chiqarib yuboriladi.
+    Kalit bilan birga qisqa qiymat ham saqlash mumkin (masalan, foydalanuvchi tili).
+
+    `path` berilsa kalitlar SQLite’ga ham yoziladi (write-behind: flush() yoki
+    run_flusher() orqali) va restartdan keyin load() bilan tiklanadi.
+    Diskda ham faqat oxirgi `maxsize` ta qator saqlanadi.
+    """
+
+    def __init__(self, maxsize: int, path: Optional[str] = None, table: str = "recent_keys"):
+        self.maxsize = maxsize
+        self.table = table
+        # kalit -> (tartib raqami, qiymat) (eng eskisi boshida)
+        self._keys: "OrderedDict[str, Tuple[int, Optional[str]]]" = OrderedDict()
+        self._seq = 0
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table}"
+                " (key TEXT PRIMARY KEY, seq INTEGER NOT NULL, value TEXT)"
+            )
+            columns = {row[1] for row in self._conn.execute(f"PRAGMA table_info({table})")}
+            if "value" not in columns:
+                # Eski jadval (faqat key, seq) – ustunni qo‘shamiz, yozilgan kalitlar saqlanadi
+                self._conn.execute(f"ALTER TABLE {table} ADD COLUMN value TEXT")
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._keys
+
+    def add(self, key: str, value: Optional[str] = None) -> None:
+        self._seq += 1
+        self._keys[key] = (self._seq, value)
+        self._keys.move_to_end(key)
+        if self._conn is not None:
+            self._pending.append((key, self._seq, value))
+        if len(self._keys) > self.maxsize:
+            self._keys.popitem(last=False)
+
+    def seen(self, key: str) -> bool:
+        """Kalit oldin ko‘rilganmi; ko‘rilmagan bo‘lsa – qo‘shib qo‘yadi."""
+        if key in self._keys:
+            return True
+        self.add(key)
+        return False
+
+    def get(self, key: str, default: Optional[str] = None) -> Optional[str]:
+        """add() bilan saqlangan qiymat (kalit yo‘q yoki qiymatsiz bo‘lsa – default)."""
+        entry = self._keys.get(key)
+        if entry is None or entry[1] is None:
+            return default
+        return entry[1]
+
+    def discard(self, key: str) -> None:
+        """Kalitni unutish – diskdan ham (add() bilan bir navbatda), restartdan keyin qaytib kelmasin."""
+        if self._keys.pop(key, None) is not None and self._conn is not None:
+            self._pending.append((key, None, None))
+
+    # ---- persist ----
+    def load(self) -> int:
+        if self._conn is None:
+            return 0
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT key, seq, value FROM {self.table} ORDER BY seq DESC LIMIT ?",
+                (self.maxsize,),
+            ).fetchall()
+        for key, seq, value in reversed(rows):
+            self._keys[key] = (seq, value)
+        self._seq = rows[0][1] if rows else 0
+        return len(rows)
+
+    def _write(self, batch: List[tuple], oldest: int) -> None:
+        # Navbatdagi oxirgi holat: seq – yozish, None – o‘chirish (discard)
+        final = {key: (seq, value) for key, seq, value in batch}
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, seq, value) VALUES (?, ?, ?)",
+                    [(key, seq, value) for key, (seq, value) in final.items() if seq is not None],
+                )
+                self._conn.executemany(
+                    f"DELETE FROM {self.table} WHERE key = ?",
+                    [(key,) for key, (seq, _) in final.items() if seq is None],
+                )
+                self._conn.execute(f"DELETE FROM {self.table} WHERE seq < ?", (oldest,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def _take_batch(self):
+        batch, self._pending = self._pending, []
+        return batch, self._seq - self.maxsize + 1
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, oldest = self._take_batch()
+        try:
+            await asyncio.to_thread(self._write, batch, oldest)
+        except Exception:
+            self._pending[:0] = batch
+            raise
+        return len(batch)
+
+    def flush_sync(self) -> int:
+        if not self._pending:
+            return 0
+        batch, oldest = self._take_batch()
+        self._write(batch, oldest)
+        return len(batch)
+
+    async def run_flusher(self, interval: float) -> None:
+        """Fon vazifasi: har `interval` soniyada yangi kalitlarni diskka yozadi."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except Exception:
+                logging.exception("Takroriy update kalitlarini diskka yozishda xatolik")
+
+    def close(self) -> None:
+        if self._conn is not None:
+            with self._lock:
+                self._conn.close()
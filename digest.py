@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+import json
+import os
+import sys
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from archive import TASHKENT, ApplicationArchive, ApplicationFilter, day_range
+from export import RowFormatter, XlsxStream, write_table
+
+# ================== HR HISOBOTLARI (KUNLIK / HAFTALIK DIGEST) ==================
+
+# Xulosa varag‘idagi taqsimotlar: (arxiv ustuni, sarlavha)
+SUMMARY_FIELDS = (
+    ("source_info", "Kompaniya haqida qayerdan eshitgan"),
+    ("education", "Ma’lumoti"),
+    ("shift", "Smena"),
+    ("ru_level", "Rus tili"),
+    ("en_level", "Ingliz tili"),
+    ("cn_level", "Xitoy tili"),
+)
+PERIOD_TITLES = {"daily": "Kunlik hisobot", "weekly": "Haftalik hisobot"}
+# DIGEST_DIR ichida: oxirgi tuzilgan hisobotlar kuni (ISO sana) – qayta ishga tushganda o‘tkazib yuborilganlar uchun
+LAST_RUN_FILE = "last_run"
+
+
+def digest_periods(day: datetime.date, weekly_on: int) -> List[Tuple[str, datetime.date, datetime.date]]:
+    """`day` kuni tuziladigan hisobotlar: (davr, birinchi kun, oxirgi kun) – kechagi kun va (haftada bir) o‘tgan 7 kun."""
+    yesterday = day - datetime.timedelta(days=1)
+    periods = [("daily", yesterday, yesterday)]
+    if day.weekday() == weekly_on:
+        periods.append(("weekly", day - datetime.timedelta(days=7), yesterday))
+    return periods
+
+
+def next_run(now: datetime.datetime, at: datetime.time) -> datetime.datetime:
+    """`at` (Toshkent vaqti) ning `now` dan keyingi birinchi kelishi."""
+    run = datetime.datetime.combine(now.astimezone(TASHKENT).date(), at, TASHKENT)
+    return run if run > now else run + datetime.timedelta(days=1)
+
+
+def missed_days(last_done: Optional[datetime.date], now: datetime.datetime, at: datetime.time,
+                limit: int = 7) -> List[datetime.date]:
+    """
+    Bot o‘chiq paytida o‘tib ketgan hisobot kunlari (eski -> yangi, eng ko‘pi `limit` ta).
+
+    `last_done` yo‘q bo‘lsa (birinchi ishga tushish) – hech narsa: hisobotlar keyingi `at` dan boshlanadi.
+    """
+    due = (next_run(now, at) - datetime.timedelta(days=1)).date()
+    if last_done is None or last_done >= due:
+        return []
+    first = max(last_done + datetime.timedelta(days=1), due - datetime.timedelta(days=limit - 1))
+    return [first + datetime.timedelta(days=i) for i in range((due - first).days + 1)]
+
+
+def read_last_run(directory: str) -> Optional[datetime.date]:
+    try:
+        with open(os.path.join(directory, LAST_RUN_FILE)) as f:
+            return datetime.date.fromisoformat(f.read().strip())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def mark_run(directory: str, day: datetime.date) -> None:
+    path = os.path.join(directory, LAST_RUN_FILE)
+    with open(f"{path}.tmp", "w") as f:
+        f.write(day.isoformat())
+    os.replace(f"{path}.tmp", path)
+
+
+def build_digest(
+    archive_path: str,
+    out_path: str,
+    period: str,
+    first: datetime.date,
+    last: datetime.date,
+    department: int,
+    labels: Mapping[str, Sequence[str]],
+) -> Dict[str, Any]:
+    """
+    Bitta bo‘lim uchun hisobot XLSX fayli – alohida worker jarayonida bajariladi (build_digest_in_worker).
+
+    "Xulosa" varag‘i: davr, arizalar soni va SUMMARY_FIELDS bo‘yicha taqsimot;
+    "Arizalar" varag‘i: davrdagi barcha arizalar (eksportdagi ustunlar).
+    Qaytaradi: arizalar soni va worker’dagi vaqt (wall / CPU).
+    """
+    started, cpu_started = time.perf_counter(), time.process_time()
+    since, until = day_range(first, last)
+    filters = ApplicationFilter(department=department, since=since, until=until)
+    archive = ApplicationArchive(archive_path)
+    tmp = f"{out_path}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            xlsx = XlsxStream(f, sheet="Xulosa")
+            total = archive.count(filters)
+            span = f"{first:%d.%m.%Y}" if first == last else f"{first:%d.%m.%Y} – {last:%d.%m.%Y}"
+            summary: List[List[Any]] = [
+                [PERIOD_TITLES[period]],
+                ["Bo‘lim", labels["department"][department]],
+                ["Davr", span],
+                ["Arizalar", total],
+            ]
+            for column, title in SUMMARY_FIELDS:
+                summary.append([])
+                summary.append([title, "Soni"])
+                choices = labels.get(column)
+                for value, n in archive.counts(filters, column):
+                    if value is None:
+                        label = "—"
+                    elif choices is not None and isinstance(value, int):
+                        label = choices[value]
+                    else:
+                        label = str(value)
+                    summary.append([label, n])
+            xlsx.append_rows(summary)
+            xlsx.add_sheet("Arizalar")
+            write_table(xlsx, archive, filters, RowFormatter(labels))
+            xlsx.close()
+        os.replace(tmp, out_path)
+    finally:
+        archive.close()
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return {
+        "rows": total,
+        "seconds": time.perf_counter() - started,
+        "cpu_seconds": time.process_time() - cpu_started,
+    }
+
+
+async def build_digest_in_worker(
+    archive_path: str,
+    out_path: str,
+    period: str,
+    first: datetime.date,
+    last: datetime.date,
+    department: int,
+    labels: Mapping[str, Sequence[str]],
+) -> Dict[str, Any]:
+    """
+    build_digest() – alohida jarayonda: python digest.py <JSON>, natija stdout’da.
+
+    Toza interpreter (fork emas): bot jarayonining SQLite ulanishlari va
+    thread’lari meros qolmaydi, bitta worker yiqilsa faqat shu vazifa xato bo‘ladi.
+    """
+    spec = json.dumps({
+        "archive_path": archive_path, "out_path": out_path, "period": period,
+        "first": first.isoformat(), "last": last.isoformat(),
+        "department": department, "labels": labels,
+    }, ensure_ascii=False)
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.abspath(__file__), spec,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    try:
+        out, _ = await proc.communicate()
+    finally:
+        # Vazifa bekor qilinsa (server to‘xtasa) – worker ham to‘xtaydi
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"digest worker exited with code {proc.returncode}")
+    return json.loads(out)
+
+
+def _worker_main(argv: List[str]) -> None:
+    """Worker jarayoni: python digest.py <JSON: build_digest argumentlari> – natija JSON stdout’ga."""
+    spec = json.loads(argv[0])
+    spec["first"] = datetime.date.fromisoformat(spec["first"])
+    spec["last"] = datetime.date.fromisoformat(spec["last"])
+    json.dump(build_digest(**spec), sys.stdout)
+
+
+def remove_old(directory: str, keep_days: float, now: Optional[float] = None) -> int:
+    """Yuborib bo‘lingan eski hisobot fayllarini o‘chirish; qaytaradi: o‘chirilganlar soni."""
+    cutoff = (now if now is not None else time.time()) - keep_days * 86400
+    removed = 0
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(".xlsx") and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
+            removed += 1
+    return removed
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1:])
@@ -0,0 +1,173 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Set, Tuple
+
+from aiohttp import web
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+
+# ================== GRACEFUL DRAIN (SIGTERM) ==================
+
+
+class Drainer:
+    """
+    To‘xtash paytida qabul qilingan update’larni yo‘qotmaslik.
+
+    accept_middleware (eng tashqi) dispatcher’ga kirgan har bir update’ni
+    kuzatadi, start_middleware (foydalanuvchi lock’i olingach) uni "boshlangan"
+    deb belgilaydi. drain() yangi so‘rovlarni rad etadi va kuzatilayotgan
+    update’lar tugashini muddatgacha kutadi. Muddat o‘tgach hali boshlanmagan
+    update’lar handler’siz diskka yoziladi va keyingi ishga tushishda qayta
+    bajariladi; muddatdan keyin ham tugamagan handler’lar bekor qilinadi.
+    """
+
+    def __init__(self, spool_path: str):
+        self.spool_path = spool_path
+        self.closing = False
+        self.deferring = False
+        # update_id -> (update, uni bajarayotgan task)
+        self._updates: Dict[int, Tuple[Update, asyncio.Task]] = {}
+        self._started: Set[int] = set()
+        self._deferred: List[Dict[str, Any]] = []
+        # Drain paytida hisobga olinadigan qo‘shimcha navbatlar (masalan, queued webhook)
+        self._sources: List[Callable[[], int]] = []
+        self._leftovers: List[Callable[[], List[Update]]] = []
+        self.drained = 0
+        self.cut_off = 0
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._updates)
+
+    def add_source(self, pending: Callable[[], int], leftovers: Callable[[], List[Update]]) -> None:
+        """Dispatcher’ga hali yetib bormagan update’lar navbati: soni va to‘xtaganda qolganlari."""
+        self._sources.append(pending)
+        self._leftovers.append(leftovers)
+
+    def busy(self) -> bool:
+        return bool(self._updates) or any(pending() for pending in self._sources)
+
+    def _defer(self, update: Update) -> None:
+        self._deferred.append(update.model_dump(mode="json", by_alias=True, exclude_none=True))
+
+    # ---- middleware’lar ----
+    async def accept_middleware(self, handler, event: Update, data):
+        update_id = event.update_id
+        self._updates[update_id] = (event, asyncio.current_task())
+        finished = False
+        try:
+            result = await handler(event, data)
+            finished = True
+            return result
+        except asyncio.CancelledError:
+            if update_id in self._started:
+                self.cut_off += 1
+                logging.warning("Drain: update %s handler o‘rtasida to‘xtatildi", update_id)
+            else:
+                self._defer(event)
+            raise
+        finally:
+            self._updates.pop(update_id, None)
+            started = update_id in self._started
+            self._started.discard(update_id)
+            if finished and started and self.closing:
+                self.drained += 1
+
+    async def start_middleware(self, handler, event: Update, data):
+        if self.deferring:
+            self._defer(event)
+            return None
+        self._started.add(event.update_id)
+        return await handler(event, data)
+
+    @web.middleware
+    async def reject_middleware(self, request: web.Request, handler):
+        # To‘xtayotganda yangi webhook update’lari 503 oladi – Telegram ularni keyingi instansiyaga qayta yuboradi
+        if self.closing and request.method == "POST":
+            return web.Response(status=503, text="Shutting down")
+        return await handler(request)
+
+    # ---- to‘xtash ----
+    async def drain(self, timeout: float, grace: float = 1.0) -> float:
+        """Update’larni `timeout` gacha kutadi, qolganini diskka yozadi. Qaytaradi: sarflangan vaqt."""
+        started = time.monotonic()
+        deadline = started + timeout
+        self.closing = True
+        # Shu paytgacha yaratilgan fon task’lari dispatcher’ga kirib olsin
+        await asyncio.sleep(0)
+        while self.busy() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+
+        if self.busy():
+            # Navbatdagilar endi handler’siz diskka o‘tadi; ishlayotganlarga qisqa muhlat
+            self.deferring = True
+            grace_deadline = time.monotonic() + grace
+            while self.busy() and time.monotonic() < grace_deadline:
+                await asyncio.sleep(0.05)
+            tasks = {task for _, task in self._updates.values()}
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.wait(tasks, timeout=grace)
+
+        for leftovers in self._leftovers:
+            for update in leftovers():
+                self._defer(update)
+        await asyncio.to_thread(self.save)
+        return time.monotonic() - started
+
+    @property
+    def deferred(self) -> int:
+        return len(self._deferred)
+
+    # ---- diskdagi update’lar ----
+    def save(self) -> None:
+        if not self._deferred:
+            if os.path.exists(self.spool_path):
+                os.remove(self.spool_path)
+            return
+        tmp = f"{self.spool_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._deferred, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.spool_path)
+
+    def load(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.spool_path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+
+    def replay(self, dispatcher: Dispatcher, bot: Bot, updates: List[Dict[str, Any]]) -> asyncio.Task:
+        """
+        Oldingi instansiyadan qolgan update’larni bajarish.
+
+        Task’lar shu zahoti (port ochilishidan oldin) yaratiladi – ular foydalanuvchi
+        lock’ini yangi update’lardan oldin oladi, shuning uchun har bir chatda tartib saqlanadi.
+        """
+
+        async def feed(raw: Dict[str, Any]) -> None:
+            try:
+                update = Update.model_validate(raw, context={"bot": bot})
+                result = await dispatcher.feed_update(bot, update)
+                if isinstance(result, TelegramMethod):
+                    await dispatcher.silent_call_request(bot=bot, result=result)
+            except Exception:
+                logging.exception("Qoldirilgan update %s ni bajarishda xatolik", raw.get("update_id"))
+
+        tasks = [asyncio.create_task(feed(raw)) for raw in updates]
+
+        async def finish() -> None:
+            await asyncio.gather(*tasks, return_exceptions=True)
+            if not self.closing:
+                # Hammasi bajarildi – fayl endi kerak emas (to‘xtash paytida save() uni qayta yozadi)
+                await asyncio.to_thread(self.save)
+
+        return asyncio.create_task(finish())
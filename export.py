@@ -0,0 +1,336 @@
+import asyncio
+import csv
+import datetime
+import io
+import json
+import logging
+import os
+import re
+import sys
+import zipfile
+from dataclasses import asdict
+from functools import lru_cache
+from typing import IO, Any, BinaryIO, Callable, Dict, List, Mapping, Optional, Sequence
+
+from aiohttp import web
+
+from archive import COLUMNS, TASHKENT, ApplicationArchive, ApplicationFilter
+from metrics import bearer_authorized
+
+# ================== ARIZALARNI EKSPORT QILISH (CSV / XLSX) ==================
+
+# (arxiv ustuni, jadval sarlavhasi); rasm (file_id) eksportga kirmaydi
+EXPORT_COLUMNS = (
+    ("id", "№"),
+    ("submitted", "Sana"),
+    ("uid", "Telegram ID"),
+    ("username", "Username"),
+    ("name", "F.I.Sh"),
+    ("birth", "Tug‘ilgan sana"),
+    ("phone", "Telefon"),
+    ("department", "Bo‘lim"),
+    ("address_text", "Manzil"),
+    ("nationality", "Millat"),
+    ("education", "Ma’lumoti"),
+    ("marital", "Oilaviy holat"),
+    ("habits", "Zararli odatlar"),
+    ("ru_level", "Rus tili"),
+    ("en_level", "Ingliz tili"),
+    ("cn_level", "Xitoy tili"),
+    ("word_level", "Word"),
+    ("excel_level", "Excel"),
+    ("onec_level", "1C"),
+    ("source_info", "Manba"),
+    ("prev_job", "Avvalgi ish joyi"),
+    ("salary", "Ish haqi"),
+    ("shift", "Smena"),
+    ("ref_check", "Surishtirishga ruxsat"),
+)
+HEADERS = [title for _, title in EXPORT_COLUMNS]
+_INDEX = {name: i for i, name in enumerate(COLUMNS)}
+# Excel shu belgilar bilan boshlangan katakni formula deb bajaradi (CSV/formula injection)
+_FORMULA_START = ("=", "+", "-", "@", "\t", "\r")
+
+
+def escape_formula(value: str) -> str:
+    """Nomzod yozgan matn formula bo‘lib ishlamasin: oldiga ' qo‘shiladi (Excel uni ko‘rsatmaydi)."""
+    return "'" + value if value.startswith(_FORMULA_START) else value
+
+
+class RowFormatter:
+    """
+    Arxiv qatori (COLUMNS tartibidagi tuple) -> jadval qiymatlari.
+
+    `labels` – tanlov maydoni -> tugma matnlari (kod bo‘yicha); bot jadvallaridan
+    keladi va worker jarayoniga JSON bo‘lib uzatiladi.
+    """
+
+    def __init__(self, labels: Mapping[str, Sequence[str]]):
+        self.labels = labels
+        self._columns = [(name, _INDEX[name], labels.get(name)) for name, _ in EXPORT_COLUMNS]
+
+    def __call__(self, row: tuple) -> List[Any]:
+        values: List[Any] = []
+        for name, index, labels in self._columns:
+            value = row[index]
+            if value is None:
+                values.append("")
+            elif name == "submitted":
+                values.append(f"{datetime.datetime.fromtimestamp(value, TASHKENT):%d.%m.%Y %H:%M}")
+            elif labels is not None and isinstance(value, int):
+                values.append(escape_formula(labels[value]))
+            elif isinstance(value, str):
+                values.append(escape_formula(value))
+            else:
+                values.append(value)
+        return values
+
+
+def csv_chunk(rows: Sequence[tuple], formatter: RowFormatter, header: bool = False) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(HEADERS)
+    writer.writerows(formatter(row) for row in rows)
+    data = buffer.getvalue().encode("utf-8")
+    # BOM – Excel kirill va o‘zbek harflarini to‘g‘ri ochishi uchun
+    return b"\xef\xbb\xbf" + data if header else data
+
+
+# ---- XLSX: minimal SpreadsheetML, zip’ga oqim bilan yoziladi ----
+
+_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    "{sheets}</Types>"
+)
+_CONTENT_TYPE_SHEET = (
+    '<Override PartName="/xl/worksheets/sheet{n}.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+)
+_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="xl/workbook.xml"/>'
+    "</Relationships>"
+)
+_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    "<sheets>{sheets}</sheets></workbook>"
+)
+_WORKBOOK_SHEET = '<sheet name="{name}" sheetId="{n}" r:id="rId{n}"/>'
+_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    "{sheets}</Relationships>"
+)
+_WORKBOOK_REL = (
+    '<Relationship Id="rId{n}" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+    'Target="worksheets/sheet{n}.xml"/>'
+)
+_SHEET_HEAD = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+)
+_SHEET_TAIL = "</sheetData></worksheet>"
+# XML 1.0 da ruxsat etilmagan boshqaruv belgilari (foydalanuvchi matnida bo‘lishi mumkin)
+_XML_ILLEGAL = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def _text(value: str) -> str:
+    return _XML_ILLEGAL.sub("", value).replace("&", "&amp;").replace("<", "&lt;").replace(">", "&gt;")
+
+
+@lru_cache(maxsize=4096)
+def _text_cell(value: str) -> str:
+    # Tanlov matnlari, sana va shu kabilar ko‘p takrorlanadi – tayyor katak keshdan olinadi
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{_text(value)}</t></is></c>'
+
+
+def _cell(value: Any) -> str:
+    if type(value) is int:
+        return f"<c><v>{value}</v></c>"
+    return _text_cell(str(value))
+
+
+class XlsxStream:
+    """
+    XLSX’ni oqim bilan yozish: qatorlar kelishi bilan siqilib `out` ga ketadi.
+
+    `out` seek qilinmaydigan bo‘lishi mumkin (pipe) – zipfile data descriptor
+    ishlatadi. Satrlar inlineStr: sharedStrings jadvali xotirada yig‘ilmaydi.
+    Varaqlar ketma-ket yoziladi: add_sheet() oldingisini yopadi.
+    """
+
+    def __init__(self, out: BinaryIO, sheet: Optional[str] = "Arizalar"):
+        self._zip = zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED, compresslevel=1)
+        self._sheets: List[str] = []
+        self._sheet: Optional[IO[bytes]] = None
+        if sheet is not None:
+            self.add_sheet(sheet)
+
+    def _end_sheet(self) -> None:
+        if self._sheet is not None:
+            self._sheet.write(_SHEET_TAIL.encode())
+            self._sheet.close()
+            self._sheet = None
+
+    def add_sheet(self, name: str) -> None:
+        self._end_sheet()
+        self._sheets.append(name)
+        self._sheet = self._zip.open(f"xl/worksheets/sheet{len(self._sheets)}.xml", "w", force_zip64=True)
+        self._sheet.write(_SHEET_HEAD.encode())
+
+    def append_rows(self, rows: Sequence[Sequence[Any]]) -> None:
+        self._sheet.write(
+            "".join("<row>" + "".join(map(_cell, row)) + "</row>" for row in rows).encode("utf-8")
+        )
+
+    def close(self) -> None:
+        self._end_sheet()
+        numbered = list(enumerate(self._sheets, 1))
+        self._zip.writestr("[Content_Types].xml", _CONTENT_TYPES.format(
+            sheets="".join(_CONTENT_TYPE_SHEET.format(n=n) for n, _ in numbered)))
+        self._zip.writestr("_rels/.rels", _ROOT_RELS)
+        self._zip.writestr("xl/workbook.xml", _WORKBOOK.format(sheets="".join(
+            _WORKBOOK_SHEET.format(n=n, name=_text(name)) for n, name in numbered)))
+        self._zip.writestr("xl/_rels/workbook.xml.rels", _WORKBOOK_RELS.format(
+            sheets="".join(_WORKBOOK_REL.format(n=n) for n, _ in numbered)))
+        self._zip.close()
+
+
+def write_table(xlsx: XlsxStream, archive: ApplicationArchive, filters: ApplicationFilter,
+                formatter: RowFormatter, batch: int = 1000) -> int:
+    """Joriy varaqqa sarlavha va filtrga mos barcha arizalar; qaytaradi: qatorlar soni."""
+    xlsx.append_rows([HEADERS])
+    count = 0
+    rows: List[List[Any]] = []
+    for row in archive.iter_rows(filters, batch):
+        rows.append(formatter(row))
+        if len(rows) >= batch:
+            xlsx.append_rows(rows)
+            count += len(rows)
+            rows.clear()
+    xlsx.append_rows(rows)
+    return count + len(rows)
+
+
+def write_xlsx(archive: ApplicationArchive, filters: ApplicationFilter, formatter: RowFormatter,
+               out: BinaryIO, batch: int = 1000) -> None:
+    xlsx = XlsxStream(out)
+    write_table(xlsx, archive, filters, formatter, batch)
+    xlsx.close()
+    out.flush()
+
+
+def _worker_main(argv: List[str]) -> None:
+    """Worker jarayoni: python export.py <arxiv yo‘li> <JSON: filtrlar va yorliqlar> – XLSX stdout’ga."""
+    path, raw = argv
+    spec = json.loads(raw)
+    archive = ApplicationArchive(path)
+    try:
+        write_xlsx(archive, ApplicationFilter(**spec["filters"]), RowFormatter(spec["labels"]),
+                   sys.stdout.buffer)
+    finally:
+        archive.close()
+
+
+# ---- aiohttp handler ----
+
+def export_handler(
+    archive: ApplicationArchive,
+    token: str,
+    parse_filter: Callable[[Mapping[str, str]], ApplicationFilter],
+    labels: Dict[str, Sequence[str]],
+    batch: int = 1000,
+    xlsx_workers: int = 2,
+):
+    """
+    aiohttp handler: GET ?format=csv|xlsx&<filtrlar> – arizalar chunked javobda.
+
+    CSV event loop’da (partiyalar thread’da o‘qiladi va formatlanadi), XLSX –
+    alohida jarayonda; ikkalasida ham bir vaqtda xotirada bitta partiya turadi.
+    """
+    formatter = RowFormatter(labels)
+    workers = asyncio.Semaphore(xlsx_workers)
+
+    async def handle(request: web.Request) -> web.StreamResponse:
+        if not bearer_authorized(request, token):
+            return web.Response(status=401, text="Unauthorized")
+        kind = request.query.get("format", "csv")
+        if kind not in ("csv", "xlsx"):
+            return web.Response(status=400, text="format must be csv or xlsx")
+        try:
+            filters = parse_filter(
+                {key: value for key, value in request.query.items() if key != "format"}
+            )
+        except ValueError as e:
+            return web.Response(status=400, text=str(e))
+
+        stamp = datetime.datetime.now(TASHKENT).strftime("%Y%m%d-%H%M")
+        response = web.StreamResponse(headers={
+            "Content-Disposition": f'attachment; filename="arizalar-{stamp}.{kind}"',
+            "Content-Type": "text/csv; charset=utf-8" if kind == "csv" else
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        })
+        response.enable_chunked_encoding()
+        await response.prepare(request)
+        if kind == "csv":
+            await stream_csv(response, filters)
+        else:
+            async with workers:
+                complete = await stream_xlsx(response, filters)
+            if not complete:
+                # 200 allaqachon ketgan – oxirgi chunk’siz ulanishni uzamiz: mijozda yuklab olish
+                # xato bilan tugaydi, yarim .xlsx fayl "tayyor" bo‘lib qolmaydi
+                request.transport.close()
+                return response
+        await response.write_eof()
+        return response
+
+    async def stream_csv(response: web.StreamResponse, filters: ApplicationFilter) -> None:
+        def next_chunk(after_id: int):
+            rows = archive.scan(filters, after_id, batch)
+            return csv_chunk(rows, formatter, header=after_id == 0), rows[-1][0] if rows else None, len(rows)
+
+        after_id = 0
+        while True:
+            chunk, last_id, count = await asyncio.to_thread(next_chunk, after_id)
+            await response.write(chunk)
+            if count < batch:
+                return
+            after_id = last_id
+
+    async def stream_xlsx(response: web.StreamResponse, filters: ApplicationFilter) -> bool:
+        spec = json.dumps({"filters": asdict(filters), "labels": labels}, ensure_ascii=False)
+        proc = await asyncio.create_subprocess_exec(
+            sys.executable, os.path.abspath(__file__), archive.path, spec,
+            stdout=asyncio.subprocess.PIPE,
+        )
+        try:
+            while chunk := await proc.stdout.read(1 << 16):
+                await response.write(chunk)
+            if await proc.wait() != 0:
+                logging.error(f"XLSX eksport jarayoni {proc.returncode} kodi bilan tugadi")
+                return False
+            return True
+        finally:
+            # Mijoz uzilsa yoki server to‘xtasa – worker ham to‘xtaydi
+            if proc.returncode is None:
+                proc.kill()
+                await proc.wait()
+
+    return handle
+
+
+if __name__ == "__main__":
+    _worker_main(sys.argv[1:])
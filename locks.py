@@ -0,0 +1,41 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Hashable, List
+
+# ================== KALIT BO‘YICHA LOCK’LAR ==================
+
+
+class KeyedLock:
+    """
+    Har bir kalit (masalan, user_id) uchun alohida asyncio.Lock.
+
+    Bir foydalanuvchining update’lari qat’iy navbat bilan (FIFO) bajariladi,
+    turli foydalanuvchilar esa bir-birini kutmaydi. Lock faqat kimdir uni
+    ushlab turgan yoki kutayotgan paytda mavjud – bo‘shagach darhol o‘chiriladi,
+    shuning uchun xotira faol foydalanuvchilar soniga proporsional.
+    """
+
+    def __init__(self) -> None:
+        # key -> [lock, egalar/kutayotganlar soni]
+        self._entries: Dict[Hashable, List] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def waiting(self) -> int:
+        """Lock kutayotgan (hali bajarilmayotgan) vazifalar soni."""
+        return sum(entry[1] - 1 for entry in self._entries.values())
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._entries[key]
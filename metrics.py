@@ -0,0 +1,190 @@
+import bisect
+import hmac
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+# ================== PROMETHEUS METRIKALARI ==================
+
+# Sekundlarda kechikish uchun standart chegaralar
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """
+    Oldindan ajratilgan label kombinatsiyalari bilan metrika.
+
+    Barcha label qiymatlari yaratishda beriladi – hot path’da faqat lug‘atdan
+    olish va qo‘shish. Noma’lum kombinatsiya KeyError beradi, shuning uchun
+    foydalanuvchi ma’lumotidan kelgan label’lar seriyalarni ko‘paytirib yubora olmaydi.
+    """
+
+    type = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 label_values: Iterable[Labels] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        keys = [tuple(v) for v in label_values] if self.labelnames else [()]
+        for key in keys:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{name}: label soni mos emas: {key}")
+        self._keys: List[Labels] = keys
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        head = f"# HELP {self.name} {self.help}\n# TYPE {self.name} {self.type}\n"
+        return head + "".join(line + "\n" for line in self.samples())
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: Dict[Labels, float] = {key: 0 for key in self._keys}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        self._values[labels] += amount
+
+    def value(self, *labels: str) -> float:
+        return self._values[labels]
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class Gauge(Metric):
+    """Qiymati qo‘lda o‘rnatiladigan yoki scrape paytida `fn` orqali o‘qiladigan gauge."""
+
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, fn: Optional[Callable[[], float]] = None,
+                 labelnames: Sequence[str] = (), label_values: Iterable[Labels] = ()):
+        super().__init__(name, help, labelnames, label_values)
+        self._fn = fn
+        self._values: Dict[Labels, float] = {key: 0 for key in self._keys}
+
+    def set(self, value: float, *labels: str) -> None:
+        self._values[labels] = value
+
+    def value(self, *labels: str) -> float:
+        return self._values[labels]
+
+    def samples(self) -> List[str]:
+        if self._fn is not None:
+            return [f"{self.name} {_format_value(self._fn())}"]
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self._values.items()
+        ]
+
+
+class CounterFunc(Gauge):
+    """Boshqa obyektda saqlanadigan hisoblagichni (masalan, outbox.sent) scrape paytida o‘qish."""
+
+    type = "counter"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (),
+                 label_values: Iterable[Labels] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames, label_values)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # key -> [har bir bucket soni (kumulyativ emas)..., yig‘indi]
+        self._series: Dict[Labels, List[float]] = {
+            key: [0] * len(self.buckets) + [0.0] for key in self._keys
+        }
+
+    def observe(self, value: float, *labels: str) -> None:
+        series = self._series[labels]
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        return int(sum(self._series[labels][:-1]))
+
+    def sum(self, *labels: str) -> float:
+        return self._series[labels][-1]
+
+    def samples(self) -> List[str]:
+        lines = []
+        for key, series in self._series.items():
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {int(cumulative)}"
+                )
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{labels} {int(cumulative)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: List[Metric] = []
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self._metrics)
+
+
+def bearer_authorized(request: web.Request, token: str) -> bool:
+    """
+    "Authorization: Bearer <token>" tekshiruvi (/metrics, profiler, eksport uchun umumiy).
+
+    Token faqat sarlavhada qabul qilinadi – query string’dagi token aiohttp
+    access log’iga (so‘rov qatori bilan) tushib qoladi.
+    """
+    return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {token}")
+
+
+def metrics_handler(registry: Registry, token: Optional[str] = None):
+    """aiohttp handler: Prometheus text formatida. `token` berilsa – Bearer talab qilinadi."""
+
+    async def handle(request: web.Request) -> web.Response:
+        if token and not bearer_authorized(request, token):
+            return web.Response(status=401, text="Unauthorized")
+        return web.Response(
+            text=registry.render(),
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"X-Content-Type-Options": "nosniff"},
+        )
+
+    return handle
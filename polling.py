@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+from typing import List, Optional
+
+from aiogram import Bot, Dispatcher
+from aiogram.methods import GetUpdates, TelegramMethod
+from aiogram.types import Update
+
+# ================== LONG POLLING ==================
+
+
+class OffsetStore:
+    """getUpdates offset’ini faylda saqlash (atomar: vaqtinchalik fayl + os.replace)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def load(self) -> Optional[int]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return int(f.read().strip())
+        except FileNotFoundError:
+            return None
+        except ValueError:
+            logging.warning("Polling offset fayli buzilgan: %s", self.path)
+            return None
+
+    def save(self, offset: int) -> None:
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+
+class PollingRunner:
+    """
+    getUpdates orqali update’larni paket-paket (limit=100) olib, o‘sha `dp` da qayta ishlaydi.
+
+    Paket ichida update’lar cheklangan parallellikda bajariladi (bir foydalanuvchi
+    tartibi serialize_per_user lock’i bilan saqlanadi). Keyingi getUpdates
+    faqat paket to‘liq tugagach va offset diskka yozilgach chaqiriladi: Telegram
+    update’ni keyingi offset bilan so‘ralganda o‘chiradi, shuning uchun
+    qayta ishlanmagan update hech qachon tasdiqlanmaydi, restartdan keyin esa
+    saqlangan offset’dan davom etiladi.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        offset_store: OffsetStore,
+        limit: int = 100,
+        timeout: int = 25,
+        concurrency: int = 16,
+        allowed_updates: Optional[List[str]] = None,
+        backoff_max: float = 30.0,
+    ):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.offset_store = offset_store
+        self.limit = limit
+        self.timeout = timeout
+        self.allowed_updates = allowed_updates
+        self.backoff_max = backoff_max
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.offset: Optional[int] = None
+        self.running = False
+        self.stopping = False
+        self._fetch: Optional[asyncio.Future] = None
+        self.batches = 0
+        self.updates = 0
+        self.in_flight = 0
+
+    async def _process(self, update: Update) -> None:
+        async with self._semaphore:
+            self.in_flight += 1
+            try:
+                result = await self.dispatcher.feed_update(self.bot, update)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=self.bot, result=result)
+            except Exception:
+                logging.exception("Update %s ni qayta ishlashda xatolik", update.update_id)
+            finally:
+                self.in_flight -= 1
+
+    async def poll_once(self) -> int:
+        """Bitta getUpdates + paketni qayta ishlash + offset’ni saqlash. Qaytaradi: update’lar soni."""
+        self._fetch = asyncio.ensure_future(self.bot(
+            GetUpdates(
+                offset=self.offset,
+                limit=self.limit,
+                timeout=self.timeout,
+                allowed_updates=self.allowed_updates,
+            ),
+            request_timeout=self.timeout + 10,
+        ))
+        try:
+            updates = await self._fetch
+        finally:
+            self._fetch = None
+        if not updates:
+            return 0
+        # Drain bitta update’ni bekor qilsa ham paket yakunlanadi va offset saqlanadi
+        await asyncio.gather(*(self._process(update) for update in updates), return_exceptions=True)
+        self.offset = updates[-1].update_id + 1
+        await asyncio.to_thread(self.offset_store.save, self.offset)
+        self.batches += 1
+        self.updates += len(updates)
+        return len(updates)
+
+    async def run(self) -> None:
+        """Fon vazifasi: to‘xtatilguncha (cancel) polling."""
+        self.offset = await asyncio.to_thread(self.offset_store.load)
+        logging.info("Polling boshlandi (offset=%s)", self.offset)
+        self.running = True
+        backoff = 1.0
+        try:
+            while not self.stopping:
+                try:
+                    await self.poll_once()
+                    backoff = 1.0
+                except asyncio.CancelledError:
+                    # stop() faqat getUpdates’ni bekor qildi – task’ning o‘zi emas
+                    if self.stopping and not asyncio.current_task().cancelling():
+                        break
+                    raise
+                except Exception as e:
+                    logging.warning("getUpdates xatolik, %.0f s dan keyin qayta: %s", backoff, e)
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, self.backoff_max)
+        finally:
+            self.running = False
+        logging.info("Polling to‘xtadi (offset=%s)", self.offset)
+
+    def stop(self) -> None:
+        """Yangi getUpdates so‘ralmaydi; joriy paket tugab, offset saqlangach run() qaytadi."""
+        self.stopping = True
+        if self._fetch is not None:
+            self._fetch.cancel()
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from types import CodeType, FrameType
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+from metrics import bearer_authorized
+
+# ================== SAMPLING PROFILER ==================
+
+
+class StackSampler:
+    """
+    Berilgan oqimning (event loop) stekini fon oqimidan har `interval` soniyada o‘qiydi.
+
+    Natija – flamegraph.pl / speedscope tushunadigan "collapsed stacks" matni:
+    har qatorda "tashqi;...;ichki soni". Sampler faqat profil oynasi davomida
+    ishlaydi – qolgan vaqtda hech qanday xarajat yo‘q.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples = 0
+        self._stacks: Counter = Counter()
+        self._labels: Dict[CodeType, str] = {}
+
+    def _label(self, code: CodeType) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            # ";" va bo‘sh joy collapsed formatida ajratuvchi
+            label = f"{os.path.basename(code.co_filename)}:{code.co_name}"
+            label = self._labels[code] = label.replace(";", ",").replace(" ", "_")
+        return label
+
+    def _sample(self) -> None:
+        frame: Optional[FrameType] = sys._current_frames().get(self.thread_id)
+        stack: List[str] = []
+        while frame is not None:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        if stack:
+            stack.reverse()
+            self._stacks[";".join(stack)] += 1
+            self.samples += 1
+
+    def run(self, seconds: float) -> str:
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            self._sample()
+            time.sleep(self.interval)
+        return self.collapsed()
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self._stacks.most_common())
+
+
+def profile_handler(token: str, max_seconds: float = 60.0):
+    """
+    aiohttp handler: GET ?seconds=10&hz=200 – shu oyna davomida event loop
+    oqimini sample qiladi va collapsed stacks faylini qaytaradi. Bir vaqtda bitta profil.
+    """
+    running = asyncio.Lock()
+
+    async def handle(request: web.Request) -> web.Response:
+        if not bearer_authorized(request, token):
+            return web.Response(status=401, text="Unauthorized")
+        try:
+            seconds = min(float(request.query.get("seconds", "10")), max_seconds)
+            hz = min(max(float(request.query.get("hz", "200")), 1.0), 1000.0)
+        except ValueError:
+            return web.Response(status=400, text="seconds/hz must be numbers")
+        if running.locked():
+            return web.Response(status=409, text="Profiling already in progress")
+
+        async with running:
+            sampler = StackSampler(threading.get_ident(), interval=1.0 / hz)
+            logging.info("Profiling started: %.1f s at %.0f Hz", seconds, hz)
+            body = await asyncio.to_thread(sampler.run, seconds)
+            logging.info("Profiling finished: %s samples", sampler.samples)
+        return web.Response(
+            text=body,
+            content_type="text/plain",
+            charset="utf-8",
+            headers={"Content-Disposition": 'attachment; filename="roshaa.collapsed"'},
+        )
+
+    return handle
+
+
+# ================== SEKIN UPDATE’LAR LOGI ==================
+
+
+class UpdateTrace:
+    """Bitta update’ning vaqt taqsimoti: bosqichlar (parse, lock, handler...) va API chaqiruvlari."""
+
+    __slots__ = ("started", "dispatched", "phases", "api_calls")
+
+    def __init__(self, started: float):
+        self.started = started
+        self.dispatched: Optional[float] = None
+        self.phases: List[Tuple[str, float]] = []
+        self.api_calls: List[Tuple[str, float]] = []
+
+    def add(self, phase: str, seconds: float) -> None:
+        self.phases.append((phase, seconds))
+
+    def api(self, method: str, seconds: float) -> None:
+        self.api_calls.append((method, seconds))
+
+
+_trace: ContextVar[Optional[UpdateTrace]] = ContextVar("roshaa_update_trace", default=None)
+
+
+def current_trace() -> Optional[UpdateTrace]:
+    """Hozirgi update’ning trace’i; logger o‘chiq bo‘lsa doim None (bitta ContextVar.get)."""
+    return _trace.get()
+
+
+class SlowUpdateLogger:
+    """
+    `threshold` soniyadan uzoq davom etgan update’lar uchun to‘liq vaqt taqsimotini log qiladi.
+
+    Trace webhook so‘rovi kelganda (aiohttp middleware) yoki dispatcher’ga
+    kirishda boshlanadi; ContextVar orqali aiogram’ning fon task’lariga ham o‘tadi.
+    O‘chiq bo‘lsa middleware’lar umuman ro‘yxatdan o‘tkazilmaydi.
+    """
+
+    def __init__(self, threshold: float):
+        self.threshold = threshold
+        self.logged = 0
+
+    @web.middleware
+    async def web_middleware(self, request: web.Request, handler):
+        if request.method != "POST":
+            return await handler(request)
+        token = _trace.set(UpdateTrace(time.perf_counter()))
+        try:
+            return await handler(request)
+        finally:
+            _trace.reset(token)
+
+    async def dispatch_middleware(self, handler, event, data):
+        trace = _trace.get()
+        token = None
+        now = time.perf_counter()
+        if trace is None or trace.dispatched is not None:
+            trace = UpdateTrace(now)
+            token = _trace.set(trace)
+        else:
+            # So‘rov kelgandan dispatcher’gacha: JSON + pydantic + task rejalashtirish
+            trace.add("parse", now - trace.started)
+        trace.dispatched = now
+        try:
+            return await handler(event, data)
+        finally:
+            total = time.perf_counter() - trace.started
+            if total >= self.threshold:
+                self._log(event, data, trace, total)
+            if token is not None:
+                _trace.reset(token)
+
+    def _log(self, event, data, trace: UpdateTrace, total: float) -> None:
+        self.logged += 1
+        user = data.get("event_from_user")
+        dispatch = time.perf_counter() - trace.dispatched
+        accounted = sum(seconds for phase, seconds in trace.phases if phase != "parse")
+        parts = [f"{phase} {seconds * 1e3:.1f}" for phase, seconds in trace.phases]
+        parts.append(f"routing/filters/middleware {max(0.0, dispatch - accounted) * 1e3:.1f}")
+        api = ", ".join(f"{method} {seconds * 1e3:.1f}" for method, seconds in trace.api_calls)
+        logging.warning(
+            "Slow update %s (user %s): total %.1f ms | %s | API: %s",
+            event.update_id,
+            user.id if user is not None else "-",
+            total * 1e3,
+            " | ".join(parts),
+            api or "-",
+        )
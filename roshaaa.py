@@ -1,9 +1,17 @@
 import os
+import time
+import json
+import html
+import datetime
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 
 from aiogram import Bot, Dispatcher, F, Router
+from aiogram.filters import Command, CommandObject
 from aiogram.types import (
     Message,
     CallbackQuery,
@@ -14,11 +22,50 @@ from aiogram.types import (
     ReplyKeyboardRemove,
 )
 from aiogram.enums import ParseMode
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNetworkError,
+    TelegramRetryAfter,
+    TelegramServerError,
+)
+from aiogram.methods import SendMessage, SendPhoto, TelegramMethod
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.telegram import TelegramAPIServer
 
 from aiohttp import web
 from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
 
+from archive import TASHKENT, ApplicantIndex, ApplicationArchive, ApplicationFilter, day_range
+from bot_session import HttpTuning, RateLimiter, RoshaaSession
+from cards import CardTemplate, compile_cards
+from dedup import RecentKeys
+from digest import (
+    PERIOD_TITLES,
+    build_digest_in_worker,
+    digest_periods,
+    mark_run,
+    missed_days,
+    next_run,
+    read_last_run,
+    remove_old,
+)
+from drain import Drainer
+from export import export_handler
+from locks import KeyedLock
+from metrics import Counter, CounterFunc, Gauge, Histogram, Registry, metrics_handler
+from polling import OffsetStore, PollingRunner
+from search import TrigramIndex
+from profiling import SlowUpdateLogger, current_trace, profile_handler
+from runtime import json_codecs, loop_factory
+from sessions import SessionStore, make_backend
+from spool import Outbox
+from webhook import QueuedRequestHandler
+
+# Cold start hisoboti uchun: "import" bosqichi – modul tanasi (sozlamalar, bot, ombor va
+# indekslar) shu yerdan; kutubxonalar importini bench_cold_start jarayon tashqarisidan o‘lchaydi
+_STARTED = time.perf_counter()
+
 # ================== SOZLAMALAR ==================
 
 # Token va kanal ID ni ENV dan olamiz (Render’da Environment Variables orqali berasan)
@@ -28,35 +75,441 @@ HR_CHAT_ID = int(os.getenv("HR_CHAT_ID", "-1003484007737"))
 if not API_TOKEN:
     raise RuntimeError("API_TOKEN env o'zgaruvchisi o'rnatilmagan!")
 
+# Update’larni qabul qilish: "webhook" (standart) yoki "polling" (getUpdates, tashqi URL kerak emas)
+RUN_MODE = os.getenv("RUN_MODE", "webhook")
+if RUN_MODE not in ("webhook", "polling"):
+    raise RuntimeError(f"RUN_MODE noto'g'ri: {RUN_MODE!r} (webhook yoki polling)")
+
 # Render Web Service uchun tashqi URL (masalan: https://roshaa-bot.onrender.com)
 BASE_WEBHOOK_URL = os.getenv("WEBHOOK_BASE_URL") or os.getenv("RENDER_EXTERNAL_URL")
-if not BASE_WEBHOOK_URL:
+if not BASE_WEBHOOK_URL and RUN_MODE == "webhook":
     # Render Web Service’da RENDER_EXTERNAL_URL avtomatik bo‘ladi,
-    # localda test qilsang, WEBHOOK_BASE_URL ni qo‘l bilan berishing kerak bo‘ladi.
+    # localda test qilsang, WEBHOOK_BASE_URL ni qo‘l bilan berishing yoki RUN_MODE=polling kerak bo‘ladi.
     raise RuntimeError("WEBHOOK_BASE_URL yoki RENDER_EXTERNAL_URL topilmadi.")
 
 # Webhook URL va path
 WEBHOOK_PATH = f"/webhook/{API_TOKEN}"
-WEBHOOK_URL = BASE_WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH
+WEBHOOK_URL = BASE_WEBHOOK_URL.rstrip("/") + WEBHOOK_PATH if BASE_WEBHOOK_URL else None
+
+# Polling: getUpdates paket hajmi, long-poll timeout’i (s), paket ichidagi parallellik
+# va oxirgi offset saqlanadigan fayl (restartdan keyin update’lar takrorlanmaydi va yo‘qolmaydi)
+POLLING_LIMIT = int(os.getenv("POLLING_LIMIT", "100"))
+POLLING_TIMEOUT = int(os.getenv("POLLING_TIMEOUT", "25"))
+POLLING_CONCURRENCY = int(os.getenv("POLLING_CONCURRENCY", "16"))
+POLLING_OFFSET_PATH = os.getenv("POLLING_OFFSET_PATH", "polling_offset.txt")
+
+# Telegram’ga ruxsat etilgan parallel webhook ulanishlari (1–100)
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
+# Webhook rejimi: "background" (aiogram standarti – har update uchun alohida task),
+# "queued" (darhol 200, cheklangan worker’lar, foydalanuvchi bo‘yicha tartib)
+# yoki "reply" (handler qaytargan metod webhook javobining o‘zida yuboriladi)
+WEBHOOK_MODE = os.getenv("WEBHOOK_MODE", "background")
+WEBHOOK_WORKERS = int(os.getenv("WEBHOOK_WORKERS", "8"))
+WEBHOOK_QUEUE_SIZE = int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000"))
+
+# SIGTERM’da: qabul qilingan update’lar va HR navbati tugashini necha soniya kutamiz;
+# ulgurmagan (hali boshlanmagan) update’lar faylga yoziladi va keyingi ishga tushishda bajariladi
+DRAIN_TIMEOUT = float(os.getenv("DRAIN_TIMEOUT", "20"))
+DRAIN_SPOOL_PATH = os.getenv("DRAIN_SPOOL_PATH", "deferred_updates.json")
+
+# Sessiyalarni saqlash: "memory" (standart) yoki "sqlite"
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "memory")
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", "sessions.db")
+SESSION_FLUSH_INTERVAL = float(os.getenv("SESSION_FLUSH_INTERVAL", "1.0"))
+# Tashlab ketilgan arizalar: necha soniya harakatsizlikdan keyin o‘chadi va maksimal soni
+SESSION_TTL = float(os.getenv("SESSION_TTL", str(3 * 24 * 3600)))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "100000"))
+
+# Takroriy update’lar: oxirgi DEDUP_SIZE ta update_id va tasdiqlangan arizalar eslab qolinadi;
+# DEDUP_DB_PATH berilsa – SQLite’da, restartdan keyin ham
+DEDUP_SIZE = int(os.getenv("DEDUP_SIZE", "10000"))
+DEDUP_DB_PATH = os.getenv("DEDUP_DB_PATH") or None
+
+# Tasdiqlangan arizalar arxivi (SQLite). /arizalar buyrug‘i – HR guruhida yoki HR_USER_IDS uchun
+ARCHIVE_PATH = os.getenv("ARCHIVE_PATH", "applications.db")
+HR_USER_IDS = frozenset(int(x) for x in os.getenv("HR_USER_IDS", "").replace(",", " ").split())
+HR_PAGE_SIZE = int(os.getenv("HR_PAGE_SIZE", "10"))
+
+# Shu telefon yoki Telegram ID bilan necha kun ichida qayta ariza – takroriy (0 – tekshirilmaydi).
+# flag – HR postida belgilanadi, block – ariza qabul qilinmaydi
+DUPLICATE_WINDOW_DAYS = float(os.getenv("DUPLICATE_WINDOW_DAYS", "30"))
+DUPLICATE_ACTION = os.getenv("DUPLICATE_ACTION", "flag")
+if DUPLICATE_ACTION not in ("flag", "block"):
+    raise RuntimeError("DUPLICATE_ACTION must be 'flag' or 'block'")
+
+# HR guruhiga yuboriladigan arizalar navbati (diskda, restartdan keyin ham saqlanadi)
+HR_SPOOL_PATH = os.getenv("HR_SPOOL_PATH", "hr_outbox.db")
+HR_SPOOL_MAX_ATTEMPTS = int(os.getenv("HR_SPOOL_MAX_ATTEMPTS", "10"))
+
+# Bot API chiquvchi limitlari (Telegram: ~30 xabar/s umumiy, ~1/s chatga, ~20/min guruhga)
+TG_RATE_LIMIT = os.getenv("TG_RATE_LIMIT", "1") == "1"
+TG_GLOBAL_RATE = float(os.getenv("TG_GLOBAL_RATE", "30"))
+TG_PRIVATE_RATE = float(os.getenv("TG_PRIVATE_RATE", "1"))
+TG_GROUP_RATE_PER_MIN = float(os.getenv("TG_GROUP_RATE_PER_MIN", "20"))
+
+# Bot API serveri (lokal telegram-bot-api yoki test serveri uchun); bo‘sh – api.telegram.org
+TG_API_SERVER = os.getenv("TG_API_SERVER") or None
+
+# Bot API HTTP hovuzi: ulanishlar soni, keep-alive, DNS kesh va timeout’lar (soniya)
+TG_HTTP = HttpTuning(
+    pool_size=int(os.getenv("TG_POOL_SIZE", "100")),
+    pool_size_per_host=int(os.getenv("TG_POOL_SIZE_PER_HOST", "0")),
+    keepalive_timeout=float(os.getenv("TG_KEEPALIVE_TIMEOUT", "60")),
+    dns_cache_ttl=int(os.getenv("TG_DNS_CACHE_TTL", "600")),
+    connect_timeout=float(os.getenv("TG_CONNECT_TIMEOUT", "5")),
+    read_timeout=float(os.getenv("TG_READ_TIMEOUT", "20")),
+    total_timeout=float(os.getenv("TG_TOTAL_TIMEOUT", "30")),
+    upload_read_timeout=float(os.getenv("TG_UPLOAD_READ_TIMEOUT", "60")),
+    upload_total_timeout=float(os.getenv("TG_UPLOAD_TOTAL_TIMEOUT", "120")),
+)
+
+# Tezkor runtime: uvloop event loop + orjson (webhook update’lari va Bot API so‘rovlari).
+# Paketlar o‘rnatilmagan bo‘lsa standart asyncio/json bilan ishlaydi (pip install uvloop orjson)
+FAST_RUNTIME = os.getenv("FAST_RUNTIME", "0") == "1"
+
+# Prometheus /metrics (METRICS_TOKEN berilsa – "Authorization: Bearer <token>" talab qilinadi)
+METRICS_PATH = os.getenv("METRICS_PATH", "/metrics")
+METRICS_TOKEN = os.getenv("METRICS_TOKEN") or None
+
+# Diagnostika: ADMIN_TOKEN berilsa – PROFILE_PATH’da sampling profiler;
+# SLOW_UPDATE_MS > 0 bo‘lsa – shundan sekin update’lar vaqt taqsimoti bilan log qilinadi
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN") or None
+PROFILE_PATH = os.getenv("PROFILE_PATH", "/debug/profile")
+SLOW_UPDATE_MS = float(os.getenv("SLOW_UPDATE_MS", "0"))
+
+# HR eksporti: EXPORT_TOKEN berilsa – EXPORT_PATH’da arizalar CSV/XLSX
+# (?format=xlsx&bo‘lim=Kassa&sana=01.05.2024..31.05.2024 – filtrlar /arizalar bilan bir xil)
+EXPORT_TOKEN = os.getenv("EXPORT_TOKEN") or None
+EXPORT_PATH = os.getenv("EXPORT_PATH", "/export/applications")
+
+# HR hisobotlari: DIGEST_TIME (Toshkent vaqti, masalan "09:00") berilsa – har kuni kechagi, DIGEST_WEEKDAY
+# kuni (0 – dushanba) o‘tgan 7 kunlik arizalar bo‘yicha har bir bo‘limga XLSX HR_CHAT_ID ga yuboriladi.
+# Fayllar alohida jarayon(lar)da tuziladi – webhook’larga xalaqit bermaydi
+DIGEST_TIME = os.getenv("DIGEST_TIME", "")
+DIGEST_WEEKDAY = int(os.getenv("DIGEST_WEEKDAY", "0"))
+try:
+    DIGEST_AT = datetime.time.fromisoformat(DIGEST_TIME) if DIGEST_TIME else None
+except ValueError:
+    raise RuntimeError("DIGEST_TIME must be HH:MM (Tashkent time), e.g. 09:00") from None
+if not 0 <= DIGEST_WEEKDAY <= 6:
+    raise RuntimeError("DIGEST_WEEKDAY must be 0 (Monday) .. 6 (Sunday)")
+DIGEST_DIR = os.getenv("DIGEST_DIR", "digests")
+DIGEST_WORKERS = int(os.getenv("DIGEST_WORKERS", "1"))
+DIGEST_KEEP_DAYS = float(os.getenv("DIGEST_KEEP_DAYS", "14"))
 
 logging.basicConfig(level=logging.INFO)
 
+rate_limiter = (
+    RateLimiter(
+        global_rate=TG_GLOBAL_RATE,
+        private_rate=TG_PRIVATE_RATE,
+        group_rate=TG_GROUP_RATE_PER_MIN / 60,
+    )
+    if TG_RATE_LIMIT
+    else None
+)
+
+JSON_LOADS, JSON_DUMPS, JSON_LIB = json_codecs(FAST_RUNTIME)
+
 bot = Bot(
     API_TOKEN,
+    session=RoshaaSession(
+        limiter=rate_limiter,
+        http=TG_HTTP,
+        json_loads=JSON_LOADS,
+        json_dumps=JSON_DUMPS,
+        **({"api": TelegramAPIServer.from_base(TG_API_SERVER)} if TG_API_SERVER else {}),
+    ),
     default=DefaultBotProperties(parse_mode=ParseMode.HTML)
 )
 
 dp = Dispatcher()
+# HR buyruqlari anketa handler’laridan (form_steps hammasini ushlaydi) oldin tekshiriladi
+hr_router = Router()
 router = Router()
+dp.include_router(hr_router)
 dp.include_router(router)
 
+# ================== ANKETA MODELI ==================
+
+class Step(IntEnum):
+    """Anketa bosqichlari – sessiyada kichik butun son sifatida saqlanadi."""
+    NONE = 0
+    RESUME_CHOICE = 1
+    NAME = 2
+    BIRTH = 3
+    PHONE = 4
+    DEPARTMENT = 5
+    ADDRESS = 6
+    NATIONALITY = 7
+    EDUCATION = 8
+    MARITAL = 9
+    HABITS = 10
+    LANG_RU = 11
+    LANG_EN = 12
+    LANG_CN = 13
+    SKILL_WORD = 14
+    SKILL_EXCEL = 15
+    SKILL_ONEC = 16
+    SOURCE_INFO = 17
+    PREV_JOB = 18
+    SALARY = 19
+    SHIFT = 20
+    REF_CHECK = 21
+    PHOTO = 22
+    CONFIRM = 23
+
+
+# Klaviatura tugmalari. Sessiyada javobning faqat indeksi (kodi) saqlanadi,
+# matnga esa faqat send_preview/final_confirm’da aylantiriladi.
+DEPARTMENTS = {
+    "uz": ["Sotuv bo‘limi", "Ombor bo‘limi", "Kassa"],
+    "ru": ["Отдел продаж", "Склад", "Касса"],
+}
+NATIONALITIES = {
+    "uz": ["O‘zbek", "Rus", "Tojik", "Boshqa"],
+    "ru": ["Узбек", "Русский", "Таджик", "Другое"],
+}
+EDUCATIONS = {
+    "uz": ["Oliy", "Oliy / tugallanmagan", "O‘rta maxsus", "O‘rta"],
+    "ru": ["Высшее", "Незаконченное высшее", "Среднее специальное", "Среднее"],
+}
+MARITAL_STATUSES = {
+    "uz": ["Uylangan / turmush qurgan", "Uylanmagan / turmush qurmagan", "Ajrashgan"],
+    "ru": ["Женат / Замужем", "Холост / Не замужем", "В разводе"],
+}
+HABITS = {
+    "uz": ["Chekish", "Ichish", "Chekish va ichish", "Zararli odatlar yo‘q"],
+    "ru": ["Курю", "Пью", "Курю и пью", "Вредных привычек нет"],
+}
+PERCENTS = {
+    "uz": ["0%", "25%", "50%", "75%", "100%"],
+    "ru": ["0%", "25%", "50%", "75%", "100%"],
+}
+SOURCES = {
+    "uz": ["Telegram reklama", "Instagram", "Tanishlar", "Ish e’lon sayti", "Boshqa"],
+    "ru": ["Реклама в Telegram", "Instagram", "Знакомые", "Сайт вакансий", "Другое"],
+}
+SHIFTS = {
+    "uz": ["Ertalab smena", "Kechqurun smena", "Aralash smena"],
+    "ru": ["Утренняя смена", "Вечерняя смена", "Смешанная смена"],
+}
+YES_NO = {
+    "uz": ["Ha", "Yo‘q"],
+    "ru": ["Да", "Нет"],
+}
+
+# Klaviatura javobi: tugma kodi (int) yoki qo‘lda yozilgan matn (str)
+Choice = Union[int, str, None]
+
+
+def _choice_codes(labels: Dict[str, List[str]]) -> Dict[str, int]:
+    return {label: i for lang_labels in labels.values() for i, label in enumerate(lang_labels)}
+
+
+_CHOICE_CODES = {
+    id(table): _choice_codes(table)
+    for table in (DEPARTMENTS, NATIONALITIES, EDUCATIONS, MARITAL_STATUSES, HABITS,
+                  PERCENTS, SOURCES, SHIFTS)
+}
+
+
+def choice_code(table: Dict[str, List[str]], text: str) -> Choice:
+    """Tugma matnini kodga aylantirish; tugmada yo‘q matn o‘zicha qoladi."""
+    return _CHOICE_CODES[id(table)].get(text, text)
+
+
+def choice_text(table: Dict[str, List[str]], value: Choice, lang: str) -> str:
+    """Kodni foydalanuvchi tilidagi matnga aylantirish."""
+    if isinstance(value, int):
+        return table[lang][value]
+    return value or ""
+
+
+def level_code(text: str) -> Choice:
+    """Foiz darajasi: "75%" yoki "75" -> kod, boshqa matn – "%" siz o‘zicha."""
+    level = text.replace("%", "").strip()
+    return _CHOICE_CODES[id(PERCENTS)].get(level + "%", level)
+
+
+def percent(value: Choice) -> str:
+    if isinstance(value, int):
+        return PERCENTS["uz"][value]
+    return (value or "0") + "%"
+
+
+@dataclass(slots=True)
+class Session:
+    """Bitta foydalanuvchining anketa va jarayon holati."""
+    lang: str = "uz"
+    username: Optional[str] = None
+    step: Step = Step.NONE
+    saved_step: Step = Step.NONE
+    name: Optional[str] = None
+    birth: Optional[str] = None
+    phone: Optional[str] = None
+    department: Choice = None
+    address_text: Optional[str] = None
+    nationality: Choice = None
+    education: Choice = None
+    marital: Choice = None
+    habits: Choice = None
+    ru_level: Choice = None
+    en_level: Choice = None
+    cn_level: Choice = None
+    word_level: Choice = None
+    excel_level: Choice = None
+    onec_level: Choice = None
+    source_info: Choice = None
+    prev_job: Optional[str] = None
+    salary: Optional[str] = None
+    shift: Choice = None
+    ref_check: Optional[bool] = None
+    photo: Optional[str] = None
+    # Preview paytida tayyorlangan HR kartochkasi: (ma’lumotlar kaliti, matn).
+    # Diskka yozilmaydi – restartdan keyin kerak bo‘lsa qayta render qilinadi.
+    card_cache: Optional[Tuple[tuple, str]] = None
+
+    def dumps(self) -> str:
+        """Diskka yozish uchun ixcham JSON (bo‘sh maydonlarsiz)."""
+        return json.dumps(
+            {
+                name: value
+                for name in _SESSION_FIELDS
+                if (value := getattr(self, name)) is not None
+            },
+            ensure_ascii=False,
+            separators=(",", ":"),
+        )
+
+    @classmethod
+    def loads(cls, raw: str) -> "Session":
+        data = json.loads(raw)
+        session = cls(**{k: v for k, v in data.items() if k in _SESSION_FIELDS})
+        session.step = Step(session.step)
+        session.saved_step = Step(session.saved_step)
+        return session
+
+
+_SESSION_FIELDS = tuple(f.name for f in fields(Session) if f.name != "card_cache")
+
+
 # user_data[user_id] = foydalanuvchi anketa va jarayon holati
-user_data: Dict[int, Dict[str, Any]] = {}
+user_data: SessionStore = SessionStore(
+    make_backend(SESSION_BACKEND, SESSION_DB_PATH),
+    encode=Session.dumps,
+    decode=Session.loads,
+    ttl=SESSION_TTL,
+    max_entries=SESSION_MAX_ENTRIES,
+)
+
+# HR guruhiga yuborish: final_confirm faqat navbatga yozadi, fon vazifasi yuboradi
+hr_outbox = Outbox(HR_SPOOL_PATH, max_attempts=HR_SPOOL_MAX_ATTEMPTS)
+
+# Har bir tasdiqlangan ariza – HR qidiruvi va eksport uchun
+archive = ApplicationArchive(ARCHIVE_PATH)
+applicants = ApplicantIndex(DUPLICATE_WINDOW_DAYS * 86400)
+# /qidirish: ism va avvalgi ish joyi bo‘yicha noaniq qidiruv (deferred_setup’da arxivdan yuklanadi)
+search_index = TrigramIndex()
+# Hisobotlar: bir vaqtda eng ko‘pi DIGEST_WORKERS ta worker jarayoni
+digest_workers = asyncio.Semaphore(DIGEST_WORKERS)
+
+# Telegram qayta yuborgan update’lar va ikki marta bosilgan "Tasdiqlash" uchun
+seen_updates = RecentKeys(DEDUP_SIZE, DEDUP_DB_PATH, table="seen_updates")
+# "uid:preview_message_id" – bitta ariza HR’ga faqat bir marta ketadi
+confirmed_applications = RecentKeys(DEDUP_SIZE, DEDUP_DB_PATH, table="confirmed_applications")
+
+# RUN_MODE=polling: getUpdates paketlari o‘sha dp orqali, offset diskda saqlanadi
+poller = PollingRunner(
+    dp,
+    bot,
+    OffsetStore(POLLING_OFFSET_PATH),
+    limit=POLLING_LIMIT,
+    timeout=POLLING_TIMEOUT,
+    concurrency=POLLING_CONCURRENCY,
+)
+
+# Fon vazifalari (sessiya flush, HR navbati, polling va h.k.)
+background_tasks: "set[asyncio.Task]" = set()
+
+# Bir foydalanuvchining update’lari ketma-ket, turli foydalanuvchilar – parallel
+user_locks = KeyedLock()
+
+
+# Eng tashqi middleware – lock kutishini ham o‘lchashi uchun birinchi ro‘yxatdan o‘tadi
+slow_updates: Optional[SlowUpdateLogger] = (
+    SlowUpdateLogger(SLOW_UPDATE_MS / 1000) if SLOW_UPDATE_MS > 0 else None
+)
+if slow_updates is not None:
+    dp.update.outer_middleware(slow_updates.dispatch_middleware)
+
+# To‘xtash paytida update’larni yo‘qotmaslik: qabul qilinganlarni kuzatish (lock’dan oldin)
+drainer = Drainer(DRAIN_SPOOL_PATH)
+dp.update.outer_middleware(drainer.accept_middleware)
+
+
+@dp.update.outer_middleware()
+async def serialize_per_user(handler, event, data):
+    """Bir foydalanuvchining update’larini navbat bilan bajaramiz (ikki marta bosilgan tugma va h.k.)."""
+    user = data.get("event_from_user")
+    if user is None:
+        return await handler(event, data)
+    trace = current_trace()
+    waiting = time.perf_counter()
+    async with user_locks(user.id):
+        if trace is not None:
+            trace.add("lock_wait", time.perf_counter() - waiting)
+        result = await handler(event, data)
+        # Handler qaytargan metod lock ichida yuboriladi – javoblar tartibi saqlanadi.
+        # "reply" rejimida esa u webhook javobiga qo‘yish uchun qaytariladi.
+        if WEBHOOK_MODE != "reply" and isinstance(result, TelegramMethod):
+            sending = time.perf_counter()
+            await data["bot"](result)
+            if trace is not None:
+                trace.add("send_result", time.perf_counter() - sending)
+            return None
+        return result
+
+
+# Lock olingach: update "boshlangan" deb belgilanadi yoki drain muddati o‘tgan bo‘lsa diskka qoldiriladi
+dp.update.outer_middleware(drainer.start_middleware)
+
+
+@dp.update.outer_middleware()
+async def drop_duplicate_updates(handler, event, data):
+    """
+    update_id allaqachon ko‘rilgan bo‘lsa (Telegram qayta yuborgan) – tashlab yuboramiz.
+
+    Lock ichida tekshiriladi: asl update hali bajarilayotgan bo‘lsa, nusxa uni kutib, keyin tushib qoladi.
+    """
+    key = str(event.update_id)
+    if seen_updates.seen(key):
+        DUPLICATES.inc("update")
+        return None
+    try:
+        return await handler(event, data)
+    except Exception:
+        # Update qayta ishlanmadi – Telegram’ning qayta yuborishi tashlab yuborilmasin
+        seen_updates.discard(key)
+        raise
+
+
+@dp.update.outer_middleware()
+async def persist_session(handler, event, data):
+    """Update qayta ishlangandan keyin foydalanuvchi sessiyasini yangilangan deb belgilaymiz."""
+    try:
+        return await handler(event, data)
+    finally:
+        user = data.get("event_from_user")
+        if user is not None:
+            user_data.touch(user.id)
 
 # ================== YORDAMCHI FUNKSIYALAR ==================
 def tr(uid: int, uz: str, ru: str) -> str:
     """Til bo‘yicha tarjima."""
-    lang = user_data.get(uid, {}).get("lang", "uz")
+    session = user_data.get(uid)
+    lang = session.lang if session is not None else "uz"
     return uz if lang == "uz" else ru
 
 
@@ -79,18 +532,7 @@ def main_menu_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def department_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = [
-            "Sotuv bo‘limi",
-            "Ombor bo‘limi",
-            "Kassa",
-        ]
-    else:
-        labels = [
-            "Отдел продаж",
-            "Склад",
-            "Касса",
-        ]
+    labels = DEPARTMENTS[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -106,10 +548,7 @@ def department_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def nationality_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = ["O‘zbek", "Rus", "Tojik", "Boshqa"]
-    else:
-        labels = ["Узбек", "Русский", "Таджик", "Другое"]
+    labels = NATIONALITIES[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -128,10 +567,7 @@ def nationality_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def education_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = ["Oliy", "Oliy / tugallanmagan", "O‘rta maxsus", "O‘rta"]
-    else:
-        labels = ["Высшее", "Незаконченное высшее", "Среднее специальное", "Среднее"]
+    labels = EDUCATIONS[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -150,18 +586,7 @@ def education_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def marital_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = [
-            "Uylangan / turmush qurgan",
-            "Uylanmagan / turmush qurmagan",
-            "Ajrashgan",
-        ]
-    else:
-        labels = [
-            "Женат / Замужем",
-            "Холост / Не замужем",
-            "В разводе",
-        ]
+    labels = MARITAL_STATUSES[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -179,20 +604,7 @@ def marital_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def habits_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = [
-            "Chekish",
-            "Ichish",
-            "Chekish va ichish",
-            "Zararli odatlar yo‘q",
-        ]
-    else:
-        labels = [
-            "Курю",
-            "Пью",
-            "Курю и пью",
-            "Вредных привычек нет",
-        ]
+    labels = HABITS[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -211,7 +623,7 @@ def habits_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def percent_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    labels = ["0%", "25%", "50%", "75%", "100%"]
+    labels = PERCENTS[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -231,22 +643,7 @@ def percent_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def source_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = [
-            "Telegram reklama",
-            "Instagram",
-            "Tanishlar",
-            "Ish e’lon sayti",
-            "Boshqa",
-        ]
-    else:
-        labels = [
-            "Реклама в Telegram",
-            "Instagram",
-            "Знакомые",
-            "Сайт вакансий",
-            "Другое",
-        ]
+    labels = SOURCES[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -268,10 +665,7 @@ def source_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def shift_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = ["Ertalab smena", "Kechqurun smena", "Aralash smena"]
-    else:
-        labels = ["Утренняя смена", "Вечерняя смена", "Смешанная смена"]
+    labels = SHIFTS[lang]
 
     return ReplyKeyboardMarkup(
         keyboard=[
@@ -287,10 +681,7 @@ def shift_keyboard(lang: str) -> ReplyKeyboardMarkup:
 
 
 def yesno_keyboard(lang: str) -> ReplyKeyboardMarkup:
-    if lang == "uz":
-        labels = ["Ha", "Yo‘q"]
-    else:
-        labels = ["Да", "Нет"]
+    labels = YES_NO[lang]
     return ReplyKeyboardMarkup(
         keyboard=[[KeyboardButton(text=l) for l in labels]],
         resize_keyboard=True,
@@ -311,220 +702,351 @@ def language_keyboard() -> ReplyKeyboardMarkup:
     )
 
 
-async def ask_step_question(uid: int, message: Message):
-    """Hozirgi step bo‘yicha foydalanuvchidan keyingi savolni so‘rash."""
-    data = user_data[uid]
-    lang = data.get("lang", "uz")
-    step = data.get("step")
-
-    # Har bir step uchun savol va klaviatura:
-    if step == "name":
-        await message.answer(
-            tr(
-                uid,
-                "Ro‘yxatdan o‘tishni boshlaymiz.\n\nIltimos, <b>Ism Familyangizni</b> kiriting:",
-                "Начнем регистрацию.\n\nПожалуйста, введите ваше <b>Имя и Фамилию</b>:",
-            ),
-            reply_markup=ReplyKeyboardRemove(),
-        )
+def phone_keyboard(lang: str) -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        keyboard=[
+            [
+                KeyboardButton(
+                    text="📲 Telefon raqamni ulashish" if lang == "uz" else "📲 Поделиться номером",
+                    request_contact=True,
+                )
+            ]
+        ],
+        resize_keyboard=True,
+        one_time_keyboard=True,
+    )
 
-    elif step == "birth":
-        await message.answer(
-            tr(
-                uid,
-                "Tug‘ilgan sanangizni kiriting (masalan, 01.01.1990):",
-                "Введите вашу дату рождения (например, 01.01.1990):",
-            )
-        )
 
-    elif step == "phone":
-        phone_kb = ReplyKeyboardMarkup(
-            keyboard=[
-                [
-                    KeyboardButton(
-                        text=tr(uid, "📲 Telefon raqamni ulashish", "📲 Поделиться номером"),
-                        request_contact=True,
-                    )
-                ]
+def photo_cancel_keyboard(lang: str) -> ReplyKeyboardMarkup:
+    return ReplyKeyboardMarkup(
+        keyboard=[[KeyboardButton(text="Bekor qilish" if lang == "uz" else "Отменить")]],
+        resize_keyboard=True,
+        one_time_keyboard=True,
+    )
+
+
+def confirm_keyboard(lang: str) -> InlineKeyboardMarkup:
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [
+                InlineKeyboardButton(
+                    text="✅ Tasdiqlash" if lang == "uz" else "✅ Подтвердить",
+                    callback_data="confirm",
+                )
             ],
-            resize_keyboard=True,
-            one_time_keyboard=True,
-        )
-        await message.answer(
-            tr(
-                uid,
-                "Telefon raqamingizni yuborish uchun tugmani bosing yoki o‘zingiz yozib yuboring:",
-                "Нажмите кнопку, чтобы отправить номер телефона, или введите его вручную:",
-            ),
-            reply_markup=phone_kb,
-        )
+            [
+                InlineKeyboardButton(
+                    text="❌ Bekor qilish" if lang == "uz" else "❌ Отменить",
+                    callback_data="cancel",
+                )
+            ],
+        ]
+    )
 
-    elif step == "department":
-        await message.answer(
-            tr(
-                uid,
-                "Qaysi bo‘limga ishga kirmoqchisiz?",
-                "В какой отдел вы хотите устроиться?",
-            ),
-            reply_markup=department_keyboard(lang),
-        )
 
-    elif step == "address":
-        await message.answer(
-            tr(
-                uid,
-                "Yashash manzilingizni yozing (ko‘cha, uy, tuman, shahar):",
-                "Напишите ваш адрес проживания (улица, дом, район, город):",
-            ),
-            reply_markup=ReplyKeyboardRemove(),
-        )
+# Barcha klaviaturalar startupda har bir til uchun bir marta quriladi.
+# Aiogram obyektlari frozen (o‘zgarmas), JSON ko‘rinishi esa sessionda keshlanadi –
+# step o‘tishida hech qanday klaviatura modeli yaratilmaydi va serializatsiya qilinmaydi.
+KEYBOARDS: Dict[str, Dict[str, Union[ReplyKeyboardMarkup, InlineKeyboardMarkup]]] = {
+    lang: {
+        "main_menu": main_menu_keyboard(lang),
+        "department": department_keyboard(lang),
+        "nationality": nationality_keyboard(lang),
+        "education": education_keyboard(lang),
+        "marital": marital_keyboard(lang),
+        "habits": habits_keyboard(lang),
+        "percent": percent_keyboard(lang),
+        "source": source_keyboard(lang),
+        "shift": shift_keyboard(lang),
+        "yesno": yesno_keyboard(lang),
+        "phone": phone_keyboard(lang),
+        "photo_cancel": photo_cancel_keyboard(lang),
+        "confirm": confirm_keyboard(lang),
+    }
+    for lang in ("uz", "ru")
+}
+LANGUAGE_KEYBOARD = language_keyboard()
+REMOVE_KEYBOARD = ReplyKeyboardRemove()
 
-    elif step == "nationality":
-        await message.answer(
-            tr(uid, "Millatingizni tanlang:", "Выберите вашу национальность:"),
-            reply_markup=nationality_keyboard(lang),
-        )
+for _markup in [LANGUAGE_KEYBOARD, REMOVE_KEYBOARD] + [
+    kb for lang_keyboards in KEYBOARDS.values() for kb in lang_keyboards.values()
+]:
+    bot.session.cache_markup(bot, _markup)
 
-    elif step == "education":
-        await message.answer(
-            tr(uid, "Ma’lumotingizni tanlang:", "Выберите ваше образование:"),
-            reply_markup=education_keyboard(lang),
-        )
 
-    elif step == "marital":
-        await message.answer(
-            tr(uid, "Oylaviy holatingizni tanlang:", "Выберите ваше семейное положение:"),
-            reply_markup=marital_keyboard(lang),
-        )
+# ================== ANKETA SXEMASI ==================
 
-    elif step == "habits":
-        await message.answer(
-            tr(uid, "Zararli odatlaringiz:", "Вредные привычки:"),
-            reply_markup=habits_keyboard(lang),
-        )
+# Har bir savol bir marta, ma’lumot sifatida ta’riflanadi. Import paytida u
+# FORM jadvaliga (Step -> CompiledStep) kompilyatsiya qilinadi; savol yuborish
+# ham, javobni qabul qilish ham shu jadvaldan bitta dict lookup bilan ishlaydi.
 
-    elif step == "lang_ru":
-        await message.answer(
-            tr(
-                uid,
-                "Rus tilini bilish darajangizni tanlang:",
-                "Выберите уровень владения русским языком:",
-            ),
-            reply_markup=percent_keyboard(lang),
-        )
+# Javobni normallashtiruvchi: (message, lang) -> qiymat; None – javob noto‘g‘ri
+Normalizer = Callable[[Message, str], Any]
 
-    elif step == "lang_en":
-        await message.answer(
-            tr(
-                uid,
-                "Ingliz tilini bilish darajangizni tanlang:",
-                "Выберите уровень владения английским языком:",
-            ),
-            reply_markup=percent_keyboard(lang),
-        )
 
-    elif step == "lang_cn":
-        await message.answer(
-            tr(
-                uid,
-                "Xitoy tilini bilish darajangizni tanlang:",
-                "Выберите уровень владения китайским языком:",
-            ),
-            reply_markup=percent_keyboard(lang),
-        )
+def _text(message: Message, lang: str) -> str:
+    return message.text or ""
 
-    elif step == "skill_word":
-        await message.answer(
-            tr(
-                uid,
-                "Word dasturini bilish darajangizni tanlang:",
-                "Выберите уровень владения Word:",
-            ),
-            reply_markup=percent_keyboard(lang),
-        )
 
-    elif step == "skill_excel":
-        await message.answer(
-            tr(
-                uid,
-                "Excel dasturini bilish darajangizni tanlang:",
-                "Выберите уровень владения Excel:",
-            ),
-            reply_markup=percent_keyboard(lang),
-        )
+def _phone(message: Message, lang: str) -> str:
+    if message.contact:
+        return message.contact.phone_number
+    return message.text or ""
 
-    elif step == "skill_onec":
-        await message.answer(
-            tr(
-                uid,
-                "1C dasturini bilish darajangizni tanlang:",
-                "Выберите уровень владения 1C:",
-            ),
-            reply_markup=percent_keyboard(lang),
-        )
 
-    elif step == "source_info":
-        await message.answer(
-            tr(
-                uid,
-                "Kompaniyamiz haqida qayerdan ma’lumot oldingiz?",
-                "Откуда вы узнали о нашей компании?",
-            ),
-            reply_markup=source_keyboard(lang),
-        )
+def _choice(table: Dict[str, List[str]]) -> Normalizer:
+    def normalize(message: Message, lang: str) -> Choice:
+        return choice_code(table, message.text or "")
+    return normalize
 
-    elif step == "prev_job":
-        await message.answer(
-            tr(
-                uid,
-                "Avvalgi ish joyingiz? (kompaniya va lavozim):",
-                "Ваше предыдущее место работы? (компания и должность):",
-            ),
-            reply_markup=ReplyKeyboardRemove(),
-        )
 
-    elif step == "salary":
-        await message.answer(
-            tr(
-                uid,
-                "Hohlayotgan ish haqqingizni kiriting:",
-                "Введите желаемую заработную плату:",
-            )
-        )
+def _level(message: Message, lang: str) -> Choice:
+    return level_code(message.text or "")
 
-    elif step == "shift":
-        await message.answer(
-            tr(
-                uid,
-                "Qaysi smenada ishlay olasiz?",
-                "В какую смену вы можете работать?",
-            ),
-            reply_markup=shift_keyboard(lang),
-        )
 
-    elif step == "ref_check":
-        await message.answer(
-            tr(
-                uid,
-                "Eski ish joyingizdan va yashash joyingizdan surishtirishga qarshiligingiz yo‘qmi?",
-                "Вы не против, если мы наведём справки с вашего прошлого места работы и места жительства?",
-            ),
-            reply_markup=yesno_keyboard(lang),
-        )
+def _yes(message: Message, lang: str) -> bool:
+    return (message.text or "") == YES_NO[lang][0]
+
+
+def _photo(message: Message, lang: str) -> Optional[str]:
+    if not message.photo:
+        return None
+    return message.photo[-1].file_id
 
-    elif step == "photo":
-        await message.answer(
-            tr(
-                uid,
-                "Iltimos, fotosuratingizni yuboring:",
-                "Пожалуйста, отправьте ваше фото:",
-            ),
-            reply_markup=ReplyKeyboardMarkup(
-                keyboard=[[KeyboardButton(text=tr(uid, "Bekor qilish", "Отменить"))]],
-                resize_keyboard=True,
-                one_time_keyboard=True,
-            ),
-        )
+
+@dataclass(frozen=True)
+class Question:
+    step: Step
+    field: str
+    prompt: Dict[str, str]
+    keyboard: Optional[str] = None  # KEYBOARDS kaliti yoki "remove"
+    normalize: Normalizer = _text
+    # normalize None qaytarsa shu matn yuboriladi va step o‘zgarmaydi
+    retry: Optional[Dict[str, str]] = None
+
+
+QUESTIONS = [
+    # 1) F.I.Sh
+    Question(
+        Step.NAME, "name",
+        {
+            "uz": "Ro‘yxatdan o‘tishni boshlaymiz.\n\nIltimos, <b>Ism Familyangizni</b> kiriting:",
+            "ru": "Начнем регистрацию.\n\nПожалуйста, введите ваше <b>Имя и Фамилию</b>:",
+        },
+        keyboard="remove",
+    ),
+    # 2) Tug‘ilgan sana
+    Question(
+        Step.BIRTH, "birth",
+        {
+            "uz": "Tug‘ilgan sanangizni kiriting (masalan, 01.01.1990):",
+            "ru": "Введите вашу дату рождения (например, 01.01.1990):",
+        },
+    ),
+    # 3) Telefon – contact yoki text
+    Question(
+        Step.PHONE, "phone",
+        {
+            "uz": "Telefon raqamingizni yuborish uchun tugmani bosing yoki o‘zingiz yozib yuboring:",
+            "ru": "Нажмите кнопку, чтобы отправить номер телефона, или введите его вручную:",
+        },
+        keyboard="phone",
+        normalize=_phone,
+    ),
+    # 4) Bo‘lim
+    Question(
+        Step.DEPARTMENT, "department",
+        {
+            "uz": "Qaysi bo‘limga ishga kirmoqchisiz?",
+            "ru": "В какой отдел вы хотите устроиться?",
+        },
+        keyboard="department",
+        normalize=_choice(DEPARTMENTS),
+    ),
+    # 5) Manzil
+    Question(
+        Step.ADDRESS, "address_text",
+        {
+            "uz": "Yashash manzilingizni yozing (ko‘cha, uy, tuman, shahar):",
+            "ru": "Напишите ваш адрес проживания (улица, дом, район, город):",
+        },
+        keyboard="remove",
+    ),
+    # 6) Millat
+    Question(
+        Step.NATIONALITY, "nationality",
+        {"uz": "Millatingizni tanlang:", "ru": "Выберите вашу национальность:"},
+        keyboard="nationality",
+        normalize=_choice(NATIONALITIES),
+    ),
+    # 7) Ma’lumoti
+    Question(
+        Step.EDUCATION, "education",
+        {"uz": "Ma’lumotingizni tanlang:", "ru": "Выберите ваше образование:"},
+        keyboard="education",
+        normalize=_choice(EDUCATIONS),
+    ),
+    # 8) Oylaviy holat
+    Question(
+        Step.MARITAL, "marital",
+        {"uz": "Oylaviy holatingizni tanlang:", "ru": "Выберите ваше семейное положение:"},
+        keyboard="marital",
+        normalize=_choice(MARITAL_STATUSES),
+    ),
+    # 9) Zararli odatlar
+    Question(
+        Step.HABITS, "habits",
+        {"uz": "Zararli odatlaringiz:", "ru": "Вредные привычки:"},
+        keyboard="habits",
+        normalize=_choice(HABITS),
+    ),
+    # 10) Rus tili
+    Question(
+        Step.LANG_RU, "ru_level",
+        {
+            "uz": "Rus tilini bilish darajangizni tanlang:",
+            "ru": "Выберите уровень владения русским языком:",
+        },
+        keyboard="percent",
+        normalize=_level,
+    ),
+    # 11) Ingliz tili
+    Question(
+        Step.LANG_EN, "en_level",
+        {
+            "uz": "Ingliz tilini bilish darajangizni tanlang:",
+            "ru": "Выберите уровень владения английским языком:",
+        },
+        keyboard="percent",
+        normalize=_level,
+    ),
+    # 12) Xitoy tili
+    Question(
+        Step.LANG_CN, "cn_level",
+        {
+            "uz": "Xitoy tilini bilish darajangizni tanlang:",
+            "ru": "Выберите уровень владения китайским языком:",
+        },
+        keyboard="percent",
+        normalize=_level,
+    ),
+    # 13) Word
+    Question(
+        Step.SKILL_WORD, "word_level",
+        {"uz": "Word dasturini bilish darajangizni tanlang:", "ru": "Выберите уровень владения Word:"},
+        keyboard="percent",
+        normalize=_level,
+    ),
+    # 14) Excel
+    Question(
+        Step.SKILL_EXCEL, "excel_level",
+        {"uz": "Excel dasturini bilish darajangizni tanlang:", "ru": "Выберите уровень владения Excel:"},
+        keyboard="percent",
+        normalize=_level,
+    ),
+    # 15) 1C
+    Question(
+        Step.SKILL_ONEC, "onec_level",
+        {"uz": "1C dasturini bilish darajangizni tanlang:", "ru": "Выберите уровень владения 1C:"},
+        keyboard="percent",
+        normalize=_level,
+    ),
+    # 16) Kompaniya haqida qayerdan eshitgan
+    Question(
+        Step.SOURCE_INFO, "source_info",
+        {
+            "uz": "Kompaniyamiz haqida qayerdan ma’lumot oldingiz?",
+            "ru": "Откуда вы узнали о нашей компании?",
+        },
+        keyboard="source",
+        normalize=_choice(SOURCES),
+    ),
+    # 17) Avvalgi ish joyi
+    Question(
+        Step.PREV_JOB, "prev_job",
+        {
+            "uz": "Avvalgi ish joyingiz? (kompaniya va lavozim):",
+            "ru": "Ваше предыдущее место работы? (компания и должность):",
+        },
+        keyboard="remove",
+    ),
+    # 18) Ish haqi
+    Question(
+        Step.SALARY, "salary",
+        {"uz": "Hohlayotgan ish haqqingizni kiriting:", "ru": "Введите желаемую заработную плату:"},
+    ),
+    # 19) Smena
+    Question(
+        Step.SHIFT, "shift",
+        {"uz": "Qaysi smenada ishlay olasiz?", "ru": "В какую смену вы можете работать?"},
+        keyboard="shift",
+        normalize=_choice(SHIFTS),
+    ),
+    # 20) Surishtirishga ruxsat
+    Question(
+        Step.REF_CHECK, "ref_check",
+        {
+            "uz": "Eski ish joyingizdan va yashash joyingizdan surishtirishga qarshiligingiz yo‘qmi?",
+            "ru": "Вы не против, если мы наведём справки с вашего прошлого места работы и места жительства?",
+        },
+        keyboard="yesno",
+        normalize=_yes,
+    ),
+    # 21-22) Foto
+    Question(
+        Step.PHOTO, "photo",
+        {"uz": "Iltimos, fotosuratingizni yuboring:", "ru": "Пожалуйста, отправьте ваше фото:"},
+        keyboard="photo_cancel",
+        normalize=_photo,
+        retry={"uz": "Iltimos, fotosuratingizni yuboring.", "ru": "Пожалуйста, отправьте ваше фото."},
+    ),
+]
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    field: str
+    normalize: Normalizer
+    next_step: Step
+    # lang -> (savol matni, klaviatura)
+    prompt: Dict[str, Tuple[str, Any]]
+    retry: Optional[Dict[str, str]]
+
+
+def compile_form(questions: List[Question]) -> Dict[Step, CompiledStep]:
+    """Savollar ro‘yxatini Step -> CompiledStep jadvaliga aylantirish."""
+    form: Dict[Step, CompiledStep] = {}
+    for i, q in enumerate(questions):
+        # Oxirgi savoldan keyin – preview/tasdiqlash
+        next_step = questions[i + 1].step if i + 1 < len(questions) else Step.CONFIRM
+        prompt = {}
+        for lang in ("uz", "ru"):
+            if q.keyboard is None:
+                markup = None
+            elif q.keyboard == "remove":
+                markup = REMOVE_KEYBOARD
+            else:
+                markup = KEYBOARDS[lang][q.keyboard]
+            prompt[lang] = (q.prompt[lang], markup)
+        form[q.step] = CompiledStep(q.field, q.normalize, next_step, prompt, q.retry)
+    return form
+
+
+FORM = compile_form(QUESTIONS)
+
+
+# Handler’lar oxirgi (yagona) javobini await qilmasdan metod sifatida qaytaradi.
+# "reply" rejimida u webhook javobida ketadi (alohida HTTPS so‘rov yo‘q),
+# boshqa rejimlarda aiogram/worker uni odatdagidek yuboradi.
+
+def ask_step_question(uid: int, message: Message) -> Optional[SendMessage]:
+    """Hozirgi step bo‘yicha foydalanuvchiga keyingi savol."""
+    data = user_data[uid]
+    compiled = FORM.get(data.step)
+    if compiled is None:
+        return None
+    text, markup = compiled.prompt[data.lang]
+    return message.answer(text, reply_markup=markup)
 
 
 # ================== /start (PAUZA / DAVOM ETTIRISH) ==================
@@ -535,20 +1057,19 @@ async def cmd_start(message: Message):
     data = user_data.get(uid)
 
     # Agar oldin boshlangan, lekin tugallanmagan ariza bo‘lsa:
-    if data and data.get("step") not in (None, "completed", "resume_choice"):
-        data["saved_step"] = data["step"]
-        data["step"] = "resume_choice"
+    if data is not None and data.step not in (Step.NONE, Step.RESUME_CHOICE):
+        data.saved_step = data.step
+        data.step = Step.RESUME_CHOICE
 
-        lang = data.get("lang", "uz")
+        lang = data.lang
         text = (
             "Siz ilgari boshlangan, lekin tugallanmagan arizaga egasiz.\n"
             "Uni davom ettirmoqchimisiz?"
             if lang == "uz"
             else "У вас есть незавершённая заявка.\nХотите продолжить заполнение?"
         )
-        kb = yesno_keyboard(lang)
-        await message.answer(text, reply_markup=kb)
-        return
+        kb = KEYBOARDS[lang]["yesno"]
+        return message.answer(text, reply_markup=kb)
 
     # Aks holda – til tanlashdan oldin chiroyli salomlashamiz
     first_name = message.from_user.first_name or ""
@@ -561,14 +1082,14 @@ async def cmd_start(message: Message):
         f"Выберите язык внизу:"
     )
 
-    await message.answer(greeting_text, reply_markup=language_keyboard())
+    return message.answer(greeting_text, reply_markup=LANGUAGE_KEYBOARD)
 
 
 @router.message(F.text.in_(["🇺🇿 O‘zbek", "🇷🇺 Русский"]))
 async def choose_language(message: Message):
     uid = message.from_user.id
 
-    if uid in user_data and user_data[uid].get("step") not in (None, "completed"):
+    if uid in user_data and user_data[uid].step != Step.NONE:
         # Agar qandaydir eski holat qolgan bo‘lsa – tozalaymiz (foydalanuvchi yangidan boshlashni xohlagan bo‘ladi)
         user_data.pop(uid, None)
 
@@ -577,11 +1098,7 @@ async def choose_language(message: Message):
     else:
         lang = "ru"
 
-    user_data[uid] = {
-        "lang": lang,
-        "username": message.from_user.username,
-        "step": None,
-    }
+    user_data[uid] = Session(lang=lang, username=message.from_user.username)
 
     text = (
         "Assalomu alaykum! Marhamat, bo‘limni tanlang 👇"
@@ -589,7 +1106,7 @@ async def choose_language(message: Message):
         else "Здравствуйте! Выберите раздел 👇"
     )
 
-    await message.answer(text, reply_markup=main_menu_keyboard(lang))
+    return message.answer(text, reply_markup=KEYBOARDS[lang]["main_menu"])
 
 
 # ================== KOMPANIYA HAQIDA ==================
@@ -597,7 +1114,8 @@ async def choose_language(message: Message):
 @router.message(F.text.in_(["📌 Kompaniya haqida", "📌 О компании"]))
 async def about_company(message: Message):
     uid = message.from_user.id
-    user_data.setdefault(uid, {})
+    if uid not in user_data:
+        user_data[uid] = Session()
     text = tr(
         uid,
         uz=(
@@ -611,7 +1129,7 @@ async def about_company(message: Message):
             "📞 Call-центр: +998-90-634-44-44"
         ),
     )
-    await message.answer(text)
+    return message.answer(text)
 
 
 # ================== RO‘YXATDAN O‘TISH BOSHLANISHI ==================
@@ -619,12 +1137,11 @@ async def about_company(message: Message):
 @router.message(F.text.in_(["📝 Ro‘yxatdan o‘tish", "📝 Регистрация"]))
 async def register_start(message: Message):
     uid = message.from_user.id
-    user_data.setdefault(uid, {})
-    if "lang" not in user_data[uid]:
-        user_data[uid]["lang"] = "uz"
-    user_data[uid]["username"] = message.from_user.username
-    user_data[uid]["step"] = "name"
-    await ask_step_question(uid, message)
+    if uid not in user_data:
+        user_data[uid] = Session()
+    user_data[uid].username = message.from_user.username
+    user_data[uid].step = Step.NAME
+    return ask_step_question(uid, message)
 
 
 # ================== ASOSIY FORM BOSQICHLARI (MESSAGE HANDLER) ==================
@@ -632,482 +1149,1012 @@ async def register_start(message: Message):
 @router.message()
 async def form_steps(message: Message):
     uid = message.from_user.id
-    if uid not in user_data or "step" not in user_data[uid]:
+    data = user_data.get(uid)
+    if data is None:
         return
 
-    data = user_data[uid]
-    step = data["step"]
-    lang = data.get("lang", "uz")
+    step = data.step
+    lang = data.lang
     text = message.text or ""
 
     # Davom ettirish savoliga javob
-    if step == "resume_choice":
-        if lang == "uz":
-            yes, no = "Ha", "Yo‘q"
-        else:
-            yes, no = "Да", "Нет"
+    if step == Step.RESUME_CHOICE:
+        yes, no = YES_NO[lang]
 
         if text == yes:
             # avvalgi stepga qaytamiz
-            saved_step = data.get("saved_step")
+            saved_step = data.saved_step
             if saved_step:
-                data["step"] = saved_step
-                data.pop("saved_step", None)
-                await ask_step_question(uid, message)
-            else:
-                # xavfsizlik uchun yangidan
-                data["step"] = None
-                await message.answer(
-                    tr(
-                        uid,
-                        "Ro‘yxatdan o‘tishni yangidan boshlaymiz.",
-                        "Начнём регистрацию заново.",
-                    ),
-                    reply_markup=language_keyboard(),
-                )
-            return
+                data.step = saved_step
+                data.saved_step = Step.NONE
+                return ask_step_question(uid, message)
+            # xavfsizlik uchun yangidan
+            data.step = Step.NONE
+            return message.answer(
+                tr(
+                    uid,
+                    "Ro‘yxatdan o‘tishni yangidan boshlaymiz.",
+                    "Начнём регистрацию заново.",
+                ),
+                reply_markup=LANGUAGE_KEYBOARD,
+            )
         elif text == no:
             # eski ma'lumotlarni o‘chirib, boshidan
             user_data.pop(uid, None)
-            await message.answer(
+            return message.answer(
                 tr(
                     uid,
                     "Yangi ariza boshlash uchun tilni tanlang:",
                     "Чтобы начать новую заявку, выберите язык:",
                 ),
-                reply_markup=language_keyboard(),
+                reply_markup=LANGUAGE_KEYBOARD,
             )
-            return
         else:
-            await message.answer(
+            return message.answer(
                 tr(
                     uid,
                     "Iltimos, pastdagi tugmalardan birini tanlang: Ha / Yo‘q",
                     "Пожалуйста, выберите один из вариантов: Да / Нет",
                 )
             )
-            return
 
-    # 1) F.I.Sh
-    if step == "name":
-        data["name"] = text
-        data["step"] = "birth"
-        await ask_step_question(uid, message)
+    # Anketa savollari – FORM jadvalidan bitta lookup
+    compiled = FORM.get(step)
+    if compiled is None:
         return
 
-    # 2) Tug‘ilgan sana
-    if step == "birth":
-        data["birth"] = text
-        data["step"] = "phone"
-        await ask_step_question(uid, message)
-        return
+    value = compiled.normalize(message, lang)
+    if value is None and compiled.retry is not None:
+        return message.answer(compiled.retry[lang])
 
-    # 3) Telefon – contact yoki text
-    if step == "phone":
-        if message.contact:
-            data["phone"] = message.contact.phone_number
-        else:
-            data["phone"] = text
-        data["step"] = "department"
-        await ask_step_question(uid, message)
-        return
+    setattr(data, compiled.field, value)
+    data.step = compiled.next_step
+    if data.step == Step.CONFIRM:
+        return send_preview(uid, message)
+    return ask_step_question(uid, message)
 
-    # 4) Bo‘lim
-    if step == "department":
-        data["department"] = text
-        data["step"] = "address"
-        await ask_step_question(uid, message)
-        return
 
-    # 5) Manzil
-    if step == "address":
-        data["address_text"] = text
-        data["step"] = "nationality"
-        await ask_step_question(uid, message)
-        return
+# ================== KARTOCHKALAR (PREVIEW / HR) ==================
 
-    # 6) Millat
-    if step == "nationality":
-        data["nationality"] = text
-        data["step"] = "education"
-        await ask_step_question(uid, message)
-        return
+# Preview’da sarlavha foydalanuvchi tilida, maydon nomlari esa o‘zbekcha
+_PREVIEW_BODY = """\
+👤 <b>F.I.Sh:</b> {name}
+👤 <b>Telegram username:</b> {username}
+🎂 <b>Tug‘ilgan sana:</b> {birth}
+📞 <b>Telefon:</b> {phone}
+🏢 <b>Bo‘lim:</b> {department}
+📍 <b>Yashash manzil:</b> {address}
+🌐 <b>Millat:</b> {nationality}
+🎓 <b>Ma’lumoti:</b> {education}
+💍 <b>Oylaviy holat:</b> {marital}
+🚬 <b>Zararli odatlar:</b> {habits}
 
-    # 7) Ma’lumoti
-    if step == "education":
-        data["education"] = text
-        data["step"] = "marital"
-        await ask_step_question(uid, message)
-        return
+🗣 <b>Tillar:</b>
+▪️ Rus tili: {ru_level}
+▪️ Ingliz tili: {en_level}
+▪️ Xitoy tili: {cn_level}
 
-    # 8) Oylaviy holat
-    if step == "marital":
-        data["marital"] = text
-        data["step"] = "habits"
-        await ask_step_question(uid, message)
-        return
+💻 <b>Kompyuter ko‘nikmalari:</b>
+▪️ Word: {word_level}
+▪️ Excel: {excel_level}
+▪️ 1C: {onec_level}
+
+ℹ️ <b>Kompaniya haqida qayerdan eshitdingiz:</b> {source_info}
+💼 <b>Avvalgi ish joyingiz:</b> {prev_job}
+💰 <b>Hohlayotgan ish haqi:</b> {salary}
+🕒 <b>Smena:</b> {shift}
+📋 <b>Surishtirishga ruxsat:</b> {ref_check}
+"""
 
-    # 9) Zararli odatlar
-    if step == "habits":
-        data["habits"] = text
-        data["step"] = "lang_ru"
-        await ask_step_question(uid, message)
-        return
+PREVIEW_LAYOUTS = {
+    "uz": "Iltimos, kiritgan ma’lumotlaringizni yana bir bor tekshirib chiqing:\n\n" + _PREVIEW_BODY,
+    "ru": "Пожалуйста, внимательно проверьте введённые данные:\n\n" + _PREVIEW_BODY,
+}
 
-    # 10) Rus tili
-    if step == "lang_ru":
-        data["ru_level"] = text.replace("%", "").strip()
-        data["step"] = "lang_en"
-        await ask_step_question(uid, message)
-        return
+HR_LAYOUTS = {
+    "uz": """
+📨 <b>Yangi ishga qabul arizasi</b>
 
-    # 11) Ingliz tili
-    if step == "lang_en":
-        data["en_level"] = text.replace("%", "").strip()
-        data["step"] = "lang_cn"
-        await ask_step_question(uid, message)
-        return
+👤 <b>F.I.Sh:</b> {name}
+👤 <b>Telegram username:</b> {username}
+🎂 <b>Tug‘ilgan sana:</b> {birth}
+📞 <b>Telefon:</b> {phone}
+🏢 <b>Talab qilayotgan bo‘lim:</b> {department}
+📍 <b>Yashash manzili:</b> {address}
+🌐 <b>Millati:</b> {nationality}
+🎓 <b>Ma’lumoti:</b> {education}
+💍 <b>Oylaviy holati:</b> {marital}
+🚬 <b>Zararli odatlari:</b> {habits}
 
-    # 12) Xitoy tili
-    if step == "lang_cn":
-        data["cn_level"] = text.replace("%", "").strip()
-        data["step"] = "skill_word"
-        await ask_step_question(uid, message)
-        return
+🗣 <b>Tillar:</b>
+▪️ Rus tili: {ru_level}
+▪️ Ingliz tili: {en_level}
+▪️ Xitoy tili: {cn_level}
 
-    # 13) Word
-    if step == "skill_word":
-        data["word_level"] = text.replace("%", "").strip()
-        data["step"] = "skill_excel"
-        await ask_step_question(uid, message)
-        return
+💻 <b>Kompyuter ko‘nikmalari:</b>
+▪️ Word: {word_level}
+▪️ Excel: {excel_level}
+▪️ 1C: {onec_level}
 
-    # 14) Excel
-    if step == "skill_excel":
-        data["excel_level"] = text.replace("%", "").strip()
-        data["step"] = "skill_onec"
-        await ask_step_question(uid, message)
-        return
+ℹ️ <b>Kompaniya haqida qayerdan eshitgan:</b> {source_info}
+💼 <b>Avvalgi ish joyi:</b> {prev_job}
+💰 <b>Hohlayotgan ish haqi:</b> {salary}
+🕒 <b>Smena:</b> {shift}
 
-    # 15) 1C
-    if step == "skill_onec":
-        data["onec_level"] = text.replace("%", "").strip()
-        data["step"] = "source_info"
-        await ask_step_question(uid, message)
-        return
+📋 <b>Surishtirishga munosabati:</b> {ref_check}
 
-    # 16) Kompaniya haqida qayerdan eshitgan
-    if step == "source_info":
-        data["source_info"] = text
-        data["step"] = "prev_job"
-        await ask_step_question(uid, message)
-        return
+🆔 <b>Telegram ID:</b> <code>{uid}</code>
+""",
+    "ru": """
+📨 <b>Новая заявка на трудоустройство</b>
 
-    # 17) Avvalgi ish joyi
-    if step == "prev_job":
-        data["prev_job"] = text
-        data["step"] = "salary"
-        await ask_step_question(uid, message)
-        return
+👤 <b>Ф.И.О.:</b> {name}
+👤 <b>Telegram username:</b> {username}
+🎂 <b>Дата рождения:</b> {birth}
+📞 <b>Телефон:</b> {phone}
+🏢 <b>Желаемый отдел:</b> {department}
+📍 <b>Адрес проживания:</b> {address}
+🌐 <b>Национальность:</b> {nationality}
+🎓 <b>Образование:</b> {education}
+💍 <b>Семейное положение:</b> {marital}
+🚬 <b>Вредные привычки:</b> {habits}
 
-    # 18) Ish haqi
-    if step == "salary":
-        data["salary"] = text
-        data["step"] = "shift"
-        await ask_step_question(uid, message)
-        return
+🗣 <b>Языки:</b>
+▪️ Русский язык: {ru_level}
+▪️ Английский язык: {en_level}
+▪️ Китайский язык: {cn_level}
 
-    # 19) Smena
-    if step == "shift":
-        data["shift"] = text
-        data["step"] = "ref_check"
-        await ask_step_question(uid, message)
-        return
+💻 <b>Компьютерные навыки:</b>
+▪️ Word: {word_level}
+▪️ Excel: {excel_level}
+▪️ 1C: {onec_level}
 
-    # 20) Surishtirishga ruxsat
-    if step == "ref_check":
-        if lang == "uz":
-            yes, no = "Ha", "Yo‘q"
-        else:
-            yes, no = "Да", "Нет"
+ℹ️ <b>Источник информации о компании:</b> {source_info}
+💼 <b>Предыдущее место работы:</b> {prev_job}
+💰 <b>Желаемая зарплата:</b> {salary}
+🕒 <b>Смена:</b> {shift}
 
-        data["ref_check"] = "yes" if text == yes else "no"
-        data["step"] = "photo"
-        await ask_step_question(uid, message)
-        return
+📋 <b>Отношение к проверке рекомендаций:</b> {ref_check}
 
-    # 21-22) Foto
-    if step == "photo":
-        if not message.photo:
-            await message.answer(
-                tr(
-                    uid,
-                    "Iltimos, fotosuratingizni yuboring.",
-                    "Пожалуйста, отправьте ваше фото.",
-                )
-            )
-            return
+🆔 <b>Telegram ID:</b> <code>{uid}</code>
+""",
+}
+
+SMS_TEXTS = {
+    "uz": (
+        "✅ Arizangiz muvaffaqiyatli qabul qilindi!\n"
+        "HR bo‘limi siz bilan 3 ish kuni ichida bog‘lanadi.\n"
+        "Rahmat!"
+    ),
+    "ru": (
+        "✅ Ваша заявка успешно принята!\n"
+        "Наш HR-отдел свяжется с вами в течение 3 рабочих дней.\n"
+        "Спасибо!"
+    ),
+}
+
+
+CARD_FIELDS = (
+    "name", "username", "birth", "phone", "department", "address", "nationality",
+    "education", "marital", "habits", "ru_level", "en_level", "cn_level", "word_level",
+    "excel_level", "onec_level", "source_info", "prev_job", "salary", "shift",
+    "ref_check", "uid",
+)
 
-        data["photo"] = message.photo[-1].file_id
-        data["step"] = "confirm"
-        await send_preview(uid, message)
-        return
+# Kartochka qiymatlarini hisoblovchi: (sessiya, user_id) -> CARD_FIELDS tartibidagi matnlar
+CardValues = Callable[["Session", int], Tuple[str, ...]]
 
 
-# ================== PREVIEW (TEKSHIRISH) ==================
+def compile_card_values(lang: str) -> CardValues:
+    """Til bo‘yicha matnlar va tugma yorliqlari oldindan bog‘langan qiymatlar funksiyasi."""
+    not_set = "Ko‘rsatilmagan" if lang == "uz" else "Не указано"
+    allow, deny = ("Ruxsat beraman", "Ruxsat bermayman") if lang == "uz" else ("Разрешаю", "Не разрешаю")
+    # Kod -> yorliq; qo‘lda yozilgan matn .get(v, v) orqali o‘zicha qoladi
+    department, nationality, education, marital, habits, source, shift = (
+        dict(enumerate(table[lang]))
+        for table in (DEPARTMENTS, NATIONALITIES, EDUCATIONS, MARITAL_STATUSES, HABITS,
+                      SOURCES, SHIFTS)
+    )
 
-async def send_preview(uid: int, message: Message):
-    d = user_data[uid]
+    def values(d: Session, uid: int) -> Tuple[str, ...]:
+        return (
+            d.name or "",
+            f"@{d.username}" if d.username else not_set,
+            d.birth or "",
+            d.phone or "",
+            department.get(d.department, d.department) or "",
+            d.address_text or not_set,
+            nationality.get(d.nationality, d.nationality) or "",
+            education.get(d.education, d.education) or "",
+            marital.get(d.marital, d.marital) or "",
+            habits.get(d.habits, d.habits) or "",
+            percent(d.ru_level),
+            percent(d.en_level),
+            percent(d.cn_level),
+            percent(d.word_level),
+            percent(d.excel_level),
+            percent(d.onec_level),
+            source.get(d.source_info, d.source_info) or "",
+            d.prev_job or "",
+            d.salary or "",
+            shift.get(d.shift, d.shift) or "",
+            allow if d.ref_check else deny,
+            str(uid),
+        )
 
-    def percent(v: Optional[str]) -> str:
-        return (v or "0") + "%"
+    return values
 
-    addr = d.get("address_text") or tr(uid, "Ko‘rsatilmagan", "Не указано")
 
-    username = d.get("username")
-    if username:
-        username_display = f"@{username}"
-    else:
-        username_display = tr(uid, "Ko‘rsatilmagan", "Не указано")
+CARD_VALUES: Dict[str, CardValues] = {lang: compile_card_values(lang) for lang in ("uz", "ru")}
+PREVIEW_CARDS: Dict[str, CardTemplate] = compile_cards(PREVIEW_LAYOUTS, CARD_FIELDS)
+HR_CARDS: Dict[str, CardTemplate] = compile_cards(HR_LAYOUTS, CARD_FIELDS)
 
-    ref_text = tr(
-        uid,
-        uz="Ruxsat beraman" if d.get("ref_check") == "yes" else "Ruxsat bermayman",
-        ru="Разрешаю" if d.get("ref_check") == "yes" else "Не разрешаю",
-    )
+# Kartochkaga ta’sir qiluvchi barcha maydonlar – keshni tekshirish kaliti
+card_key = attrgetter(*(name for name in _SESSION_FIELDS if name not in ("step", "saved_step")))
 
-    text = tr(
-        uid,
-        uz="Iltimos, kiritgan ma’lumotlaringizni yana bir bor tekshirib chiqing:\n\n",
-        ru="Пожалуйста, внимательно проверьте введённые данные:\n\n",
-    )
 
-    text += (
-        f"👤 <b>F.I.Sh:</b> {d.get('name','')}\n"
-        f"👤 <b>Telegram username:</b> {username_display}\n"
-        f"🎂 <b>Tug‘ilgan sana:</b> {d.get('birth','')}\n"
-        f"📞 <b>Telefon:</b> {d.get('phone','')}\n"
-        f"🏢 <b>Bo‘lim:</b> {d.get('department','')}\n"
-        f"📍 <b>Yashash manzil:</b> {addr}\n"
-        f"🌐 <b>Millat:</b> {d.get('nationality','')}\n"
-        f"🎓 <b>Ma’lumoti:</b> {d.get('education','')}\n"
-        f"💍 <b>Oylaviy holat:</b> {d.get('marital','')}\n"
-        f"🚬 <b>Zararli odatlar:</b> {d.get('habits','')}\n\n"
-        f"🗣 <b>Tillar:</b>\n"
-        f"▪️ Rus tili: {percent(d.get('ru_level'))}\n"
-        f"▪️ Ingliz tili: {percent(d.get('en_level'))}\n"
-        f"▪️ Xitoy tili: {percent(d.get('cn_level'))}\n\n"
-        f"💻 <b>Kompyuter ko‘nikmalari:</b>\n"
-        f"▪️ Word: {percent(d.get('word_level'))}\n"
-        f"▪️ Excel: {percent(d.get('excel_level'))}\n"
-        f"▪️ 1C: {percent(d.get('onec_level'))}\n\n"
-        f"ℹ️ <b>Kompaniya haqida qayerdan eshitdingiz:</b> {d.get('source_info','')}\n"
-        f"💼 <b>Avvalgi ish joyingiz:</b> {d.get('prev_job','')}\n"
-        f"💰 <b>Hohlayotgan ish haqi:</b> {d.get('salary','')}\n"
-        f"🕒 <b>Smena:</b> {d.get('shift','')}\n"
-        f"📋 <b>Surishtirishga ruxsat:</b> {ref_text}\n"
-    )
+def hr_caption(uid: int, d: Session) -> str:
+    """HR kartochkasi: preview’dagi kesh, agar ma’lumotlar o‘shandan beri o‘zgarmagan bo‘lsa."""
+    cached = d.card_cache
+    if cached is not None and cached[0] == card_key(d):
+        return cached[1]
+    return HR_CARDS[d.lang].render(CARD_VALUES[d.lang](d, uid))
+
+
+def application_record(uid: int, d: Session) -> Dict[str, Any]:
+    """Arxiv qatori: sessiyadagi anketa maydonlari + Telegram ID."""
+    record = {name: getattr(d, name) for name in _SESSION_FIELDS}
+    record["uid"] = uid
+    return record
 
-    kb = InlineKeyboardMarkup(
-        inline_keyboard=[
-            [
-                InlineKeyboardButton(
-                    text=tr(uid, "✅ Tasdiqlash", "✅ Подтвердить"),
-                    callback_data="confirm",
-                )
-            ],
-            [
-                InlineKeyboardButton(
-                    text=tr(uid, "❌ Bekor qilish", "❌ Отменить"),
-                    callback_data="cancel",
-                )
-            ],
-        ]
-    )
 
-    await message.answer_photo(
-        photo=d["photo"],
+# ================== PREVIEW (TEKSHIRISH) ==================
+
+def send_preview(uid: int, message: Message) -> SendPhoto:
+    d = user_data[uid]
+    lang = d.lang
+    values = CARD_VALUES[lang](d, uid)
+    text = PREVIEW_CARDS[lang].render(values)
+    # HR kartochkasini ham shu qiymatlardan tayyorlab qo‘yamiz – tasdiqda qayta render kerak emas
+    d.card_cache = (card_key(d), HR_CARDS[lang].render(values))
+
+    return message.answer_photo(
+        photo=d.photo,
         caption=text,
-        reply_markup=kb,
+        reply_markup=KEYBOARDS[lang]["confirm"],
     )
 
 
 # ================== TASDIQLASH – KANALGA YUBORISH + SMS-STYLE XABAR ==================
 
+async def archive_application(uid: int, d: Session, now: float) -> None:
+    """
+    Arxivga yozish va takroriy/qidiruv indekslarini yangilash.
+
+    HR posti allaqachon navbatda – bu qadamlar best-effort: xato faqat log’ga
+    yoziladi va tasdiqni to‘xtatmaydi.
+    """
+    try:
+        applicants.add(uid, d.phone, now)
+    except Exception:
+        logging.exception(f"Applicant index update failed for {uid}")
+    try:
+        application_id = await asyncio.to_thread(archive.append, application_record(uid, d), now)
+    except Exception:
+        logging.exception(f"Archive append failed for {uid}")
+        return
+    try:
+        search_index.add(application_id, d.name, d.prev_job)
+    except Exception:
+        logging.exception(f"Search index update failed for application {application_id}")
+
+
+async def edit_preview(callback: CallbackQuery, text: str) -> None:
+    """
+    Preview xabari matnini almashtirish.
+
+    Xato (xabar eskirgan/o‘chirilgan, tarmoq) faqat log’ga yoziladi – nomzodga
+    javob xabari baribir yuborilishi kerak.
+    """
+    try:
+        if callback.message.photo:
+            await callback.message.edit_caption(caption=text)
+        else:
+            await callback.message.edit_text(text)
+    except Exception as e:
+        logging.warning(f"Preview edit failed for {callback.from_user.id}: {e!r}")
+
+
 @router.callback_query(F.data == "confirm")
 async def final_confirm(callback: CallbackQuery):
     uid = callback.from_user.id
+    # Bitta preview – bitta ariza: ikki marta bosish yoki eski preview’ni qayta tasdiqlash
+    application_key = f"{uid}:{callback.message.message_id}"
+    if application_key in confirmed_applications:
+        DUPLICATES.inc("confirm")
+        # Sessiya tasdiqda o‘chirilgan – til ariza bilan birga saqlangan
+        lang = confirmed_applications.get(application_key, "uz")
+        await callback.answer(
+            "Arizangiz allaqachon yuborilgan ✅" if lang == "uz" else "Ваша заявка уже отправлена ✅"
+        )
+        return
+
     d = user_data.get(uid)
-    if not d or "photo" not in d:
+    if d is None or d.photo is None:
         await callback.answer("Xatolik. Ma'lumot topilmadi.", show_alert=True)
         return
 
-    lang = d.get("lang", "uz")
-
-    def percent(v: Optional[str]) -> str:
-        return (v or "0") + "%"
-
-    addr = d.get("address_text") or tr(uid, "Ko‘rsatilmagan", "Не указано")
-
-    ref_text_uz = "Ruxsat beraman" if d.get("ref_check") == "yes" else "Ruxsat bermayman"
-    ref_text_ru = "Разрешаю" if d.get("ref_check") == "yes" else "Не разрешаю"
-
-    username = d.get("username")
-    if username:
-        username_display_uz = f"@{username}"
-        username_display_ru = f"@{username}"
-    else:
-        username_display_uz = "Ko‘rsatilmagan"
-        username_display_ru = "Не указано"
-
-    if lang == "uz":
-        text_hr = f"""
-📨 <b>Yangi ishga qabul arizasi</b>
-
-👤 <b>F.I.Sh:</b> {d.get('name','')}
-👤 <b>Telegram username:</b> {username_display_uz}
-🎂 <b>Tug‘ilgan sana:</b> {d.get('birth','')}
-📞 <b>Telefon:</b> {d.get('phone','')}
-🏢 <b>Talab qilayotgan bo‘lim:</b> {d.get('department','')}
-📍 <b>Yashash manzili:</b> {addr}
-🌐 <b>Millati:</b> {d.get('nationality','')}
-🎓 <b>Ma’lumoti:</b> {d.get('education','')}
-💍 <b>Oylaviy holati:</b> {d.get('marital','')}
-🚬 <b>Zararli odatlari:</b> {d.get('habits','')}
-
-🗣 <b>Tillar:</b>
-▪️ Rus tili: {percent(d.get('ru_level'))}
-▪️ Ingliz tili: {percent(d.get('en_level'))}
-▪️ Xitoy tili: {percent(d.get('cn_level'))}
-
-💻 <b>Kompyuter ko‘nikmalari:</b>
-▪️ Word: {percent(d.get('word_level'))}
-▪️ Excel: {percent(d.get('excel_level'))}
-▪️ 1C: {percent(d.get('onec_level'))}
-
-ℹ️ <b>Kompaniya haqida qayerdan eshitgan:</b> {d.get('source_info','')}
-💼 <b>Avvalgi ish joyi:</b> {d.get('prev_job','')}
-💰 <b>Hohlayotgan ish haqi:</b> {d.get('salary','')}
-🕒 <b>Smena:</b> {d.get('shift','')}
-
-📋 <b>Surishtirishga munosabati:</b> {ref_text_uz}
-
-🆔 <b>Telegram ID:</b> <code>{uid}</code>
-"""
-        sms_text = (
-            "✅ Arizangiz muvaffaqiyatli qabul qilindi!\n"
-            "HR bo‘limi siz bilan 3 ish kuni ichida bog‘lanadi.\n"
-            "Rahmat!"
-        )
-    else:
-        text_hr = f"""
-📨 <b>Новая заявка на трудоустройство</b>
-
-👤 <b>Ф.И.О.:</b> {d.get('name','')}
-👤 <b>Telegram username:</b> {username_display_ru}
-🎂 <b>Дата рождения:</b> {d.get('birth','')}
-📞 <b>Телефон:</b> {d.get('phone','')}
-🏢 <b>Желаемый отдел:</b> {d.get('department','')}
-📍 <b>Адрес проживания:</b> {addr}
-🌐 <b>Национальность:</b> {d.get('nationality','')}
-🎓 <b>Образование:</b> {d.get('education','')}
-💍 <b>Семейное положение:</b> {d.get('marital','')}
-🚬 <b>Вредные привычки:</b> {d.get('habits','')}
-
-🗣 <b>Языки:</b>
-▪️ Русский язык: {percent(d.get('ru_level'))}
-▪️ Английский язык: {percent(d.get('en_level'))}
-▪️ Китайский язык: {percent(d.get('cn_level'))}
-
-💻 <b>Компьютерные навыки:</b>
-▪️ Word: {percent(d.get('word_level'))}
-▪️ Excel: {percent(d.get('excel_level'))}
-▪️ 1C: {percent(d.get('onec_level'))}
-
-ℹ️ <b>Источник информации о компании:</b> {d.get('source_info','')}
-💼 <b>Предыдущее место работы:</b> {d.get('prev_job','')}
-💰 <b>Желаемая зарплата:</b> {d.get('salary','')}
-🕒 <b>Смена:</b> {d.get('shift','')}
-
-📋 <b>Отношение к проверке рекомендаций:</b> {ref_text_ru}
-
-🆔 <b>Telegram ID:</b> <code>{uid}</code>
-"""
-        sms_text = (
-            "✅ Ваша заявка успешно принята!\n"
-            "Наш HR-отдел свяжется с вами в течение 3 рабочих дней.\n"
-            "Спасибо!"
+    now = time.time()
+    previous = applicants.previous(uid, d.phone, now) if DUPLICATE_WINDOW_DAYS > 0 else None
+    if previous is not None and DUPLICATE_ACTION == "block":
+        DUPLICATES.inc("applicant")
+        next_date = datetime.datetime.fromtimestamp(previous + applicants.window, TASHKENT)
+        blocked_text = tr(
+            uid,
+            f"Siz yaqinda ariza yuborgansiz. Qayta ariza {next_date:%d.%m.%Y} dan keyin qabul qilinadi.",
+            f"Вы недавно уже отправляли заявку. Повторную заявку можно подать после {next_date:%d.%m.%Y}.",
         )
+        user_data.pop(uid, None)
+        await edit_preview(callback, blocked_text)
+        return
 
-    # 1) HR kanal/guruhga yuboramiz
-    await bot.send_photo(
+    text_hr = hr_caption(uid, d)
+    if previous is not None:
+        DUPLICATES.inc("applicant")
+        first = datetime.datetime.fromtimestamp(previous, TASHKENT)
+        text_hr = f"⚠️ <b>Takroriy ariza</b> – oldingisi {first:%d.%m.%Y %H:%M}\n{text_hr}"
+    lang = d.lang
+    sms_text = SMS_TEXTS[lang]
+
+    # 1) HR kanal/guruhga – navbatga yozamiz (fon vazifasi yuboradi, limit/xatoda qayta uradi)
+    await hr_outbox.enqueue(
+        "send_photo",
         chat_id=HR_CHAT_ID,
-        photo=d["photo"],
+        photo=d.photo,
         caption=text_hr,
     )
+    # Ariza navbatda – tasdiq kalitini va sessiyani darhol yozamiz: keyingi qadamlar
+    # xato bersa ham qayta bosish ikkinchi HR postini yubormasin
+    confirmed_applications.add(application_key, lang)
+    user_data.pop(uid, None)
+    await confirmed_applications.flush()
+    await archive_application(uid, d, now)
 
-    # 2) Preview xabarini o‘zgartiramiz
-    done_text = tr(
-        uid,
-        "Arizangiz yuborildi ✅",
-        "Ваша заявка отправлена ✅",
-    )
-
-    if callback.message.photo:
-        await callback.message.edit_caption(done_text)
-    else:
-        await callback.message.edit_text(done_text)
+    # 2) Preview xabarini o‘zgartiramiz (sessiya yo‘q – til oldindan olingan)
+    done_text = "Arizangiz yuborildi ✅" if lang == "uz" else "Ваша заявка отправлена ✅"
+    await edit_preview(callback, done_text)
 
     # 3) Nomzodga alohida "SMS-style" xabar
-    await bot.send_message(chat_id=uid, text=sms_text)
-
-    # 4) Ma'lumotlarni tozalaymiz
-    user_data.pop(uid, None)
+    return SendMessage(chat_id=uid, text=sms_text)
 
 
 @router.callback_query(F.data == "cancel")
 async def final_cancel(callback: CallbackQuery):
     uid = callback.from_user.id
-    user_data.pop(uid, None)
-
     cancel_text = tr(
         uid,
         "Ariza bekor qilindi. Agar xohlasangiz, qayta /start bosib yangidan boshlashingiz mumkin.",
         "Заявка отменена. Если хотите, можете начать заново, отправив /start.",
     )
+    user_data.pop(uid, None)
+    await edit_preview(callback, cancel_text)
+
+
+# ================== HR: ARIZALAR ARXIVI ==================
+
+def is_hr(event: Union[Message, CallbackQuery]) -> bool:
+    """HR guruhi yoki HR_USER_IDS dagi xodim."""
+    message = event.message if isinstance(event, CallbackQuery) else event
+    return message.chat.id == HR_CHAT_ID or event.from_user.id in HR_USER_IDS
+
+
+hr_router.message.filter(is_hr)
+hr_router.callback_query.filter(is_hr)
+
+# Filtr kalitlari (apostrof variantlarisiz, kichik harfda) -> ApplicationFilter maydoni
+HR_FILTER_KEYS = {
+    "bolim": "department", "department": "department", "отдел": "department",
+    "smena": "shift", "shift": "shift", "смена": "shift",
+    "manba": "source_info", "source": "source_info", "источник": "source_info",
+    "tel": "phone", "telefon": "phone", "phone": "phone", "телефон": "phone",
+    "id": "uid", "uid": "uid",
+    "sana": "date", "date": "date", "дата": "date",
+}
+HR_FILTER_TABLES = {"department": DEPARTMENTS, "shift": SHIFTS, "source_info": SOURCES}
+# Tugma matnlari (ikkala tilda, katta-kichik harfsiz) -> kod
+HR_FILTER_LABELS = {
+    field: {label.casefold(): code for label, code in _choice_codes(table).items()}
+    for field, table in HR_FILTER_TABLES.items()
+}
+_APOSTROPHES = str.maketrans("", "", "‘’ʻʼ'`")
+
+
+def parse_day(text: str) -> datetime.date:
+    for fmt in ("%Y-%m-%d", "%d.%m.%Y"):
+        try:
+            return datetime.datetime.strptime(text.strip(), fmt).date()
+        except ValueError:
+            pass
+    raise ValueError(f"sana noto‘g‘ri: {text}")
+
+
+def parse_hr_filter(args: str) -> ApplicationFilter:
+    """
+    "/arizalar bo‘lim=Kassa; smena=1; sana=2024-05-01..2024-05-31" -> ApplicationFilter.
+
+    Tanlovlar tugma matni (uz/ru) yoki kodi bilan, sana – bitta kun yoki oraliq.
+    """
+    values: Dict[str, Any] = {}
+    for part in (args or "").split(";"):
+        if not part.strip():
+            continue
+        key, sep, value = part.partition("=")
+        field = HR_FILTER_KEYS.get(key.strip().casefold().translate(_APOSTROPHES))
+        value = value.strip()
+        if not sep or field is None or not value:
+            raise ValueError(f"noma’lum filtr: {part.strip()}")
+        if field in HR_FILTER_LABELS:
+            code = HR_FILTER_LABELS[field].get(value.casefold())
+            values[field] = code if code is not None else int(value) if value.isdigit() else value
+        elif field == "uid":
+            values["uid"] = int(value)
+        elif field == "date":
+            first, _, last = value.partition("..")
+            values["since"], values["until"] = day_range(parse_day(first), parse_day(last or first))
+        else:
+            values[field] = value
+    return ApplicationFilter(**values)
+
+
+def application_line(row: Dict[str, Any]) -> str:
+    submitted = datetime.datetime.fromtimestamp(row["submitted"], TASHKENT)
+    contact = (
+        f"@{html.escape(row['username'])}" if row["username"]
+        else f'<a href="tg://user?id={row["uid"]}">{row["uid"]}</a>'
+    )
+    return (
+        f"<b>#{row['id']}</b> {submitted:%d.%m.%Y %H:%M} – {html.escape(row['name'] or '')}\n"
+        f"📞 {html.escape(row['phone'] or '')} · "
+        f"{html.escape(choice_text(DEPARTMENTS, row['department'], 'uz'))} · "
+        f"{html.escape(choice_text(SHIFTS, row['shift'], 'uz'))} · {contact}"
+    )
 
-    if callback.message.photo:
-        await callback.message.edit_caption(cancel_text)
+
+def archive_page(
+    filters: ApplicationFilter, before_id: Optional[int] = None, after_id: Optional[int] = None
+) -> Tuple[int, List[Dict[str, Any]], bool, bool]:
+    """(jami, sahifa, yangiroqlari bormi, eskiroqlari bormi) – bitta thread chaqiruvida."""
+    total = archive.count(filters)
+    if after_id is not None:
+        rows = archive.query(filters, HR_PAGE_SIZE + 1, after_id=after_id)
+        newer = len(rows) > HR_PAGE_SIZE
+        rows = rows[-HR_PAGE_SIZE:]
+        older = bool(rows) and archive.query(filters, 1, before_id=rows[-1]["id"]) != []
+        return total, rows, newer, older
+    rows = archive.query(filters, HR_PAGE_SIZE + 1, before_id=before_id)
+    older = len(rows) > HR_PAGE_SIZE
+    rows = rows[:HR_PAGE_SIZE]
+    newer = before_id is not None and bool(rows) and archive.has_newer(filters, rows[0]["id"])
+    return total, rows, newer, older
+
+
+async def render_archive_page(
+    header: str, filters: ApplicationFilter, before_id: Optional[int] = None, after_id: Optional[int] = None
+) -> Tuple[str, Optional[InlineKeyboardMarkup]]:
+    total, rows, newer, older = await asyncio.to_thread(archive_page, filters, before_id, after_id)
+    lines = [html.escape(header), f"Topildi: {total}"]
+    lines.extend(application_line(row) for row in rows)
+    buttons = []
+    if newer:
+        buttons.append(InlineKeyboardButton(text="◀️ Yangiroq", callback_data=f"hr:<:{rows[0]['id']}"))
+    if older:
+        buttons.append(InlineKeyboardButton(text="Eskiroq ▶️", callback_data=f"hr:>:{rows[-1]['id']}"))
+    markup = InlineKeyboardMarkup(inline_keyboard=[buttons]) if buttons else None
+    return "\n\n".join(lines), markup
+
+
+# Eksportdagi tanlov ustunlari – HR kartochkasidagi kabi o‘zbekcha matn
+EXPORT_LABELS = {
+    "department": DEPARTMENTS["uz"],
+    "nationality": NATIONALITIES["uz"],
+    "education": EDUCATIONS["uz"],
+    "marital": MARITAL_STATUSES["uz"],
+    "habits": HABITS["uz"],
+    **{level: PERCENTS["uz"] for level in (
+        "ru_level", "en_level", "cn_level", "word_level", "excel_level", "onec_level",
+    )},
+    "source_info": SOURCES["uz"],
+    "shift": SHIFTS["uz"],
+    "ref_check": ["Ruxsat bermayman", "Ruxsat beraman"],
+}
+
+
+def export_filter(query: Dict[str, str]) -> ApplicationFilter:
+    return parse_hr_filter("; ".join(f"{key}={value}" for key, value in query.items()))
+
+
+@hr_router.message(Command("arizalar"))
+async def hr_applications(message: Message, command: CommandObject):
+    # Sahifalash holatsiz: filtr javobning birinchi qatoridan qayta o‘qiladi
+    args = (command.args or "").strip()
+    try:
+        filters = parse_hr_filter(args)
+    except ValueError as e:
+        return message.answer(
+            html.escape(f"Filtr xato: {e}\n"
+                        "Misol: /arizalar bo‘lim=Kassa; smena=Ertalab smena; sana=01.05.2024..31.05.2024")
+        )
+    text, markup = await render_archive_page(f"🔎 /arizalar {args}".rstrip(), filters)
+    return message.answer(text, reply_markup=markup)
+
+
+@hr_router.message(Command("qidirish"))
+async def hr_search(message: Message, command: CommandObject):
+    query = (command.args or "").strip()
+    if not query:
+        return message.answer("Misol: /qidirish Yusupov Sherzod (lotin yoki kirill, xato yozilgan bo‘lsa ham)")
+    if search_index.loading:
+        return message.answer("Qidiruv indeksi yuklanmoqda, birozdan keyin qayta urinib ko‘ring.")
+    results = search_index.search(query, HR_PAGE_SIZE)
+    rows = await asyncio.to_thread(archive.by_ids, [app_id for app_id, _, _ in results])
+    matched = {app_id: field for app_id, field, _ in results}
+    lines = [html.escape(f"🔎 /qidirish {query}"), f"Topildi: {len(rows)}"]
+    for row in rows:
+        line = application_line(row)
+        if matched[row["id"]] == "prev_job":
+            line += f"\n💼 {html.escape(row['prev_job'] or '')}"
+        lines.append(line)
+    return message.answer("\n\n".join(lines))
+
+
+@hr_router.callback_query(F.data.startswith("hr:"))
+async def hr_applications_page(callback: CallbackQuery):
+    _, direction, anchor = callback.data.split(":")
+    header = callback.message.text.split("\n", 1)[0]
+    args = header.removeprefix("🔎 /arizalar").strip()
+    try:
+        filters = parse_hr_filter(args)
+    except ValueError:
+        await callback.answer("Filtr xato", show_alert=True)
+        return
+    if direction == ">":
+        text, markup = await render_archive_page(header, filters, before_id=int(anchor))
     else:
-        await callback.message.edit_text(cancel_text)
+        text, markup = await render_archive_page(header, filters, after_id=int(anchor))
+    await callback.answer()
+    return callback.message.edit_text(text, reply_markup=markup)
+
+
+# ================== METRIKALAR (PROMETHEUS) ==================
+
+# Label qiymatlari oldindan ma’lum va chegaralangan – update’dagi ma’lumot label bo‘lmaydi
+HANDLER_NAMES = tuple(
+    handler.callback.__name__
+    for observer in (hr_router.message, hr_router.callback_query, router.message, router.callback_query)
+    for handler in observer.handlers
+) + ("other",)
+STEP_NAMES = tuple(step.name for step in Step)
+# Handler’lardan keyingi step o‘tishlari shu handler’larda hisoblanadi
+STEP_HANDLERS = {"form_steps", "final_confirm"}
+API_METHODS = (
+    "sendMessage", "sendPhoto", "sendDocument", "editMessageCaption", "editMessageText", "answerCallbackQuery",
+    "setWebhook", "deleteWebhook", "getWebhookInfo", "getUpdates", "getMe", "other",
+)
+API_METHOD_SET = frozenset(API_METHODS)
+API_ERRORS = ("retry_after", "bad_request", "forbidden", "network", "server", "other")
+
+registry = Registry()
+HANDLER_DURATION = registry.register(Histogram(
+    "roshaa_handler_duration_seconds", "Handler execution time",
+    labelnames=("handler",), label_values=[(n,) for n in HANDLER_NAMES],
+))
+HANDLER_ERRORS = registry.register(Counter(
+    "roshaa_handler_errors_total", "Handlers that raised an exception",
+    labelnames=("handler",), label_values=[(n,) for n in HANDLER_NAMES],
+))
+STEP_TRANSITIONS = registry.register(Counter(
+    "roshaa_step_transitions_total", "Accepted answers, by the step they completed",
+    labelnames=("step",), label_values=[(n,) for n in STEP_NAMES],
+))
+STEP_RETRIES = registry.register(Counter(
+    "roshaa_step_retries_total", "Answers that did not advance the step",
+    labelnames=("step",), label_values=[(n,) for n in STEP_NAMES],
+))
+STEP_DURATION = registry.register(Histogram(
+    "roshaa_step_duration_seconds", "Time spent handling an answer, by step",
+    labelnames=("step",), label_values=[(n,) for n in STEP_NAMES],
+))
+API_DURATION = registry.register(Histogram(
+    "roshaa_api_request_duration_seconds", "Outbound Bot API request latency",
+    labelnames=("method",), label_values=[(m,) for m in API_METHODS],
+))
+API_ERRORS_TOTAL = registry.register(Counter(
+    "roshaa_api_errors_total", "Failed outbound Bot API requests",
+    labelnames=("method", "error"),
+    label_values=[(m, e) for m in API_METHODS for e in API_ERRORS],
+))
+for _metric in (
+    Gauge("roshaa_sessions_active", "Sessions held in memory", fn=lambda: len(user_data)),
+    CounterFunc("roshaa_sessions_evicted_ttl_total", "Sessions dropped after SESSION_TTL",
+                fn=lambda: user_data.evicted_ttl),
+    CounterFunc("roshaa_sessions_evicted_lru_total", "Sessions dropped over SESSION_MAX_ENTRIES",
+                fn=lambda: user_data.evicted_lru),
+    CounterFunc("roshaa_session_flushed_rows_total", "Session rows written to the backend",
+                fn=lambda: user_data.flushed_rows),
+    Gauge("roshaa_user_locks", "Users with an update in progress", fn=lambda: len(user_locks)),
+    Gauge("roshaa_user_lock_waiters", "Updates waiting for their user's lock",
+          fn=user_locks.waiting),
+    Gauge("roshaa_hr_outbox_pending", "HR posts waiting to be sent", fn=hr_outbox.pending),
+    CounterFunc("roshaa_hr_outbox_sent_total", "HR posts delivered", fn=lambda: hr_outbox.sent),
+    CounterFunc("roshaa_hr_outbox_failed_total", "HR posts moved to dead letters",
+                fn=lambda: hr_outbox.failed),
+):
+    registry.register(_metric)
+# Cold start: import, app yig‘ish, port ochilguncha (jarayon boshidan) va kechiktirilgan sozlash
+STARTUP_PHASES = ("import", "app_build", "listening", "deferred_setup")
+DUPLICATES = registry.register(Counter(
+    "roshaa_duplicates_total",
+    "Duplicates: redelivered updates, repeated confirms and repeat applicants",
+    labelnames=("kind",), label_values=[("update",), ("confirm",), ("applicant",)],
+))
+STARTUP_SECONDS = registry.register(Gauge(
+    "roshaa_startup_seconds", "Cold start timings of the current process",
+    labelnames=("phase",), label_values=[(p,) for p in STARTUP_PHASES],
+))
+# Hisobot tuzish: worker ichidagi vaqt (navbatda kutishsiz)
+DIGEST_DURATION = registry.register(Histogram(
+    "roshaa_digest_duration_seconds", "HR digest build time in the worker process, by period",
+    labelnames=("period",), label_values=[(p,) for p in PERIOD_TITLES],
+    buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+))
+if RUN_MODE == "polling":
+    registry.register(CounterFunc("roshaa_polling_updates_total", "Updates received via getUpdates",
+                                  fn=lambda: poller.updates))
+    registry.register(CounterFunc("roshaa_polling_batches_total", "Non-empty getUpdates batches",
+                                  fn=lambda: poller.batches))
+    registry.register(Gauge("roshaa_polling_in_flight", "Polled updates being processed",
+                            fn=lambda: poller.in_flight))
+if rate_limiter is not None:
+    registry.register(rate_limiter.wait)
+    registry.register(Gauge("roshaa_ratelimit_queue_depth", "Requests waiting for a token",
+                            fn=rate_limiter.queue_depth))
+    registry.register(CounterFunc("roshaa_ratelimit_retry_after_total",
+                                  "TelegramRetryAfter responses received",
+                                  fn=lambda: rate_limiter.retry_after_count))
+
+
+def api_error_kind(error: BaseException) -> str:
+    if isinstance(error, TelegramRetryAfter):
+        return "retry_after"
+    if isinstance(error, TelegramBadRequest):
+        return "bad_request"
+    if isinstance(error, TelegramForbiddenError):
+        return "forbidden"
+    if isinstance(error, (TelegramNetworkError, asyncio.TimeoutError)):
+        return "network"
+    if isinstance(error, TelegramServerError):
+        return "server"
+    return "other"
+
+
+def observe_api_call(method: str, seconds: float, error: Optional[BaseException]) -> None:
+    if method not in API_METHOD_SET:
+        method = "other"
+    API_DURATION.observe(seconds, method)
+    trace = current_trace()
+    if trace is not None:
+        trace.api(method, seconds)
+    if error is not None:
+        API_ERRORS_TOTAL.inc(method, api_error_kind(error))
+
+
+bot.session.observer = observe_api_call
+
+
+async def observe_handler(handler, event, data):
+    """Handler kechikishi va (anketa handler’larida) step o‘tishlari."""
+    name = data["handler"].callback.__name__
+    if name not in HANDLER_NAMES:
+        name = "other"
+    step = None
+    if name in STEP_HANDLERS:
+        session = user_data.get(data["event_from_user"].id)
+        step = session.step if session is not None else None
+    started = time.perf_counter()
+    try:
+        return await handler(event, data)
+    except Exception:
+        HANDLER_ERRORS.inc(name)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        HANDLER_DURATION.observe(elapsed, name)
+        trace = current_trace()
+        if trace is not None:
+            trace.add(f"handler:{name}", elapsed)
+        if step is not None and step != Step.NONE:
+            session = user_data.get(data["event_from_user"].id)
+            if session is None or session.step != step:
+                STEP_TRANSITIONS.inc(step.name)
+            else:
+                STEP_RETRIES.inc(step.name)
+            STEP_DURATION.observe(elapsed, step.name)
+
+
+router.message.middleware(observe_handler)
+router.callback_query.middleware(observe_handler)
+hr_router.message.middleware(observe_handler)
+hr_router.callback_query.middleware(observe_handler)
 
 
 # ================== WEBHOOK SERVER (AIOHTTP + RENDER) ==================
 
-async def on_startup(app: web.Application):
+async def ensure_webhook() -> None:
+    """Webhook’ni faqat URL yoki sozlamalar farq qilsa qayta o‘rnatamiz (cold start’da bitta getWebhookInfo)."""
+    allowed_updates = sorted(dp.resolve_used_update_types())
+    info = await bot.get_webhook_info()
+    if (
+        info.url == WEBHOOK_URL
+        and sorted(info.allowed_updates or ()) == allowed_updates
+        and info.max_connections == WEBHOOK_MAX_CONNECTIONS
+    ):
+        logging.info(f"Webhook already set ({info.pending_update_count} pending updates)")
+        if info.last_error_message:
+            logging.warning(f"Webhook last error: {info.last_error_message}")
+        return
     logging.info(f"Setting webhook to {WEBHOOK_URL}")
-    await bot.set_webhook(WEBHOOK_URL)
+    await bot.set_webhook(
+        WEBHOOK_URL,
+        allowed_updates=allowed_updates,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+    )
+
+
+def _background_done(task: asyncio.Task) -> None:
+    background_tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        # Fon vazifasi jimgina to‘xtab qolmasin
+        logging.error(f"Background task {task.get_coro().__qualname__} failed", exc_info=task.exception())
+
+
+def start_background(aw) -> asyncio.Task:
+    task = asyncio.ensure_future(aw)
+    background_tasks.add(task)
+    task.add_done_callback(_background_done)
+    return task
+
+
+async def deferred_setup() -> None:
+    """Port ochilgandan keyin: fon vazifalari va webhook/polling – birinchi javobni kechiktirmaydi."""
+    started = time.perf_counter()
+    start_background(user_data.run_maintenance(SESSION_FLUSH_INTERVAL))
+    start_background(hr_outbox.run_sender(bot))
+    if DEDUP_DB_PATH:
+        start_background(seen_updates.run_flusher(SESSION_FLUSH_INTERVAL))
+    if DIGEST_AT is not None:
+        start_background(run_digests())
+    start_background(load_search_index())
+    logging.info(f"HR outbox: {hr_outbox.pending()} pending messages")
+
+    for attempt in range(5):
+        try:
+            if RUN_MODE == "polling":
+                # Webhook o‘rnatilgan bo‘lsa getUpdates 409 beradi; kutayotgan update’lar saqlanadi
+                await bot.delete_webhook(drop_pending_updates=False)
+            else:
+                await ensure_webhook()
+            break
+        except Exception as e:
+            logging.warning(f"Webhook setup failed (attempt {attempt + 1}): {e}")
+            await asyncio.sleep(2 ** attempt)
+    if RUN_MODE == "polling":
+        # Webhook bilan bir xil ro‘yxat: handler’i yo‘q update turlari umuman kelmaydi.
+        # Hamma handler’lar ro‘yxatdan o‘tgach hisoblanadi (modul yuklanishida hali yo‘q)
+        poller.allowed_updates = sorted(dp.resolve_used_update_types())
+        start_background(poller.run())
+
+    STARTUP_SECONDS.set(time.perf_counter() - started, "deferred_setup")
+    logging.info(
+        "Startup timings: "
+        + ", ".join(f"{phase} {STARTUP_SECONDS.value(phase) * 1e3:.0f} ms" for phase in STARTUP_PHASES)
+    )
+
+
+async def load_search_index() -> None:
+    started = time.perf_counter()
+    try:
+        rows = await asyncio.to_thread(archive.search_rows)
+        await asyncio.to_thread(search_index.load, rows)
+        logging.info(
+            f"Search index: {len(rows)} applications, {len(search_index)} words, "
+            f"loaded in {(time.perf_counter() - started) * 1e3:.0f} ms"
+        )
+    except Exception:
+        # Indeks to‘liq emas, lekin yangi arizalar qo‘shilaveradi – /qidirish "yuklanmoqda" da qolib ketmasin
+        logging.exception("Search index load failed")
+    finally:
+        # Yuklash paytida tasdiqlangan arizalar navbatda turgan – endi qo‘shiladi
+        search_index.finish_load()
+
+
+async def send_digests(day: datetime.date) -> None:
+    """`day` kungi hisobotlar: har bir davr va bo‘lim – alohida worker vazifasi, tayyor fayl HR navbatiga."""
+    async def build(*args) -> Dict[str, Any]:
+        async with digest_workers:
+            return await build_digest_in_worker(*args)
+
+    jobs = []
+    for period, first, last in digest_periods(day, DIGEST_WEEKDAY):
+        for department, label in enumerate(DEPARTMENTS["uz"]):
+            path = os.path.join(DIGEST_DIR, f"{period}-{first:%Y%m%d}-{department}.xlsx")
+            future = build(ARCHIVE_PATH, path, period, first, last, department, EXPORT_LABELS)
+            jobs.append((period, first, last, label, path, future))
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(job[-1] for job in jobs), return_exceptions=True)
+    for (period, first, last, label, path, _), result in zip(jobs, results):
+        span = f"{first:%d.%m.%Y}" if first == last else f"{first:%d.%m.%Y}–{last:%d.%m.%Y}"
+        if isinstance(result, BaseException):
+            logging.error(f"Digest {period} {label} {span} failed: {result!r}")
+            continue
+        DIGEST_DURATION.observe(result["seconds"], period)
+        logging.info(
+            f"Digest {period} {label} {span}: {result['rows']} applications, "
+            f"built in {result['seconds'] * 1e3:.0f} ms (cpu {result['cpu_seconds'] * 1e3:.0f} ms)"
+        )
+        if not result["rows"]:
+            continue
+        await hr_outbox.enqueue(
+            "send_document",
+            chat_id=HR_CHAT_ID,
+            document={"file": path, "filename": f"{PERIOD_TITLES[period]} – {label} – {span}.xlsx"},
+            caption=f"📊 <b>{PERIOD_TITLES[period]}</b>: {html.escape(label)}, {span} – {result['rows']} ta ariza",
+        )
+    logging.info(f"Digests for {day:%d.%m.%Y}: {len(jobs)} jobs in {time.perf_counter() - started:.1f} s")
+
+
+async def run_digests() -> None:
+    """Fon vazifasi: har kuni DIGEST_TIME da hisobotlarni tuzadi; bot o‘chiq paytida o‘tkazib yuborilganlarini – darhol."""
+    at = DIGEST_AT
+    await asyncio.to_thread(os.makedirs, DIGEST_DIR, exist_ok=True)
+
+    async def run_day(day: datetime.date) -> None:
+        try:
+            await send_digests(day)
+            await asyncio.to_thread(mark_run, DIGEST_DIR, day)
+            await asyncio.to_thread(remove_old, DIGEST_DIR, DIGEST_KEEP_DAYS)
+        except Exception:
+            logging.exception("HR hisobotlarini tayyorlashda xatolik")
+
+    last = datetime.datetime.now(TASHKENT)
+    done = await asyncio.to_thread(read_last_run, DIGEST_DIR)
+    for day in missed_days(done, last, at):
+        logging.info(f"Catching up digests missed on {day:%d.%m.%Y}")
+        await run_day(day)
+    if done is None:
+        # Birinchi ishga tushish – keyingi safar shu kundan beri o‘tkazib yuborilganlar hisoblanadi
+        await asyncio.to_thread(mark_run, DIGEST_DIR, (next_run(last, at) - datetime.timedelta(days=1)).date())
+    while True:
+        run = next_run(last, at)
+        await asyncio.sleep(max(0.0, (run - datetime.datetime.now(TASHKENT)).total_seconds()))
+        last = run
+        await run_day(run.date())
+
+
+def on_listening(message: str) -> None:
+    """web.run_app barcha site’lar ochilgach chaqiradi – birinchi so‘rovga tayyor."""
+    STARTUP_SECONDS.set(time.perf_counter() - _STARTED, "listening")
+    logging.info(message.splitlines()[0])
+    start_background(deferred_setup())
+
+
+async def on_startup(app: web.Application):
+    # Sessiyalar birinchi update’dan oldin kerak – faqat shu port ochilishidan oldin
+    restored = user_data.load()
+    logging.info(f"Restored {restored} sessions from {SESSION_BACKEND} backend")
+    seen_updates.load()
+    confirmed_applications.load()
+    if DUPLICATE_WINDOW_DAYS > 0:
+        started = time.perf_counter()
+        rows = await asyncio.to_thread(archive.applicants_since, int(time.time() - applicants.window))
+        applicants.load(rows)
+        logging.info(
+            f"Applicant index: {len(rows)} applications from the last {DUPLICATE_WINDOW_DAYS:g} days, "
+            f"{len(applicants)} applicants, loaded in {(time.perf_counter() - started) * 1e3:.0f} ms"
+        )
+    deferred = drainer.load()
+    if deferred:
+        # Oldingi instansiya ulgurmagan update’lar – yangilaridan oldin navbatga turadi
+        logging.info(f"Replaying {len(deferred)} updates deferred by the previous instance")
+        start_background(drainer.replay(dp, bot, deferred))
 
 
 async def on_shutdown(app: web.Application):
-    logging.info("Deleting webhook and closing bot session")
-    await bot.delete_webhook()
+    # main() da birinchi qo‘yiladi: aiogram webhook handler’i session’ni yopishidan oldin drain qilamiz.
+    # aiohttp bu paytda yangi ulanishlarni qabul qilmaydi, ochiq ulanishlardagi POST’lar 503 oladi.
+    started = time.monotonic()
+    if RUN_MODE == "polling":
+        poller.stop()
+    logging.info(f"Draining {drainer.in_flight} in-flight updates (timeout {DRAIN_TIMEOUT:g} s)")
+    await drainer.drain(DRAIN_TIMEOUT)
+
+    # HR navbati: qolgan vaqt ichida yuborib olamiz, qolgani diskda turadi va keyin yuboriladi
+    deadline = started + DRAIN_TIMEOUT
+    # Faqat hozir yuborsa bo‘ladiganlarni kutamiz: backoff/flood limitdagilar baribir diskda qoladi
+    while time.monotonic() < deadline and await asyncio.to_thread(hr_outbox.due):
+        await asyncio.sleep(0.05)
+    logging.info(
+        f"Drain finished in {time.monotonic() - started:.1f} s: {drainer.drained} updates drained, "
+        f"{drainer.deferred} deferred to next start, {drainer.cut_off} cut off; "
+        f"HR outbox: {hr_outbox.pending()} pending"
+    )
+
+    # Webhook o‘chirilmaydi: yangi instansiya ko‘tarilguncha Telegram update’larni saqlab turadi
+    logging.info("Closing bot session")
     await bot.session.close()
 
+    for task in list(background_tasks):
+        task.cancel()
+    user_data.flush_sync()
+    user_data.backend.close()
+    for keys in (seen_updates, confirmed_applications):
+        keys.flush_sync()
+        keys.close()
+    hr_outbox.close()
+    archive.close()
+
 
 def main():
+    build_started = time.perf_counter()
+    STARTUP_SECONDS.set(build_started - _STARTED, "import")
     app = web.Application()
 
-    # Aiogram webhook handlerni ro'yxatdan o'tkazamiz
-    SimpleRequestHandler(dispatcher=dp, bot=bot).register(app, path=WEBHOOK_PATH)
+    # Aiogram webhook handlerni ro'yxatdan o'tkazamiz (polling’da – yo‘q)
+    if RUN_MODE == "polling":
+        request_handler = None
+    elif WEBHOOK_MODE == "queued":
+        request_handler = QueuedRequestHandler(
+            dispatcher=dp,
+            bot=bot,
+            workers=WEBHOOK_WORKERS,
+            queue_size=WEBHOOK_QUEUE_SIZE,
+        )
+    elif WEBHOOK_MODE == "reply":
+        # Update javobini kutamiz: handler qaytargan metod HTTP javobida ketadi
+        request_handler = SimpleRequestHandler(dispatcher=dp, bot=bot, handle_in_background=False)
+    else:
+        request_handler = SimpleRequestHandler(dispatcher=dp, bot=bot)
+    if request_handler is not None:
+        request_handler.register(app, path=WEBHOOK_PATH)
     setup_application(app, dp, bot=bot)
 
-    # Startup / shutdown hodisalari
+    if isinstance(request_handler, QueuedRequestHandler):
+        drainer.add_source(request_handler.depth, request_handler.take_pending)
+        registry.register(Gauge("roshaa_webhook_queue_depth", "Updates queued for workers",
+                                fn=request_handler.depth))
+        registry.register(CounterFunc("roshaa_webhook_rejected_total",
+                                      "Updates rejected with 503 because the queue was full",
+                                      fn=lambda: request_handler.rejected))
+    app.router.add_get(METRICS_PATH, metrics_handler(registry, METRICS_TOKEN))
+    if ADMIN_TOKEN:
+        app.router.add_get(PROFILE_PATH, profile_handler(ADMIN_TOKEN))
+    if EXPORT_TOKEN:
+        app.router.add_get(EXPORT_PATH, export_handler(archive, EXPORT_TOKEN, export_filter, EXPORT_LABELS))
+    if RUN_MODE == "polling":
+        drainer.add_source(lambda: int(poller.running), list)
+    if slow_updates is not None:
+        app.middlewares.append(slow_updates.web_middleware)
+    app.middlewares.append(drainer.reject_middleware)
+
+    # Startup / shutdown hodisalari (drain – boshqa shutdown handler’laridan oldin)
     app.on_startup.append(on_startup)
-    app.on_shutdown.append(on_shutdown)
+    app.on_shutdown.insert(0, on_shutdown)
 
+    STARTUP_SECONDS.set(time.perf_counter() - build_started, "app_build")
+    new_loop, loop_name = loop_factory(FAST_RUNTIME)
+    logging.info(f"Runtime: {loop_name} event loop, {JSON_LIB} JSON")
     port = int(os.getenv("PORT", "8000"))
-    web.run_app(app, host="0.0.0.0", port=port)
+    web.run_app(app, host="0.0.0.0", port=port, print=on_listening, loop=new_loop())
 
 
 if __name__ == "__main__":
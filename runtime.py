@@ -0,0 +1,47 @@
+import asyncio
+import json
+import logging
+from typing import Any, Callable, Tuple
+
+# ================== TEZKOR RUNTIME (UVLOOP + ORJSON) ==================
+
+JsonLoads = Callable[[Any], Any]
+JsonDumps = Callable[..., str]
+
+
+def _orjson_codecs() -> Tuple[JsonLoads, JsonDumps]:
+    import orjson
+
+    def dumps(obj: Any, **_: Any) -> str:
+        # aiogram satr kutadi; orjson bayt qaytaradi
+        return orjson.dumps(obj).decode()
+
+    return orjson.loads, dumps
+
+
+def json_codecs(fast: bool) -> Tuple[JsonLoads, JsonDumps, str]:
+    """(loads, dumps, nomi): fast=True bo‘lsa orjson, o‘rnatilmagan bo‘lsa – standart json."""
+    if fast:
+        try:
+            loads, dumps = _orjson_codecs()
+            return loads, dumps, "orjson"
+        except ImportError:
+            logging.warning("FAST_RUNTIME: orjson o‘rnatilmagan – standart json ishlatiladi")
+    return json.loads, json.dumps, "json"
+
+
+def loop_factory(fast: bool) -> Tuple[Callable[[], asyncio.AbstractEventLoop], str]:
+    """
+    (event loop yaratuvchi, nomi): fast=True bo‘lsa uvloop, bo‘lmasa – standart asyncio.
+
+    aiogram import paytida uvloop o‘rnatilgan bo‘lsa uning policy’sini global
+    qo‘yadi, shuning uchun standart loop policy’ni chetlab yaratiladi.
+    """
+    if fast:
+        try:
+            import uvloop
+
+            return uvloop.new_event_loop, "uvloop"
+        except ImportError:
+            logging.warning("FAST_RUNTIME: uvloop o‘rnatilmagan – standart asyncio loop ishlatiladi")
+    return asyncio.DefaultEventLoopPolicy().new_event_loop, "asyncio"
@@ -0,0 +1,225 @@
+import heapq
+import re
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# ================== NOMZODLARNI QIDIRISH (TRIGRAM INDEKS) ==================
+
+# Maydonlar: hujjat kaliti = ariza id * 2 + maydon raqami
+FIELDS = ("name", "prev_job")
+
+# Kirill -> lotin (o‘zbek lotin yozuvi, apostroflarsiz – o‘/g‘ ham o/g bo‘ladi)
+_CYRILLIC = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "ғ": "g", "д": "d", "е": "e", "ё": "yo", "ж": "j",
+    "з": "z", "и": "i", "й": "y", "к": "k", "қ": "q", "л": "l", "м": "m", "н": "n", "о": "o",
+    "ў": "o", "п": "p", "р": "r", "с": "s", "т": "t", "у": "u", "ф": "f", "х": "x", "ҳ": "h",
+    "ц": "ts", "ч": "ch", "ш": "sh", "щ": "sh", "ъ": "", "ы": "i", "ь": "", "э": "e", "ю": "yu",
+    "я": "ya",
+}
+# Apostrof variantlari (ʻ ‘ ’ ' ` ʼ) – olib tashlanadi: "O‘g‘iloy", "O'g'iloy", "Огилой" bir xil
+_TRANSLATE = str.maketrans({**_CYRILLIC, "ʻ": "", "‘": "", "’": "", "'": "", "`": "", "ʼ": ""})
+# So‘z boshida va unlidan keyin "е" – "ye" (Евгений -> yevgeniy, Хўжаева -> xojayeva)
+_YE = re.compile("(?<![бвгғджзйкқлмнпрстфхҳцчшщъь])е")
+_NON_WORD = re.compile(r"[^0-9a-z]+")
+
+
+def normalize(text: str) -> str:
+    """Qidiruv uchun: kichik harf, lotin yozuvi, apostrofsiz, faqat harf-raqam va bitta bo‘sh joy."""
+    return _NON_WORD.sub(" ", _YE.sub("ye", text.casefold()).translate(_TRANSLATE)).strip()
+
+
+def trigrams(word: str) -> Set[str]:
+    """So‘z trigramlari; boshi ikki, oxiri bitta bo‘sh joy bilan to‘ldiriladi (pg_trgm kabi)."""
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def words(text: str) -> List[str]:
+    return list(dict.fromkeys(normalize(text).split()))
+
+
+class TrigramIndex:
+    """
+    Ism va avvalgi ish joyi bo‘yicha noaniq qidiruv.
+
+    Ikki bosqichli inverted index: trigram -> lug‘atdagi so‘zlar (so‘zlar soni
+    arizalardan ancha kam – xato yozilgan so‘zga o‘xshashlari tez topiladi) va
+    so‘z -> hujjatlar. So‘rovdagi har bir so‘z uchun o‘xshash so‘zlar hujjatlari
+    to‘plamlari kesishmasi (C’da) nomzodlarni beradi; ular so‘zlar o‘xshashligi
+    (trigram Jaccard) o‘rtachasi bilan baholanadi.
+
+    load() arxivdan boshlang‘ich yuklash (fon thread’ida); shu payt kelgan
+    add() chaqiruvlari navbatda turadi va finish_load() da qo‘shiladi.
+    """
+
+    def __init__(self, similar_words: int = 20, min_word_score: float = 0.4,
+                 max_candidates: int = 2000):
+        self.similar_words = similar_words
+        self.min_word_score = min_word_score
+        self.max_candidates = max_candidates
+        self._vocab: Dict[str, int] = {}
+        # trigram -> so‘z id’lari; so‘z id -> trigramlar soni / hujjatlar
+        self._word_grams: Dict[str, array] = {}
+        self._word_sizes = array("H")
+        self._word_docs: List[array] = []
+        # Hujjat kaliti -> so‘z id’lari (hujjat bo‘lmasa – None)
+        self._doc_words: List[Optional[Tuple[int, ...]]] = []
+        self.loading = True
+        self._pending: List[Tuple[int, Optional[str], Optional[str]]] = []
+        self.last_id = 0
+        self.documents = 0
+
+    def __len__(self) -> int:
+        return len(self._vocab)
+
+    def _word_id(self, word: str) -> int:
+        word_id = self._vocab.get(word)
+        if word_id is None:
+            word_id = self._vocab[word] = len(self._word_docs)
+            grams = trigrams(word)
+            for gram in grams:
+                ids = self._word_grams.get(gram)
+                if ids is None:
+                    self._word_grams[gram] = ids = array("I")
+                ids.append(word_id)
+            self._word_sizes.append(min(len(grams), 0xFFFF))
+            self._word_docs.append(array("I"))
+        return word_id
+
+    def _add_document(self, key: int, text: Optional[str]) -> None:
+        ids = tuple(self._word_id(word) for word in words(text)) if text else ()
+        if not ids:
+            return
+        if key >= len(self._doc_words):
+            self._doc_words.extend([None] * (key + 1 - len(self._doc_words) + 1024))
+        self._doc_words[key] = ids
+        for word_id in ids:
+            self._word_docs[word_id].append(key)
+        self.documents += 1
+
+    def _add(self, app_id: int, name: Optional[str], prev_job: Optional[str]) -> None:
+        self._add_document(app_id * 2, name)
+        self._add_document(app_id * 2 + 1, prev_job)
+        self.last_id = max(self.last_id, app_id)
+
+    def load(self, rows: Iterable[Tuple[int, Optional[str], Optional[str]]]) -> int:
+        count = 0
+        for app_id, name, prev_job in rows:
+            self._add(app_id, name, prev_job)
+            count += 1
+        return count
+
+    def finish_load(self) -> None:
+        for app_id, name, prev_job in self._pending:
+            if app_id > self.last_id:
+                self._add(app_id, name, prev_job)
+        self._pending.clear()
+        self.loading = False
+
+    def add(self, app_id: int, name: Optional[str], prev_job: Optional[str]) -> None:
+        """Yangi tasdiqlangan ariza."""
+        if self.loading:
+            self._pending.append((app_id, name, prev_job))
+        else:
+            self._add(app_id, name, prev_job)
+
+    def similar(self, word: str) -> Dict[int, float]:
+        """Lug‘atdagi o‘xshash so‘zlar: {so‘z id: o‘xshashlik}, eng ko‘pi `similar_words` ta."""
+        grams = trigrams(word)
+        counts: Counter = Counter()
+        for gram in grams:
+            ids = self._word_grams.get(gram)
+            if ids is not None:
+                counts.update(ids)
+        sizes = self._word_sizes
+        size = len(grams)
+        scored = [
+            (score, word_id)
+            for word_id, shared in counts.items()
+            if (score := shared / (size + sizes[word_id] - shared)) >= self.min_word_score
+        ]
+        return {word_id: score for score, word_id in heapq.nlargest(self.similar_words, scored)}
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[int, str, float]]:
+        """
+        (ariza id, mos kelgan maydon, o‘xshashlik 0..1), eng o‘xshashi birinchi; har ariza bir marta.
+
+        Nomzodlar eng kam uchraydigan so‘rov so‘zining hujjatlaridan olinadi: o‘xshashroq
+        so‘zlarniki birinchi, har birida eng yangisi. Qolgan hujjatlar yuqoriroq baho
+        ololmaydigan bo‘lgach to‘xtaymiz – umumiy so‘zda (ish joyi, ism) minglab
+        hujjat baholanmaydi. Baholanadiganlar baribir `max_candidates` tadan oshmaydi.
+        """
+        query_words = words(query)[:8]
+        if not query_words:
+            return []
+        sims = [self.similar(word) for word in query_words]
+        active = [sim for sim in sims if sim]
+        if not active:
+            return []
+        word_docs = self._word_docs
+        frequency = [sum(len(word_docs[word_id]) for word_id in sim) for sim in active]
+        rarest = active[frequency.index(min(frequency))]
+
+        candidates: Optional[Set[int]] = None
+        if len(active) > 1:
+            doc_sets = sorted(
+                (set().union(*(word_docs[word_id] for word_id in sim)) for sim in active),
+                key=len,
+            )
+            candidates = doc_sets[0].intersection(*doc_sets[1:])
+            if not candidates:
+                # Hamma so‘z birga uchramadi – ko‘proq so‘z mos kelganlar
+                counts: Counter = Counter()
+                for docs in doc_sets:
+                    counts.update(docs)
+                keys = [key for key, _ in counts.most_common(self.max_candidates)]
+                return self._rank([(self._score(sims, key), key) for key in keys], limit)
+
+        # Hali ko‘rilmagan hujjat bahosining yuqori chegarasi: shu so‘z o‘xshashligi,
+        # qolgan so‘rov so‘zlari esa to‘liq mos deb
+        others = len(active) - 1
+        scored: List[Tuple[float, int]] = []
+        seen: Set[int] = set()
+        for word_id, word_score in sorted(rarest.items(), key=lambda item: item[1], reverse=True):
+            bound = (word_score + others) / len(sims) - 1e-9
+            strong = {key >> 1 for score, key in scored if score >= bound}
+            if len(strong) >= limit:
+                break
+            for key in reversed(word_docs[word_id]):
+                if key in seen or (candidates is not None and key not in candidates):
+                    continue
+                seen.add(key)
+                score = self._score(sims, key)
+                scored.append((score, key))
+                if score >= bound:
+                    strong.add(key >> 1)
+                    if len(strong) >= limit:
+                        break
+                if len(scored) >= self.max_candidates:
+                    break
+            if len(strong) >= limit or len(scored) >= self.max_candidates:
+                break
+        return self._rank(scored, limit)
+
+    def _score(self, sims: List[Dict[int, float]], key: int) -> float:
+        """Hujjat bahosi: har so‘rov so‘zi uchun hujjatdagi eng o‘xshash so‘z, o‘rtachasi."""
+        ids = self._doc_words[key]
+        total = 0.0
+        for sim in sims:
+            total += max([sim.get(word_id, 0.0) for word_id in ids])
+        return total / len(sims)
+
+    @staticmethod
+    def _rank(scored: List[Tuple[float, int]], limit: int) -> List[Tuple[int, str, float]]:
+        scored.sort(reverse=True)
+        results: List[Tuple[int, str, float]] = []
+        seen: Set[int] = set()
+        for score, key in scored:
+            app_id = key >> 1
+            if app_id not in seen:
+                seen.add(app_id)
+                results.append((app_id, FIELDS[key & 1], score))
+                if len(results) >= limit:
+                    break
+        return results
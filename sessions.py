@@ -0,0 +1,260 @@
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+# ================== SESSIYA BACKENDLARI ==================
+
+
+class SessionBackend:
+    """Sessiyalarni saqlovchi backend interfeysi (standart: faqat xotira)."""
+
+    def load_all(self) -> Dict[int, str]:
+        return {}
+
+    def write_batch(self, upserts: Dict[int, str], deletes: Iterable[int]) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class MemoryBackend(SessionBackend):
+    """Hech narsani diskka yozmaydi – restartda sessiyalar yo‘qoladi."""
+
+
+class SQLiteBackend(SessionBackend):
+    """SQLite (WAL) backend: sessiyalar restart/redeploy’dan keyin ham saqlanadi."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " uid INTEGER PRIMARY KEY,"
+            " data TEXT NOT NULL"
+            ")"
+        )
+
+    def load_all(self) -> Dict[int, str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT uid, data FROM sessions").fetchall()
+        return {uid: data for uid, data in rows}
+
+    def write_batch(self, upserts: Dict[int, str], deletes: Iterable[int]) -> None:
+        deletes = list(deletes)
+        if not upserts and not deletes:
+            return
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                if upserts:
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO sessions (uid, data) VALUES (?, ?)",
+                        upserts.items(),
+                    )
+                if deletes:
+                    self._conn.executemany(
+                        "DELETE FROM sessions WHERE uid = ?",
+                        ((uid,) for uid in deletes),
+                    )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def make_backend(kind: str, path: str) -> SessionBackend:
+    if kind == "sqlite":
+        return SQLiteBackend(path)
+    if kind == "memory":
+        return MemoryBackend()
+    raise RuntimeError(f"Noma'lum SESSION_BACKEND: {kind}")
+
+
+# ================== SESSIYA OMBORI (WRITE-BEHIND + TTL/LRU) ==================
+
+
+class SessionStore:
+    """
+    user_data uchun dict’ga o‘xshash ombor.
+
+    O‘zgarishlar xotirada darhol ko‘rinadi, diskka esa fon vazifasi
+    (run_maintenance) orqali paket-paket yoziladi – handler hech qachon diskni kutmaydi.
+    Bir foydalanuvchining bir necha step o‘tishlari bitta yozuvga birlashadi.
+
+    Xotira chegaralangan: `ttl` soniya davomida tegilmagan sessiyalar o‘chadi,
+    `max_entries` dan oshsa eng eski (LRU) sessiya chiqarib yuboriladi.
+    Sessiyalar oxirgi murojaat tartibida saqlanadi, shuning uchun muddati
+    o‘tganlar doim ro‘yxat boshida turadi – to‘liq skan kerak emas.
+    """
+
+    def __init__(
+        self,
+        backend: Optional[SessionBackend] = None,
+        encode: Callable[[Any], str] = json.dumps,
+        decode: Callable[[str], Any] = json.loads,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.backend = backend or MemoryBackend()
+        self._encode = encode
+        self._decode = decode
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        # uid -> sessiya, oxirgi murojaat tartibida (eng eskisi boshida)
+        self._data: "OrderedDict[int, Any]" = OrderedDict()
+        # uid -> oxirgi murojaat vaqti
+        self._touched: Dict[int, float] = {}
+        self._dirty: set = set()
+        self._deleted: set = set()
+        self._persistent = not isinstance(self.backend, MemoryBackend)
+        self.flushes = 0
+        self.flushed_rows = 0
+        self.evicted_ttl = 0
+        self.evicted_lru = 0
+
+    # ---- dict interfeysi ----
+    def get(self, uid: int, default: Any = None) -> Any:
+        return self._data.get(uid, default)
+
+    def __getitem__(self, uid: int) -> Any:
+        return self._data[uid]
+
+    def __setitem__(self, uid: int, value: Any) -> None:
+        is_new = uid not in self._data
+        self._data[uid] = value
+        self.touch(uid)
+        if is_new:
+            self._evict()
+
+    def __contains__(self, uid: object) -> bool:
+        return uid in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._data)
+
+    def setdefault(self, uid: int, default: Any) -> Any:
+        if uid in self._data:
+            return self._data[uid]
+        self[uid] = default
+        return default
+
+    def pop(self, uid: int, *default: Any) -> Any:
+        value = self._data.pop(uid, *default)
+        self._touched.pop(uid, None)
+        if self._persistent:
+            self._dirty.discard(uid)
+            self._deleted.add(uid)
+        return value
+
+    # ---- murojaat va chiqarib yuborish ----
+    def touch(self, uid: int) -> None:
+        """Sessiyaga murojaat bo‘ldi: LRU tartibini yangilaymiz va diskka yozishga belgilaymiz."""
+        if uid not in self._data:
+            return
+        self._data.move_to_end(uid)
+        self._touched[uid] = self._clock()
+        if self._persistent:
+            self._deleted.discard(uid)
+            self._dirty.add(uid)
+
+    def _evict(self) -> None:
+        self.expire()
+        if self.max_entries is not None:
+            while len(self._data) > self.max_entries:
+                uid = next(iter(self._data))
+                self.pop(uid)
+                self.evicted_lru += 1
+
+    def expire(self) -> int:
+        """Muddati o‘tgan sessiyalarni o‘chirish (faqat ro‘yxat boshidan)."""
+        if self.ttl is None:
+            return 0
+        deadline = self._clock() - self.ttl
+        expired = 0
+        while self._data:
+            uid = next(iter(self._data))
+            if self._touched.get(uid, 0.0) > deadline:
+                break
+            self.pop(uid)
+            expired += 1
+        self.evicted_ttl += expired
+        return expired
+
+    # ---- persist ----
+    def load(self) -> int:
+        """Backenddagi barcha sessiyalarni xotiraga yuklash (startup’da)."""
+        now = self._clock()
+        for uid, raw in self.backend.load_all().items():
+            try:
+                self._data[uid] = self._decode(raw)
+            except Exception:
+                logging.exception("Sessiyani o‘qib bo‘lmadi: uid=%s", uid)
+                continue
+            self._touched[uid] = now
+        self._evict()
+        return len(self._data)
+
+    def _take_batch(self):
+        # Snapshot event loop ichida olinadi – fon oqimi mutatsiyani ko‘rmaydi
+        upserts = {uid: self._encode(self._data[uid]) for uid in self._dirty if uid in self._data}
+        deletes = list(self._deleted)
+        self._dirty.clear()
+        self._deleted.clear()
+        return upserts, deletes
+
+    def _restore_batch(self, upserts: Dict[int, str], deletes: Iterable[int]) -> None:
+        # Yozish muvaffaqiyatsiz bo‘lsa keyingi flush’da qayta urinamiz
+        for uid in upserts:
+            if uid not in self._deleted:
+                self._dirty.add(uid)
+        for uid in deletes:
+            if uid not in self._dirty:
+                self._deleted.add(uid)
+
+    async def flush(self) -> int:
+        if not self._dirty and not self._deleted:
+            return 0
+        upserts, deletes = self._take_batch()
+        try:
+            await asyncio.to_thread(self.backend.write_batch, upserts, deletes)
+        except Exception:
+            self._restore_batch(upserts, deletes)
+            raise
+        self.flushes += 1
+        self.flushed_rows += len(upserts) + len(deletes)
+        return len(upserts) + len(deletes)
+
+    def flush_sync(self) -> int:
+        """Shutdown uchun: qolgan o‘zgarishlarni darhol yozish."""
+        upserts, deletes = self._take_batch()
+        self.backend.write_batch(upserts, deletes)
+        return len(upserts) + len(deletes)
+
+    async def run_maintenance(self, interval: float) -> None:
+        """Fon vazifasi: har `interval` soniyada eskirganlarni o‘chiradi va o‘zgarishlarni yozadi."""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.expire()
+                if self._persistent:
+                    await self.flush()
+            except Exception:
+                logging.exception("Sessiyalarni diskka yozishda xatolik")
@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import random
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiogram import Bot
+from aiogram.types import FSInputFile
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+    TelegramRetryAfter,
+    TelegramUnauthorizedError,
+)
+
+from bot_session import no_inline_retry
+
+# ================== HR YUBORISH NAVBATI (SPOOL) ==================
+
+# Qayta urinish bilan tuzalmaydigan xatolar
+PERMANENT_ERRORS = (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramNotFound,
+    TelegramUnauthorizedError,
+)
+
+
+class Outbox:
+    """
+    Diskdagi (SQLite) chiquvchi xabarlar navbati.
+
+    enqueue() xabarni diskka yozadi va darhol qaytadi; run_sender() fon vazifasi
+    ularni kelgan tartibda Bot API’ga yuboradi. TelegramRetryAfter bo‘lsa
+    ko‘rsatilgan vaqt kutiladi, boshqa xatolarda eksponensial backoff.
+    Restartdan keyin yuborilmagan xabarlar qaytadan yuboriladi.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_attempts: int = 10,
+        backoff_base: float = 2.0,
+        backoff_max: float = 300.0,
+    ):
+        self.path = path
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " id INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " method TEXT NOT NULL,"
+            " payload TEXT NOT NULL,"
+            " attempts INTEGER NOT NULL DEFAULT 0,"
+            " next_attempt REAL NOT NULL DEFAULT 0,"
+            " dead INTEGER NOT NULL DEFAULT 0,"
+            " last_error TEXT,"
+            " created REAL NOT NULL"
+            ")"
+        )
+        self._wakeup = asyncio.Event()
+        self.sent = 0
+        self.failed = 0
+
+    # ---- SQLite (fon oqimida) ----
+    def _insert(self, method: str, payload: str) -> int:
+        with self._lock:
+            cur = self._conn.execute(
+                "INSERT INTO outbox (method, payload, created) VALUES (?, ?, ?)",
+                (method, payload, time.time()),
+            )
+            return cur.lastrowid
+
+    def _head(self) -> Optional[Tuple[int, str, str, int, float]]:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, method, payload, attempts, next_attempt FROM outbox"
+                " WHERE dead = 0 ORDER BY id LIMIT 1"
+            ).fetchone()
+
+    def _delete(self, row_id: int) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+
+    def _reschedule(self, row_id: int, attempts: int, next_attempt: float,
+                    error: str, dead: bool = False) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE outbox SET attempts = ?, next_attempt = ?, last_error = ?, dead = ?"
+                " WHERE id = ?",
+                (attempts, next_attempt, error, int(dead), row_id),
+            )
+
+    def pending(self) -> int:
+        """Yuborilishi kutilayotgan xabarlar soni."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM outbox WHERE dead = 0").fetchone()[0]
+
+    def due(self, now: Optional[float] = None) -> int:
+        """Hozir yuborilishi mumkin bo‘lganlar (backoff / flood limit kutayotganlarsiz)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM outbox WHERE dead = 0 AND next_attempt <= ?",
+                (time.time() if now is None else now,),
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ---- API ----
+    async def enqueue(self, method: str, **params: Any) -> int:
+        """
+        Bot metodini (masalan, "send_photo") navbatga yozish – diskka tushgach qaytadi.
+
+        Diskdagi fayl yuborish uchun parametr {"file": yo‘l, "filename": nom} ko‘rinishida beriladi.
+        """
+        payload = json.dumps(params, ensure_ascii=False)
+        row_id = await asyncio.to_thread(self._insert, method, payload)
+        self._wakeup.set()
+        return row_id
+
+    def _backoff(self, attempts: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempts - 1))
+        return delay * random.uniform(0.8, 1.2)
+
+    async def _send(self, bot: Bot, method: str, payload: str) -> None:
+        params: Dict[str, Any] = json.loads(payload)
+        for key, value in params.items():
+            if isinstance(value, dict) and "file" in value:
+                params[key] = FSInputFile(value["file"], filename=value.get("filename"))
+        # Flood limitni session emas, navbat o‘zi kutadi (backoff, keyingi xabarlar tartibi)
+        with no_inline_retry():
+            await getattr(bot, method)(**params)
+
+    async def drain_once(self, bot: Bot) -> Optional[float]:
+        """
+        Navbat boshidagi xabarni yuborishga urinish.
+
+        Qaytaradi: None – navbat bo‘sh; 0 – darhol davom etish mumkin;
+        musbat son – shuncha soniya kutish kerak.
+        """
+        head = await asyncio.to_thread(self._head)
+        if head is None:
+            return None
+        row_id, method, payload, attempts, next_attempt = head
+        wait = next_attempt - time.time()
+        if wait > 0:
+            return wait
+
+        try:
+            await self._send(bot, method, payload)
+        except TelegramRetryAfter as e:
+            # Limit – urinish hisoblanmaydi, Telegram aytgan vaqtgacha kutamiz
+            logging.warning("HR navbati: flood limit, %s s kutamiz", e.retry_after)
+            await asyncio.to_thread(
+                self._reschedule, row_id, attempts, time.time() + e.retry_after, str(e)
+            )
+            return float(e.retry_after)
+        except Exception as e:
+            attempts += 1
+            dead = isinstance(e, PERMANENT_ERRORS) or attempts >= self.max_attempts
+            delay = 0.0 if dead else self._backoff(attempts)
+            if dead:
+                self.failed += 1
+                logging.error("HR navbati: xabar %s yuborilmadi (%s urinish): %s",
+                              row_id, attempts, e)
+            else:
+                logging.warning("HR navbati: xabar %s xatolik, %.1f s dan keyin qayta: %s",
+                                row_id, delay, e)
+            await asyncio.to_thread(
+                self._reschedule, row_id, attempts, time.time() + delay, repr(e), dead
+            )
+            return delay
+
+        await asyncio.to_thread(self._delete, row_id)
+        self.sent += 1
+        return 0.0
+
+    async def run_sender(self, bot: Bot) -> None:
+        """Fon vazifasi: navbatni doimiy bo‘shatib boradi."""
+        while True:
+            # Tozalash drain’dan oldin – shu orada kelgan enqueue’ni o‘tkazib yubormaslik uchun
+            self._wakeup.clear()
+            try:
+                wait = await self.drain_once(bot)
+            except Exception:
+                logging.exception("HR navbatini o‘qishda xatolik")
+                wait = self.backoff_base
+            if wait == 0:
+                continue
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    def dead_letters(self, limit: int = 100) -> List[Tuple[int, str, str]]:
+        """Yuborib bo‘lmagan xabarlar (qo‘lda tekshirish uchun)."""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, method, last_error FROM outbox WHERE dead = 1 ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
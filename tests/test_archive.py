@@ -0,0 +1,42 @@
+from archive import ApplicantIndex
+
+DAY = 86400
+
+
+def test_previous_within_window():
+    index = ApplicantIndex(30 * DAY)
+    index.add(1, "+998 90 123-45-67", 1000)
+    assert index.previous(1, None, 1000 + DAY) == 1000
+    assert index.previous(2, "8 (90) 123 45 67", 1000 + DAY) == 1000
+    assert index.previous(2, "+998901111111", 1000 + DAY) is None
+    assert index.previous(1, None, 1000 + 30 * DAY) is None
+
+
+def test_expired_entries_are_pruned():
+    index = ApplicantIndex(10 * DAY)
+    for uid in range(100):
+        index.add(uid, f"+99890{uid:07d}", uid * DAY)
+    # Har add() oynadan chiqqanlarni o‘chiradi – hajm oyna bilan chegaralangan
+    assert len(index) == 10
+    assert len(index._phones) == 10
+    assert index.prune(200 * DAY) == 20
+    assert len(index) == 0 and not index._phones
+
+
+def test_readd_moves_entry_to_the_end():
+    index = ApplicantIndex(10 * DAY)
+    index.add(1, "+998900000001", 0)
+    index.add(2, "+998900000002", 5 * DAY)
+    index.add(1, "+998900000001", 8 * DAY)
+    # Eng boshida endi 2 turadi: u o‘chadi, 1 esa (yangilangan) qoladi
+    assert index.prune(16 * DAY) == 2
+    assert index.previous(1, None, 16 * DAY) == 8 * DAY
+    assert len(index) == 1
+
+
+def test_load_prunes_with_now():
+    index = ApplicantIndex(10 * DAY)
+    rows = [("900000001", 1, 0), ("900000002", 2, 5 * DAY), ("900000003", 3, 9 * DAY)]
+    assert index.load(rows, now=16 * DAY) == 3
+    assert len(index) == 1
+    assert index.previous(3, None, 16 * DAY) == 9 * DAY
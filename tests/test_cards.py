@@ -0,0 +1,32 @@
+import pytest
+
+from cards import CardTemplate, compile_cards
+
+FIELDS = ("name", "phone", "job")
+
+
+def test_render_matches_str_format():
+    source = "👤 {name}\n📞 {phone}\n{{literal}} {name} – {job}"
+    values = {"name": "Ali {0}", "phone": "%s+998", "job": "kassir"}
+    card = CardTemplate(source, FIELDS)
+    assert card.render(tuple(values[f] for f in FIELDS)) == source.format(**values)
+
+
+@pytest.mark.parametrize("source", ["matn", "{job}", "{phone}{name}"])
+def test_few_fields(source):
+    card = CardTemplate(source, FIELDS)
+    assert card.render(("A", "B", "C")) == source.format(name="A", phone="B", job="C")
+
+
+def test_invalid_templates():
+    with pytest.raises(KeyError):
+        CardTemplate("{age}", FIELDS)
+    with pytest.raises(ValueError):
+        CardTemplate("{name!r}", FIELDS)
+    with pytest.raises(ValueError):
+        CardTemplate("{name:>10}", FIELDS)
+
+
+def test_compile_cards_per_language():
+    cards = compile_cards({"uz": "Ism: {name}", "ru": "Имя: {name}"}, FIELDS)
+    assert cards["ru"].render(("Ali", "", "")) == "Имя: Ali"
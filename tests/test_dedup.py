@@ -0,0 +1,78 @@
+import asyncio
+import sqlite3
+
+from dedup import RecentKeys
+
+
+def test_discard_is_persisted(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    keys = RecentKeys(100, path)
+    assert not keys.seen("1")
+    assert not keys.seen("2")
+    asyncio.run(keys.flush())
+    # Handler xato berdi – update qayta kelganda tashlab yuborilmasligi kerak
+    keys.discard("1")
+    asyncio.run(keys.flush())
+    keys.close()
+
+    restored = RecentKeys(100, path)
+    assert restored.load() == 1
+    assert "1" not in restored
+    assert "2" in restored
+    restored.close()
+
+
+def test_discard_before_flush_and_readd(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    keys = RecentKeys(100, path)
+    keys.add("a")
+    keys.discard("a")
+    keys.add("b")
+    keys.discard("b")
+    keys.add("b")
+    keys.flush_sync()
+    keys.close()
+
+    restored = RecentKeys(100, path)
+    restored.load()
+    assert "a" not in restored
+    assert "b" in restored
+    restored.close()
+
+
+def test_keeps_last_maxsize(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    keys = RecentKeys(3, path)
+    for key in "abcde":
+        keys.add(key)
+    assert len(keys) == 3 and "b" not in keys
+    keys.flush_sync()
+    keys.close()
+
+    restored = RecentKeys(3, path)
+    assert restored.load() == 3
+    assert [key for key in "abcde" if key in restored] == ["c", "d", "e"]
+    restored.close()
+
+
+def test_value_survives_restart_and_old_table(tmp_path):
+    path = str(tmp_path / "dedup.db")
+    # Eski sxema: value ustunisiz jadval
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE recent_keys (key TEXT PRIMARY KEY, seq INTEGER NOT NULL)")
+    conn.execute("INSERT INTO recent_keys VALUES ('old', 1)")
+    conn.commit()
+    conn.close()
+
+    keys = RecentKeys(100, path)
+    assert keys.load() == 1
+    assert "old" in keys and keys.get("old", "uz") == "uz"
+    keys.add("1:10", "ru")
+    keys.flush_sync()
+    keys.close()
+
+    restored = RecentKeys(100, path)
+    restored.load()
+    assert restored.get("1:10") == "ru"
+    assert restored.get("missing") is None
+    restored.close()
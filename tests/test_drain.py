@@ -0,0 +1,124 @@
+import asyncio
+import os
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message, Update
+
+from drain import Drainer
+from locks import KeyedLock
+
+BOT = Bot("42:TEST")
+
+
+def make_update(update_id: int, uid: int) -> Update:
+    return Update.model_validate({
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": uid, "type": "private"},
+            "from": {"id": uid, "is_bot": False, "first_name": "Test"},
+            "text": f"xabar {update_id}",
+        },
+    })
+
+
+def make_dispatcher(drainer: Drainer, handled: list, delay: float = 0.0) -> Dispatcher:
+    """roshaaa.py dagi tartib: accept -> foydalanuvchi lock’i -> start -> handler."""
+    dp = Dispatcher()
+    locks = KeyedLock()
+    dp.update.outer_middleware(drainer.accept_middleware)
+
+    @dp.update.outer_middleware()
+    async def serialize_per_user(handler, event, data):
+        async with locks(data["event_from_user"].id):
+            return await handler(event, data)
+
+    dp.update.outer_middleware(drainer.start_middleware)
+
+    router = Router()
+
+    @router.message()
+    async def on_message(message: Message):
+        await asyncio.sleep(delay)
+        handled.append(message.message_id)
+
+    dp.include_router(router)
+    return dp
+
+
+def test_drain_waits_for_finished_updates(tmp_path):
+    path = str(tmp_path / "deferred.json")
+    open(path, "w").write("[]")
+    drainer = Drainer(path)
+    handled = []
+    dp = make_dispatcher(drainer, handled, delay=0.01)
+
+    async def scenario():
+        for i in range(1, 6):
+            asyncio.ensure_future(dp.feed_update(BOT, make_update(i, uid=i % 2)))
+        await drainer.drain(timeout=2)
+
+    asyncio.run(scenario())
+    assert sorted(handled) == [1, 2, 3, 4, 5]
+    assert drainer.drained == 5 and drainer.deferred == 0 and drainer.cut_off == 0
+    # Qoldirilgan update yo‘q – eski fayl ham o‘chiriladi
+    assert not os.path.exists(path)
+
+
+def test_deferred_updates_are_replayed_once(tmp_path):
+    path = str(tmp_path / "deferred.json")
+    drainer = Drainer(path)
+    handled = []
+    dp = make_dispatcher(drainer, handled, delay=0.1)
+    # Dispatcher’ga hali yetib bormagan (masalan, webhook navbatidagi) update’lar
+    queued = [make_update(20, uid=2), make_update(21, uid=2)]
+    drainer.add_source(lambda: 0, lambda: list(queued))
+
+    async def scenario():
+        # Bitta foydalanuvchining 5 ta update’i: birinchisi ishlaydi, qolganlari lock’da kutadi
+        for i in range(1, 6):
+            asyncio.ensure_future(dp.feed_update(BOT, make_update(i, uid=1)))
+        await drainer.drain(timeout=0.05, grace=1.0)
+
+    asyncio.run(scenario())
+    # Boshlangan handler muhlat ichida tugadi, boshlanmaganlari diskka o‘tdi
+    assert handled == [1]
+    assert drainer.drained == 1 and drainer.cut_off == 0
+    assert drainer.deferred == 6
+
+    restarted = Drainer(path)
+    deferred = restarted.load()
+    assert [raw["update_id"] for raw in deferred] == [2, 3, 4, 5, 20, 21]
+
+    replayed = []
+    dp2 = make_dispatcher(restarted, replayed)
+
+    async def replay():
+        await restarted.replay(dp2, BOT, deferred)
+
+    asyncio.run(replay())
+    # Hech biri yo‘qolmadi va ikki marta bajarilmadi, har bir chatda tartib saqlandi
+    assert [i for i in replayed if i < 20] == [2, 3, 4, 5]
+    assert [i for i in replayed if i >= 20] == [20, 21]
+    assert sorted(handled + replayed) == [1, 2, 3, 4, 5, 20, 21]
+    # Hammasi bajarilgach fayl o‘chiriladi – keyingi restartda qayta ishlamaydi
+    assert not os.path.exists(path)
+    assert Drainer(path).load() == []
+
+
+def test_handler_past_grace_is_cut_off_not_deferred(tmp_path):
+    path = str(tmp_path / "deferred.json")
+    drainer = Drainer(path)
+    handled = []
+    dp = make_dispatcher(drainer, handled, delay=10)
+
+    async def scenario():
+        asyncio.ensure_future(dp.feed_update(BOT, make_update(1, uid=1)))
+        asyncio.ensure_future(dp.feed_update(BOT, make_update(2, uid=1)))
+        await drainer.drain(timeout=0.05, grace=0.05)
+
+    asyncio.run(scenario())
+    assert handled == []
+    assert drainer.cut_off == 1
+    assert [raw["update_id"] for raw in Drainer(path).load()] == [2]
@@ -0,0 +1,69 @@
+import csv
+import io
+import xml.etree.ElementTree as ET
+import zipfile
+
+from archive import COLUMNS
+from export import EXPORT_COLUMNS, HEADERS, RowFormatter, XlsxStream, csv_chunk, escape_formula
+
+LABELS = {"department": ["=Kassa", "Ombor"]}
+
+
+def make_row(**values):
+    row = dict.fromkeys(COLUMNS)
+    row.update(id=1, submitted=1_700_000_000, **values)
+    return tuple(row[name] for name in COLUMNS)
+
+
+def column(name):
+    return HEADERS.index(dict(EXPORT_COLUMNS)[name])
+
+
+ROW = make_row(
+    name='=HYPERLINK("http://evil","x")',
+    prev_job="+cmd|' /C calc'!A0",
+    address_text="-2+3",
+    habits="@SUM(A1)",
+    nationality="\tTab",
+    salary="\r5 000 000",
+    phone="998901234567",
+    department=0,
+)
+
+
+def test_escape_formula():
+    for value in ("=1+1", "+1", "-1", "@A1", "\tx", "\rx"):
+        assert escape_formula(value) == "'" + value
+    assert escape_formula("Ali Valiyev") == "Ali Valiyev"
+    assert escape_formula("") == ""
+
+
+def test_row_formatter_escapes_text_and_labels():
+    values = RowFormatter(LABELS)(ROW)
+    for name in ("name", "prev_job", "address_text", "habits", "nationality", "salary"):
+        assert values[column(name)].startswith("'"), name
+    assert values[column("department")] == "'=Kassa"
+    assert values[column("phone")] == "998901234567"
+    assert values[column("id")] == 1
+
+
+def test_csv_cells_are_escaped():
+    data = csv_chunk([ROW], RowFormatter(LABELS), header=True).decode("utf-8-sig")
+    header, row = list(csv.reader(io.StringIO(data, newline="")))
+    assert header == HEADERS
+    assert row[column("name")] == '\'=HYPERLINK("http://evil","x")'
+    assert row[column("salary")] == "'\r5 000 000"
+    assert not any(cell.startswith(("=", "+", "-", "@", "\t", "\r")) for cell in row)
+
+
+def test_xlsx_cells_are_escaped():
+    out = io.BytesIO()
+    xlsx = XlsxStream(out)
+    xlsx.append_rows([RowFormatter(LABELS)(ROW)])
+    xlsx.close()
+    with zipfile.ZipFile(out) as zf:
+        sheet = ET.fromstring(zf.read("xl/worksheets/sheet1.xml"))
+    texts = [t.text or "" for t in sheet.iter() if t.tag.endswith("}t")]
+    assert '\'=HYPERLINK("http://evil","x")' in texts
+    assert "'@SUM(A1)" in texts
+    assert not any(text.startswith(("=", "+", "-", "@")) for text in texts)
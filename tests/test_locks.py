@@ -0,0 +1,66 @@
+import asyncio
+import random
+
+import pytest
+
+from locks import KeyedLock
+
+
+def test_updates_of_one_user_are_serialized():
+    locks = KeyedLock()
+    active = {}
+    max_parallel_users = 0
+    order = {}
+
+    async def handle(uid: int, seq: int, delay: float) -> None:
+        nonlocal max_parallel_users
+        async with locks(uid):
+            assert active.get(uid, 0) == 0, "bitta foydalanuvchining ikki update’i bir vaqtda"
+            active[uid] = 1
+            max_parallel_users = max(max_parallel_users, sum(active.values()))
+            order.setdefault(uid, []).append(seq)
+            await asyncio.sleep(delay)
+            active[uid] = 0
+
+    async def scenario() -> None:
+        rnd = random.Random(7)
+        tasks = []
+        for seq in range(40):
+            for uid in range(10):
+                tasks.append(asyncio.ensure_future(handle(uid, seq, rnd.random() / 1000)))
+        await asyncio.sleep(0)
+        assert len(locks) == 10
+        await asyncio.gather(*tasks)
+
+    asyncio.run(scenario())
+    # Kelgan tartibda (FIFO) bajarildi, turli foydalanuvchilar parallel
+    assert all(seqs == list(range(40)) for seqs in order.values())
+    assert max_parallel_users > 1
+    assert len(locks) == 0 and locks.waiting() == 0
+
+
+def test_lock_entry_is_removed_after_error_and_cancel():
+    locks = KeyedLock()
+
+    async def failing() -> None:
+        async with locks("u"):
+            raise ValueError("handler xatosi")
+
+    async def slow() -> None:
+        async with locks("u"):
+            await asyncio.sleep(10)
+
+    async def scenario() -> None:
+        with pytest.raises(ValueError):
+            await failing()
+        assert len(locks) == 0
+        holder = asyncio.ensure_future(slow())
+        waiter = asyncio.ensure_future(slow())
+        await asyncio.sleep(0)
+        assert locks.waiting() == 1
+        waiter.cancel()
+        holder.cancel()
+        await asyncio.gather(holder, waiter, return_exceptions=True)
+
+    asyncio.run(scenario())
+    assert len(locks) == 0
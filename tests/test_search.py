@@ -0,0 +1,57 @@
+import random
+
+from search import TrigramIndex, words
+
+NAMES = ["Yusupov", "Karimova", "Xo‘jayeva", "Aliyev", "Sevara", "Sherzod", "O‘g‘iloy", "Dilnoza", "Aziz"]
+JOBS = ["Korzinka, kassir", "Texnomart konsultant", "talaba", "Makro sotuvchi"]
+
+
+def build(count: int = 3000):
+    rnd = random.Random(5)
+    rows = [
+        (i + 1, " ".join(rnd.sample(NAMES, 3)), rnd.choice(JOBS))
+        for i in range(count)
+    ]
+    index = TrigramIndex()
+    index.load(rows)
+    index.finish_load()
+    return index
+
+
+def brute_force(index: TrigramIndex, query: str, limit: int = 10):
+    """Barcha hujjatlarni baholash – erta to‘xtashsiz."""
+    sims = [index.similar(word) for word in words(query)]
+    active = [sim for sim in sims if sim]
+    scored = []
+    for key, ids in enumerate(index._doc_words):
+        if ids is None:
+            continue
+        if all(any(word_id in sim for word_id in ids) for sim in active):
+            scored.append((index._score(sims, key), key))
+    return [score for _, _, score in TrigramIndex._rank(scored, limit)]
+
+
+def test_early_stop_keeps_best_scores():
+    index = build()
+    for query in ["korzinka", "Sevara", "Yusupv Shrzod", "ogiloy xojayeva", "Карimova Aziz", "tlaba"]:
+        results = index.search(query)
+        assert len(results) == 10
+        assert [score for _, _, score in results] == brute_force(index, query), query
+
+
+def test_common_word_returns_newest_exact_matches():
+    index = build()
+    results = index.search("texnomart")
+    assert all(field == "prev_job" and score == 1.0 for _, field, score in results)
+    # Teng bahoda eng yangi arizalar birinchi
+    app_ids = [app_id for app_id, _, _ in results]
+    assert app_ids == sorted(app_ids, reverse=True)
+
+
+def test_no_common_document_falls_back_to_partial_matches():
+    index = TrigramIndex()
+    index.load([(1, "Aliyev Aziz", "talaba"), (2, "Karimova Sevara", "Korzinka")])
+    index.finish_load()
+    results = index.search("Aziz Sevara")
+    assert {app_id for app_id, _, _ in results} == {1, 2}
+    assert all(score == 0.5 for _, _, score in results)
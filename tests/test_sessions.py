@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+
+from sessions import MemoryBackend, SessionBackend, SessionStore, SQLiteBackend
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FlakyBackend(SessionBackend):
+    """Yozuvlarni xotirada saqlaydi; `fail` True bo‘lsa write_batch xato beradi."""
+
+    def __init__(self) -> None:
+        self.rows = {}
+        self.fail = False
+
+    def load_all(self):
+        return dict(self.rows)
+
+    def write_batch(self, upserts, deletes):
+        if self.fail:
+            raise OSError("disk full")
+        self.rows.update(upserts)
+        for uid in deletes:
+            self.rows.pop(uid, None)
+
+
+def test_ttl_expiry():
+    clock = Clock()
+    store = SessionStore(MemoryBackend(), ttl=60, clock=clock)
+    store[1] = {"step": 1}
+    clock.now += 30
+    store[2] = {"step": 1}
+    clock.now += 31
+    assert store.expire() == 1
+    assert 1 not in store and 2 in store
+    # Murojaat muddatni yangilaydi
+    store.touch(2)
+    clock.now += 59
+    assert store.expire() == 0
+    clock.now += 2
+    assert store.expire() == 1
+    assert len(store) == 0 and store.evicted_ttl == 2
+
+
+def test_lru_eviction_keeps_recently_touched():
+    store = SessionStore(MemoryBackend(), max_entries=3, clock=Clock())
+    for uid in (1, 2, 3):
+        store[uid] = uid
+    store.touch(1)
+    store[4] = 4
+    assert list(store) == [3, 1, 4]
+    assert 2 not in store and store.evicted_lru == 1
+    store[5] = 5
+    assert sorted(store) == [1, 4, 5]
+
+
+def test_failed_write_is_retried():
+    backend = FlakyBackend()
+    store = SessionStore(backend, clock=Clock())
+    store[1] = {"a": 1}
+    store[2] = {"a": 2}
+    asyncio.run(store.flush())
+    store[1] = {"a": 10}
+    store.pop(2)
+
+    backend.fail = True
+    with pytest.raises(OSError):
+        asyncio.run(store.flush())
+    assert backend.rows == {1: json.dumps({"a": 1}), 2: json.dumps({"a": 2})}
+
+    backend.fail = False
+    assert asyncio.run(store.flush()) == 2
+    assert backend.rows == {1: json.dumps({"a": 10})}
+
+
+def test_restore_batch_does_not_resurrect_popped_session():
+    backend = FlakyBackend()
+    store = SessionStore(backend, clock=Clock())
+    store[1] = {"a": 1}
+    backend.fail = True
+
+    async def scenario():
+        flush = asyncio.ensure_future(store.flush())
+        # Snapshot olindi, yozish fon oqimida – shu orada sessiya o‘chiriladi
+        await asyncio.sleep(0)
+        assert not store._dirty
+        store.pop(1)
+        with pytest.raises(OSError):
+            await flush
+        backend.fail = False
+        await store.flush()
+
+    asyncio.run(scenario())
+    assert backend.rows == {}
+
+
+def test_load_from_sqlite(tmp_path):
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(SQLiteBackend(path), clock=Clock())
+    for uid in range(5):
+        store[uid] = {"uid": uid}
+    store.pop(0)
+    assert store.flush_sync() == 5
+    store.backend.close()
+
+    backend = SQLiteBackend(path)
+    backend.write_batch({99: "{not json"}, [])
+    restored = SessionStore(backend, max_entries=3, clock=Clock())
+    # Buzilgan yozuv o‘tkazib yuboriladi, ortiqchasi LRU bo‘yicha chiqadi
+    assert restored.load() == 3
+    assert all(restored[uid] == {"uid": uid} for uid in restored)
+    assert 0 not in restored and 99 not in restored
+    backend.close()
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+from aiogram import Bot
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from bot_session import RateLimiter, RoshaaSession, no_inline_retry
+from spool import Outbox
+
+HR_CHAT = -100123
+
+
+class FloodSession(RoshaaSession):
+    """Har bir so‘rovga flood limit qaytaradigan session."""
+
+    def __init__(self, retry_after: int = 0):
+        super().__init__(limiter=RateLimiter(global_rate=1000, private_rate=1000, group_rate=1000))
+        self.retry_after = retry_after
+        self.requests = 0
+
+    async def _send(self, bot, method, timeout=None):
+        self.requests += 1
+        raise TelegramRetryAfter(method=method, message="Too Many Requests", retry_after=self.retry_after)
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_session_retries_inline_by_default():
+    session = FloodSession()
+    bot = Bot("123:TEST", session=session)
+    with pytest.raises(TelegramRetryAfter):
+        run(session.make_request(bot, SendMessage(chat_id=HR_CHAT, text="x")))
+    assert session.requests == session.retry_attempts + 1
+
+
+def test_no_inline_retry_raises_at_once():
+    session = FloodSession()
+    bot = Bot("123:TEST", session=session)
+    with no_inline_retry(), pytest.raises(TelegramRetryAfter):
+        run(session.make_request(bot, SendMessage(chat_id=HR_CHAT, text="x")))
+    assert session.requests == 1
+
+
+def test_outbox_schedules_flood_retry_itself(tmp_path):
+    session = FloodSession(retry_after=30)
+    bot = Bot("123:TEST", session=session)
+
+    async def scenario():
+        outbox = Outbox(str(tmp_path / "outbox.db"))
+        await outbox.enqueue("send_message", chat_id=HR_CHAT, text="ariza")
+        wait = await asyncio.wait_for(outbox.drain_once(bot), timeout=5)
+        outbox.close()
+        return wait
+
+    assert run(scenario()) == 30.0
+    # Session kutib qayta yubormadi – navbat boshidagi xabar backoff’da, sender bo‘sh
+    assert session.requests == 1
+
+
+def test_due_skips_rows_waiting_for_retry(tmp_path):
+    session = FloodSession(retry_after=30)
+    bot = Bot("123:TEST", session=session)
+
+    async def scenario():
+        outbox = Outbox(str(tmp_path / "outbox.db"))
+        await outbox.enqueue("send_message", chat_id=HR_CHAT, text="birinchi")
+        assert outbox.due() == 1
+        await outbox.drain_once(bot)
+        await outbox.enqueue("send_message", chat_id=HR_CHAT, text="ikkinchi")
+        counts = outbox.pending(), outbox.due()
+        outbox.close()
+        return counts
+
+    # Flood limitdagi xabar kutilmaydi (shutdown’ni DRAIN_TIMEOUT gacha ushlab turmasin)
+    assert run(scenario()) == (2, 1)
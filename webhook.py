@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from typing import Any, List, Optional, Tuple
+
+from aiohttp import web
+
+from aiogram import Bot, Dispatcher
+from aiogram.dispatcher.middlewares.user_context import UserContextMiddleware
+from aiogram.methods import TelegramMethod
+from aiogram.types import Update
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+
+# ================== NAVBATLI WEBHOOK (FAST-ACK) ==================
+
+
+class QueuedRequestHandler(SimpleRequestHandler):
+    """
+    Webhook so‘rovini tekshiradi, update’ni navbatga qo‘yadi va darhol 200 qaytaradi.
+
+    Update’larni cheklangan sondagi worker qayta ishlaydi. Har bir foydalanuvchi
+    doim bitta shard’ga (user_id % workers) tushadi, shuning uchun uning
+    update’lari kelgan tartibda bajariladi; turli foydalanuvchilar parallel.
+    Navbat to‘lsa 503 qaytariladi – Telegram update’ni keyinroq qayta yuboradi.
+    """
+
+    def __init__(
+        self,
+        dispatcher: Dispatcher,
+        bot: Bot,
+        workers: int = 8,
+        queue_size: int = 1000,
+        secret_token: Optional[str] = None,
+        **data: Any,
+    ) -> None:
+        super().__init__(
+            dispatcher=dispatcher,
+            bot=bot,
+            handle_in_background=True,
+            secret_token=secret_token,
+            **data,
+        )
+        self.workers = max(1, workers)
+        per_shard = max(1, queue_size // self.workers)
+        self._queues: List["asyncio.Queue[Tuple[Bot, Update]]"] = [
+            asyncio.Queue(maxsize=per_shard) for _ in range(self.workers)
+        ]
+        self._worker_tasks: List[asyncio.Task] = []
+        self.rejected = 0
+
+    def register(self, app: web.Application, /, path: str, **kwargs: Any) -> None:
+        app.on_startup.append(self._start_workers)
+        super().register(app, path=path, **kwargs)
+
+    async def _start_workers(self, app: web.Application) -> None:
+        self._worker_tasks = [
+            asyncio.create_task(self._worker(queue)) for queue in self._queues
+        ]
+
+    async def close(self) -> None:
+        for task in self._worker_tasks:
+            task.cancel()
+        await super().close()
+
+    def depth(self) -> int:
+        """Navbatdagi (hali boshlanmagan) update’lar soni."""
+        return sum(queue.qsize() for queue in self._queues)
+
+    def take_pending(self) -> List[Update]:
+        """Navbatda qolgan update’larni olib tashlab qaytaradi (to‘xtash paytida diskka yozish uchun)."""
+        pending = []
+        for queue in self._queues:
+            while not queue.empty():
+                pending.append(queue.get_nowait()[1])
+                queue.task_done()
+        return pending
+
+    async def _worker(self, queue: "asyncio.Queue[Tuple[Bot, Update]]") -> None:
+        while True:
+            bot, update = await queue.get()
+            try:
+                result = await self.dispatcher.feed_update(bot, update, **self.data)
+                if isinstance(result, TelegramMethod):
+                    await self.dispatcher.silent_call_request(bot=bot, result=result)
+            except Exception:
+                logging.exception("Update %s ni qayta ishlashda xatolik", update.update_id)
+            finally:
+                queue.task_done()
+
+    async def _handle_request_background(self, bot: Bot, request: web.Request) -> web.Response:
+        try:
+            raw = await request.json(loads=bot.session.json_loads)
+            update = Update.model_validate(raw, context={"bot": bot})
+        except Exception:
+            logging.warning("Noto‘g‘ri webhook update qabul qilindi")
+            return web.Response(status=400)
+
+        user = UserContextMiddleware.resolve_event_context(update).user
+        shard = user.id % self.workers if user is not None else 0
+        try:
+            self._queues[shard].put_nowait((bot, update))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            logging.warning("Webhook navbati to‘lgan (shard %s), update %s rad etildi",
+                            shard, update.update_id)
+            return web.Response(status=503)
+        return web.json_response({}, dumps=bot.session.json_dumps)